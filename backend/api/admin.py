@@ -1,3 +1,170 @@
+"""
+Shared pieces for admin classes over large tables.
+
+* ``EstimatedCountPaginator`` skips ``COUNT(*)`` on unfiltered PostgreSQL
+  changelists above ``ADMIN_ESTIMATED_COUNT_THRESHOLD`` rows and uses the
+  planner's row estimate instead.
+* ``AutocompleteListFilter`` filters on a foreign key through the admin's
+  autocomplete widget instead of listing every related object.
+* ``PaginatedInlineMixin`` shows one page of an inline's rows at a time.
+
+``ScalableAdminMixin`` wires the paginator and the filter's media into a
+``ModelAdmin``.
+"""
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimated_count(queryset):
+    """
+    The planner's row estimate for an unfiltered queryset on PostgreSQL,
+    or None when no cheap estimate is available.
+    """
+    query = queryset.query
+    if query.where or query.distinct or query.combinator:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 for a table that has never been analyzed.
+    if row is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose count is estimated for large unfiltered querysets."""
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+        return super().count
+
+
+class AutocompleteListFilter(admin.FieldListFilter):
+    """
+    Sidebar filter for a foreign key that renders a single autocomplete
+    select instead of one link per related object. The related model's
+    admin needs ``search_fields``, as for ``autocomplete_fields``.
+
+    Use as ``list_filter = (('project', AutocompleteListFilter),)``.
+    """
+    template = 'admin/autocomplete_list_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.lookup_val = params.get(self.lookup_kwarg)
+        self.admin_site = model_admin.admin_site
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def has_output(self):
+        return True
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def queryset(self, request, queryset):
+        # Clearing the select submits an empty value: treat it as no filter.
+        if not self.lookup_val:
+            return queryset
+        try:
+            return queryset.filter(**{self.lookup_kwarg: self.lookup_val})
+        except (ValueError, ValidationError) as e:
+            raise IncorrectLookupParameters(e)
+
+    def choices(self, changelist):
+        remote_model = self.field.remote_field.model
+        widget = AutocompleteSelect(
+            self.field, self.admin_site,
+            attrs={'onchange': 'this.form.submit()', 'style': 'width: 100%'},
+        )
+        form_field = forms.ModelChoiceField(
+            queryset=remote_model._default_manager.all(), widget=widget, required=False,
+        )
+        hidden = [
+            (name, value) for name, value in changelist.params.items()
+            if name != self.lookup_kwarg
+        ]
+        yield {
+            'selected': bool(self.lookup_val),
+            'widget': form_field.widget.render(self.lookup_kwarg, self.lookup_val),
+            'hidden': hidden,
+            'clear_url': changelist.get_query_string(remove=[self.lookup_kwarg]),
+        }
+
+    @classmethod
+    def media(cls):
+        # AutocompleteSelect's media doesn't depend on the field or site.
+        return AutocompleteSelect(None, None).media
+
+
+class ScalableAdminMixin:
+    """
+    ``ModelAdmin`` defaults for large tables: estimated counts, no second
+    unfiltered count on filtered changelists, and the scripts needed by
+    ``AutocompleteListFilter``. Remember ``list_select_related`` for every
+    foreign key in ``list_display``.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        media = super().media
+        if any(
+            isinstance(spec, (list, tuple)) and issubclass(spec[1], AutocompleteListFilter)
+            for spec in self.list_filter
+        ):
+            media += AutocompleteListFilter.media()
+        return media
+
+
+class PaginatedInlineMixin:
+    """
+    Show at most ``per_page`` existing rows of an inline, selected by the
+    ``<model>_page`` query parameter of the change view (which its form
+    posts back to, so a save edits the same page).
+    """
+    per_page = 20
+    template = 'admin/edit_inline/paginated_tabular.html'
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        per_page = self.per_page
+        page_param = f'{self.opts.model_name}_page'
+        page_number = request.GET.get(page_param)
+        query = request.GET.copy()
+
+        class PaginatedFormSet(formset):
+            def get_queryset(self):
+                if not hasattr(self, 'page'):
+                    paginator = Paginator(super().get_queryset(), per_page)
+                    self.page = paginator.get_page(page_number)
+                return self.page.object_list
+
+            def page_urls(self):
+                """(number, url) pairs for the page links; url is None for an ellipsis or the current page."""
+                self.get_queryset()
+                for number in self.page.paginator.get_elided_page_range(self.page.number):
+                    if number == self.page.number or number == Paginator.ELLIPSIS:
+                        yield number, None
+                    else:
+                        query[page_param] = number
+                        yield number, f'?{query.urlencode()}'
 
-# Register your models here.
+        return PaginatedFormSet
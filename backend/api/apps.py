@@ -1,6 +1,25 @@
+import os
+
 from django.apps import AppConfig
+from django.conf import settings
+from django.core import checks
+from django.db.backends.signals import connection_created
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from .checks import check_email_backend
+        from .signals import connect_page_cache_signals, connect_snapshot_signals, connect_stats_signals
+        from .timing import install_query_dispatcher
+        connection_created.connect(install_query_dispatcher, dispatch_uid='api.query_dispatcher')
+        checks.register(check_email_backend)
+        connect_page_cache_signals()
+        connect_snapshot_signals()
+        connect_stats_signals()
+
+        # Kept out of settings so that importing them has no filesystem side effects.
+        for path in (settings.MEDIA_ROOT, settings.LOG_DIR):
+            os.makedirs(path, exist_ok=True)
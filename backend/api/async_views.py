@@ -0,0 +1,224 @@
+"""
+Native async implementations of the public read endpoints.
+
+Under ASGI (see ``pervasion/asgi.py``) the project list/retrieve/featured,
+category list and comment list routes are served by coroutines using
+Django's async ORM, so a slow client does not pin a worker thread. They
+produce exactly the payload of the DRF viewsets. Anything they do not
+handle (writes, authenticated requests, browsable API, unknown or invalid
+query parameters) is passed on to the regular sync viewset.
+"""
+import math
+import operator
+from functools import reduce
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from comments.models import Comment
+from comments.serializers import CommentSerializer
+from projects.models import Category, Project, ProjectImage
+from projects.related import related_cards
+from projects.serializers import CategorySerializer, ProjectDetailSerializer, ProjectSerializer
+from .pagination import page_links
+
+NOT_HANDLED = None
+_renderer = JSONRenderer()
+
+
+def hybrid_view(async_view, sync_view):
+    """
+    Serve anonymous JSON GETs with ``async_view``, everything else (or
+    anything it returns ``NOT_HANDLED`` for) with the DRF ``sync_view``.
+    """
+    sync_fallback = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if (
+            request.method == 'GET'
+            and 'HTTP_AUTHORIZATION' not in request.META
+            and 'text/html' not in request.META.get('HTTP_ACCEPT', '')
+        ):
+            response = await async_view(request, *args, **kwargs)
+            if response is not NOT_HANDLED:
+                return response
+        return await sync_fallback(request, *args, **kwargs)
+
+    # Keep DRF's attributes so CSRF exemption and ViewSet.action labels still apply.
+    view.csrf_exempt = True
+    view.cls = sync_view.cls
+    view.actions = getattr(sync_view, 'actions', None)
+    view.__name__ = sync_view.__name__
+    return view
+
+
+def _json(data, status=200, allow='GET, HEAD, OPTIONS'):
+    response = HttpResponse(_renderer.render(data), status=status, content_type='application/json')
+    response['Vary'] = 'Accept'
+    response['Allow'] = allow
+    return response
+
+
+def _parse_int(value):
+    return int(value) if value is not None and value.isdigit() else None
+
+
+def _only_params(request, allowed):
+    return set(request.GET) <= set(allowed)
+
+
+def _ordering(request, allowed, default):
+    """Mirror DRF's OrderingFilter: keep valid fields, else fall back to the default."""
+    param = request.GET.get('ordering')
+    if param:
+        fields = [f.strip() for f in param.split(',')]
+        valid = [f for f in fields if f.lstrip('-') in allowed]
+        if valid:
+            return valid
+    return default
+
+
+def _search(request, fields):
+    """Mirror DRF's SearchFilter: every term must match at least one field."""
+    terms = request.GET.get('search', '').replace('\x00', '').replace(',', ' ').split()
+    conditions = [
+        reduce(operator.or_, (Q(**{f'{field}__icontains': term}) for field in fields))
+        for term in terms
+    ]
+    return reduce(operator.and_, conditions) if conditions else Q()
+
+
+async def _paginate(request, queryset, serialize):
+    """
+    Mirror DRF's PageNumberPagination payload. Returns ``NOT_HANDLED`` for
+    pages DRF would reject so that the sync view produces the error.
+    """
+    page_param = request.GET.get('page', '1')
+    page = _parse_int(page_param)
+    if page is None or page < 1:
+        return NOT_HANDLED
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    count = await queryset.acount()
+    num_pages = max(math.ceil(count / page_size), 1)
+    if page > num_pages:
+        return NOT_HANDLED
+
+    offset = (page - 1) * page_size
+    rows = [obj async for obj in queryset[offset:offset + page_size].aiterator()]
+    next_link, previous_link = page_links(request.build_absolute_uri(), page, num_pages)
+    return {
+        'count': count,
+        'next': next_link,
+        'previous': previous_link,
+        'results': await serialize(rows),
+    }
+
+
+async def _attach_images(projects):
+    """Async stand-in for ``prefetch_related('images')``, which aiterator() rejects."""
+    by_project = {project.pk: [] for project in projects}
+    if by_project:
+        images = ProjectImage.objects.filter(project_id__in=list(by_project)).order_by('order')
+        async for image in images.aiterator():
+            by_project[image.project_id].append(image)
+    for project in projects:
+        project._prefetched_objects_cache = {'images': by_project[project.pk]}
+    return projects
+
+
+def _project_serializer(request):
+    async def serialize(projects):
+        await _attach_images(projects)
+        return ProjectSerializer(projects, many=True, context={'request': request}).data
+    return serialize
+
+
+def _project_queryset():
+    return Project.objects.select_related('category')
+
+
+async def project_list(request):
+    if not _only_params(request, ('page', 'category', 'featured', 'search', 'ordering')):
+        return NOT_HANDLED
+    queryset = _project_queryset()
+    if request.GET.get('category'):
+        category = _parse_int(request.GET['category'])
+        # Unknown ids are a 400 from django-filter; leave that to the sync view.
+        if category is None or not await Category.objects.filter(pk=category).aexists():
+            return NOT_HANDLED
+        queryset = queryset.filter(category_id=category)
+    featured = request.GET.get('featured')
+    if featured:
+        if featured.lower() not in ('true', 'false'):
+            return NOT_HANDLED
+        queryset = queryset.filter(featured=featured.lower() == 'true')
+    queryset = queryset.filter(
+        _search(request, ('title', 'title_ar', 'description', 'description_ar', 'client'))
+    )
+    queryset = queryset.order_by(*_ordering(request, ('date', 'created_at'), ['-date']))
+    data = await _paginate(request, queryset, _project_serializer(request))
+    if data is NOT_HANDLED:
+        return NOT_HANDLED
+    return _json(data, allow='GET, POST, HEAD, OPTIONS')
+
+
+async def project_detail(request, pk):
+    if request.GET or not pk.isdigit():
+        return NOT_HANDLED
+    try:
+        project = await _project_queryset().aget(pk=int(pk))
+    except Project.DoesNotExist:
+        data, status = {'detail': 'Not found.'}, 404
+    else:
+        await _attach_images([project])
+        project.related_links_cache = [link async for link in related_cards(project.pk).aiterator()]
+        data, status = ProjectDetailSerializer(project, context={'request': request}).data, 200
+    return _json(data, status=status, allow='GET, PUT, PATCH, DELETE, HEAD, OPTIONS')
+
+
+async def project_featured(request):
+    if request.GET:
+        return NOT_HANDLED
+    featured = _project_queryset().filter(featured=True)[:settings.FEATURED_PROJECTS_LIMIT]
+    projects = [p async for p in featured.aiterator()]
+    data = await _project_serializer(request)(projects)
+    return _json(data)
+
+
+async def category_list(request):
+    if not _only_params(request, ('page', 'ordering')):
+        return NOT_HANDLED
+    queryset = Category.objects.order_by(*_ordering(request, ('name', 'name_ar', 'created_at'), ['name']))
+
+    async def serialize(categories):
+        return CategorySerializer(categories, many=True, context={'request': request}).data
+
+    data = await _paginate(request, queryset, serialize)
+    if data is NOT_HANDLED:
+        return NOT_HANDLED
+    return _json(data, allow='GET, POST, HEAD, OPTIONS')
+
+
+async def comment_list(request):
+    if not _only_params(request, ('page', 'project', 'user', 'search', 'ordering')):
+        return NOT_HANDLED
+    queryset = Comment.objects.select_related('user')
+    for param, model in (('project', Project), ('user', Comment.user.field.related_model)):
+        if request.GET.get(param):
+            value = _parse_int(request.GET[param])
+            if value is None or not await model.objects.filter(pk=value).aexists():
+                return NOT_HANDLED
+            queryset = queryset.filter(**{f'{param}_id': value})
+    queryset = queryset.filter(_search(request, ('content', 'user__username')))
+    queryset = queryset.order_by(*_ordering(request, ('created_at', 'updated_at'), ['-created_at']))
+
+    async def serialize(comments):
+        return CommentSerializer(comments, many=True, context={'request': request}).data
+
+    data = await _paginate(request, queryset, serialize)
+    if data is NOT_HANDLED:
+        return NOT_HANDLED
+    return _json(data, allow='GET, POST, HEAD, OPTIONS')
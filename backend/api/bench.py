@@ -0,0 +1,206 @@
+"""
+Endpoint latency benchmarks.
+
+``discover_routes`` walks the URL patterns of ``api/urls.py``,
+``run_benchmarks`` drives every route through the Django test client and
+``compare`` checks a run against a baseline. Used by the ``bench``
+management command and by ``api.tests``, which compares a run on
+``DATASET`` with ``BASELINE_PATH``.
+"""
+import math
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from projects.models import Project
+from projects.seeding import SEED_PASSWORD
+
+User = get_user_model()
+
+# The dataset the bench command seeds by default, and the stored baseline's.
+DATASET = {'projects': 100, 'images_per_project': 4, 'comments': 500, 'contacts': 100, 'applications': 100}
+BASELINE_PATH = Path(__file__).resolve().parent / 'bench_baseline.json'
+
+
+class Route:
+    """
+    One request to benchmark. ``data`` (query for GETs, JSON body
+    otherwise) is a function, and ``user`` gets a new access token, for
+    every request, outside the timed part: some tokens are single-use.
+    """
+    def __init__(self, name, method, path, data=None, user=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.data = data
+        self.user = user
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def _walk(patterns):
+    """``(URL name, pattern)`` for every named pattern, including those of included URLconfs."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name, pattern
+
+
+def _methods(callback):
+    """The HTTP methods a view answers, lowercase."""
+    actions = getattr(callback, 'actions', None)
+    if actions:
+        return set(actions)
+    view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+    if view_class is None:
+        return {'get'}
+    return {method for method in view_class.http_method_names if hasattr(view_class, method)} - {'options', 'head'}
+
+
+def _instance(name, callback):
+    """An object for the ``pk`` of a detail route: the first of the view's queryset."""
+    view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+    queryset = getattr(view_class, 'queryset', None)
+    if queryset is None:
+        queryset = DETAIL_QUERYSETS.get(name)
+    return queryset.order_by('pk').first() if queryset is not None else None
+
+
+def _special_routes(user):
+    """Routes that need a body or a query string: URL name -> (method, data, user)."""
+    def refresh():
+        return {'refresh': str(RefreshToken.for_user(user))}
+
+    return {
+        'token_obtain_pair': ('post', lambda: {'email': user.email, 'password': SEED_PASSWORD}, None),
+        'token_refresh': ('post', refresh, None),
+        'logout': ('post', refresh, None),
+        # As the plain user, so that the admin's tokens stay valid.
+        'logout-all': ('post', None, user),
+        'verify-email': ('get', lambda: {'token': str(RefreshToken.for_user(user).access_token)}, None),
+    }
+
+
+# Views without a queryset of their own whose pk is a project's.
+DETAIL_QUERYSETS = {'page-project': Project.objects.all()}
+# Routes not benchmarked: every call to register creates a user and sends an email.
+SKIPPED_ROUTES = {'register'}
+
+
+def discover_routes(admin, user):
+    """
+    A benchmarkable request for every named route in ``api/urls.py``: a
+    GET as ``admin`` where the view has one, and the auth views with the
+    bodies ``_special_routes`` gives them. Format-suffix variants are left out.
+    """
+    from api.urls import urlpatterns
+
+    special = _special_routes(user)
+    routes = []
+    for name, pattern in _walk(urlpatterns):
+        parameters = set(pattern.pattern.regex.groupindex)
+        if name in SKIPPED_ROUTES or 'format' in parameters:
+            continue
+        kwargs = {}
+        if parameters:
+            instance = _instance(name, pattern.callback)
+            if parameters != {'pk'} or instance is None:
+                continue
+            kwargs['pk'] = instance.pk
+        path = reverse(name, kwargs=kwargs)
+        if name in special:
+            method, data, as_user = special[name]
+            routes.append(Route(name, method, path, data=data, user=as_user))
+        elif 'get' in _methods(pattern.callback):
+            routes.append(Route(name, 'get', path, user=admin))
+    return routes
+
+
+def run_route(route, iterations=50, warmup=5):
+    client = Client()
+    call = getattr(client, route.method)
+
+    def prepare():
+        if route.user is not None:
+            token = RefreshToken.for_user(route.user).access_token
+            client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        data = route.data() if route.data else None
+        if route.method == 'get':
+            return {'data': data}
+        return {'data': data, 'content_type': 'application/json'}
+
+    for _ in range(warmup):
+        call(route.path, **prepare())
+
+    timings = []
+    queries = []
+    status = None
+    for _ in range(iterations):
+        kwargs = prepare()
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = call(route.path, **kwargs)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(ctx.captured_queries))
+        status = response.status_code
+
+    timings.sort()
+    return {
+        'method': route.method.upper(),
+        'path': route.path,
+        'status': status,
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'queries': max(queries),
+    }
+
+
+def run_benchmarks(iterations=50, warmup=5, only=None):
+    """Benchmark every discovered route; ``only`` limits the run to route names."""
+    admin = User.objects.filter(is_superuser=True).first() or User.objects.create_superuser(
+        email='bench-admin@example.com', username='bench-admin', password=SEED_PASSWORD,
+    )
+    user = User.objects.filter(is_superuser=False, is_active=True).first() or admin
+    results = {}
+    for route in discover_routes(admin, user):
+        if only and route.name not in only:
+            continue
+        results[route.name] = run_route(route, iterations=iterations, warmup=warmup)
+    return results
+
+
+def compare(results, baseline, tolerance=0.2, floor_ms=1.0):
+    """
+    Return a list of human readable regressions: p95 latency more than
+    ``tolerance`` (and ``floor_ms``) above the baseline, or more queries.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        limit = max(previous['p95_ms'] * (1 + tolerance), previous['p95_ms'] + floor_ms)
+        if current['p95_ms'] > limit:
+            regressions.append(
+                f"{name}: p95 {current['p95_ms']}ms > {previous['p95_ms']}ms baseline"
+            )
+        if current['queries'] > previous['queries']:
+            regressions.append(
+                f"{name}: {current['queries']} queries > {previous['queries']} baseline"
+            )
+    return regressions
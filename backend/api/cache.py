@@ -0,0 +1,368 @@
+"""
+Cache backend shared by every worker process on one host, without a cache
+server: a hash table in a memory-mapped file (on ``/dev/shm`` it never
+touches the disk).
+
+The file holds fixed-size slots in a few size classes (``SIZE_CLASSES``,
+``(slot size, slots)`` pairs). A value goes to the smallest class it fits
+in, pickled and, from 1 KiB on, zlib-compressed if that makes it
+smaller; a value larger than the largest slot isn't cached. Within a
+class a key hashes to one bucket of 8 slots. When a bucket is full, the
+CLOCK algorithm picks the slot to reuse: each read sets a slot's
+reference bit, and the bucket's hand skips (and clears) referenced slots,
+approximating LRU. Expired entries are dropped when they are found and
+reused first.
+
+A bucket is locked with a POSIX record lock on one byte of the file (and
+a lock per process, as record locks don't exclude threads), so
+operations on different keys rarely wait for each other. ``incr``,
+``add`` and ``touch`` are atomic across processes.
+
+Memory is only committed for the pages that hold entries, but a page
+must be backed when it is written: writing one that tmpfs has no room
+for kills the process with SIGBUS. A file that wouldn't fit in the free
+space of its filesystem (Docker's /dev/shm is 64 MB) is therefore
+refused with ``ImproperlyConfigured``, and the default layout takes
+28 MiB at most. The file name carries a digest of the layout: changing
+``SIZE_CLASSES`` starts an empty cache in a new file.
+
+As values are unpickled, the file must be owned by the process's user
+and closed to everyone else (it is created with mode 0600). Any other
+file is refused with ``ImproperlyConfigured``, and a symlink isn't
+followed.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+MAGIC = b'PVCACHE1'
+PAGE = mmap.PAGESIZE
+BUCKET_WIDTH = 8
+# key hash (0: empty slot), expiry (0: never), key length, value length, referenced, flags
+SLOT = struct.Struct('<QdIIBB6x')
+EXPIRES_AT = 8
+REFERENCED_AT = 24
+COMPRESSED = 1
+COMPRESS_MIN = 1024
+# 4 MiB of 1 KiB slots, then 8 MiB each of 16 KiB, 256 KiB and 4 MiB slots.
+DEFAULT_SIZE_CLASSES = ((1024, 4096), (16 * 1024, 512), (256 * 1024, 32), (4 * 1024 * 1024, 2))
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _round_up(size):
+    return -(-size // PAGE) * PAGE
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little') or 1
+
+
+class _SizeClass:
+    def __init__(self, index, slot_size, slots, offset):
+        self.slot_size = slot_size
+        self.capacity = slot_size - SLOT.size
+        self.width = min(BUCKET_WIDTH, slots)
+        self.buckets = slots // self.width
+        # One CLOCK hand (a byte) per bucket, then the slots.
+        self.hands = offset
+        self.slots = offset + _round_up(self.buckets)
+        self.end = self.slots + self.buckets * self.width * slot_size
+        # Record locks live at offsets of their own; they needn't be inside the file.
+        self.locks = (index + 1) << 40
+
+    def bucket(self, key_hash):
+        return key_hash % self.buckets
+
+    def slot_offsets(self, bucket):
+        first = self.slots + bucket * self.width * self.slot_size
+        return range(first, first + self.width * self.slot_size, self.slot_size)
+
+
+class _Table:
+    """The mapped file; one per process and location."""
+
+    def __init__(self, path, size_classes):
+        self.lock = threading.Lock()
+        self.classes = []
+        offset = PAGE
+        for index, (slot_size, slots) in enumerate(size_classes):
+            size_class = _SizeClass(index, slot_size, slots, offset)
+            self.classes.append(size_class)
+            offset = size_class.end
+        self.size = offset
+        self.pid = os.getpid()
+        # Values are unpickled: only a file of our own that nobody else can write will do.
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        stat = os.fstat(self.fd)
+        if stat.st_uid != os.getuid() or stat.st_mode & 0o077:
+            os.close(self.fd)
+            raise ImproperlyConfigured(
+                f'Cache file {path} must belong to uid {os.getuid()} and have no group or other '
+                f'permissions (it has uid {stat.st_uid}, mode {stat.st_mode & 0o777:o}).'
+            )
+        # Pages the file already has are backed; the rest must fit in the free space.
+        free = os.fstatvfs(self.fd)
+        missing = self.size - stat.st_blocks * 512
+        if missing > free.f_bavail * free.f_frsize:
+            os.close(self.fd)
+            raise ImproperlyConfigured(
+                f'Cache file {path} needs {self.size >> 20} MiB, more than its filesystem has free '
+                f'({free.f_bavail * free.f_frsize >> 20} MiB): choose another CACHE_LOCATION or smaller SIZE_CLASSES.'
+            )
+        fcntl.lockf(self.fd, fcntl.LOCK_EX)
+        try:
+            # Created (or left half-initialized) by nobody else: set it up.
+            if os.pread(self.fd, len(MAGIC), 0) != MAGIC or os.fstat(self.fd).st_size < self.size:
+                os.ftruncate(self.fd, self.size)
+                os.pwrite(self.fd, MAGIC, 0)
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN)
+        self.map = mmap.mmap(self.fd, self.size)
+
+    @contextmanager
+    def locked(self, buckets):
+        """Hold the locks of ``(size class, bucket)`` pairs, taken in class order."""
+        with self.lock:
+            held = []
+            try:
+                for size_class, bucket in buckets:
+                    fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, size_class.locks + bucket)
+                    held.append(size_class.locks + bucket)
+                yield
+            finally:
+                for start in held:
+                    fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, start)
+
+    @contextmanager
+    def locked_all(self):
+        with self.lock:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN)
+
+    def buckets(self, key_hash):
+        return [(size_class, size_class.bucket(key_hash)) for size_class in self.classes]
+
+    def find(self, size_class, bucket, key_hash, key, now):
+        """Offset and header of the live slot holding ``key``, or None."""
+        for offset in size_class.slot_offsets(bucket):
+            header = SLOT.unpack_from(self.map, offset)
+            start = offset + SLOT.size
+            if header[0] == key_hash and self.map[start:start + header[2]] == key:
+                if header[1] and header[1] <= now:
+                    self.clear_slot(offset)
+                    return None
+                return offset, header
+        return None
+
+    def find_any(self, key_hash, key, now):
+        for size_class, bucket in self.buckets(key_hash):
+            found = self.find(size_class, bucket, key_hash, key, now)
+            if found:
+                return found
+        return None
+
+    def read_value(self, offset, header):
+        start = offset + SLOT.size + header[2]
+        data = self.map[start:start + header[3]]
+        return zlib.decompress(data) if header[5] & COMPRESSED else data
+
+    def clear_slot(self, offset):
+        SLOT.pack_into(self.map, offset, 0, 0, 0, 0, 0, 0)
+
+    def remove(self, key_hash, key, now):
+        removed = False
+        for size_class, bucket in self.buckets(key_hash):
+            found = self.find(size_class, bucket, key_hash, key, now)
+            if found:
+                self.clear_slot(found[0])
+                removed = True
+        return removed
+
+    def victim(self, size_class, bucket, now):
+        """An empty or expired slot of the bucket, else the one the CLOCK hand picks."""
+        offsets = size_class.slot_offsets(bucket)
+        for offset in offsets:
+            key_hash, expires = SLOT.unpack_from(self.map, offset)[:2]
+            if not key_hash or (expires and expires <= now):
+                return offset
+        hand_at = size_class.hands + bucket
+        hand = self.map[hand_at] % size_class.width
+        while True:
+            offset = offsets[hand]
+            hand = (hand + 1) % size_class.width
+            if self.map[offset + REFERENCED_AT]:  # second chance
+                self.map[offset + REFERENCED_AT] = 0
+            else:
+                self.map[hand_at] = hand
+                return offset
+
+    def store(self, key_hash, key, value, flags, expires, now):
+        """Write ``value`` (see ``_serialize``) for ``key``; False if it fits no slot."""
+        self.remove(key_hash, key, now)
+        for size_class in self.classes:
+            if len(key) + len(value) <= size_class.capacity:
+                offset = self.victim(size_class, size_class.bucket(key_hash), now)
+                start = offset + SLOT.size
+                # Header last, so a slot never looks filled before its data is.
+                self.clear_slot(offset)
+                self.map[start:start + len(key)] = key
+                self.map[start + len(key):start + len(key) + len(value)] = value
+                SLOT.pack_into(self.map, offset, key_hash, expires, len(key), len(value), 1, flags)
+                return True
+        return False
+
+    def clear(self):
+        try:
+            # Zeroes the slots and hands and gives their memory back.
+            self.map.madvise(mmap.MADV_REMOVE, PAGE, self.size - PAGE)
+            return
+        except (AttributeError, OSError):
+            pass
+        for size_class in self.classes:
+            for bucket in range(size_class.buckets):
+                for offset in size_class.slot_offsets(bucket):
+                    self.clear_slot(offset)
+
+
+def _serialize(value):
+    """``(data, flags)`` for a slot."""
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    if len(data) >= COMPRESS_MIN:
+        compressed = zlib.compress(data, 1)
+        if len(compressed) < len(data):
+            return compressed, COMPRESSED
+    return data, 0
+
+
+def _get_table(location, size_classes):
+    layout = repr(size_classes).encode()
+    path = f'{location}-{hashlib.md5(layout).hexdigest()[:8]}'
+    with _tables_lock:
+        table = _tables.get(path)
+        # A forked worker maps the file again instead of sharing its parent's locks.
+        if table is None or table.pid != os.getpid():
+            table = _tables[path] = _Table(path, size_classes)
+        return table
+
+
+class MmapCache(BaseCache):
+    """
+    ``CACHES`` backend; ``LOCATION`` is the path prefix of the file and
+    ``OPTIONS`` may set ``SIZE_CLASSES``.
+    """
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._location = location
+        self._size_classes = tuple(sorted(
+            (int(slot_size), int(slots))
+            for slot_size, slots in options.get('SIZE_CLASSES', DEFAULT_SIZE_CLASSES)
+        ))
+
+    @property
+    def _table(self):
+        return _get_table(self._location, self._size_classes)
+
+    def _key(self, key, version):
+        key = self.make_and_validate_key(key, version=version).encode()
+        return _hash(key), key
+
+    def _expiry(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return 0.0 if expires is None else expires
+
+    def get(self, key, default=None, version=None):
+        key_hash, key = self._key(key, version)
+        table = self._table
+        now = time.time()
+        for size_class, bucket in table.buckets(key_hash):
+            with table.locked([(size_class, bucket)]):
+                found = table.find(size_class, bucket, key_hash, key, now)
+                if found:
+                    table.map[found[0] + REFERENCED_AT] = 1
+                    data = table.read_value(*found)
+                    break
+        else:
+            return default
+        return pickle.loads(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key_hash, key = self._key(key, version)
+        value, flags = _serialize(value)
+        expires = self._expiry(timeout)
+        table = self._table
+        now = time.time()
+        with table.locked(table.buckets(key_hash)):
+            if expires and expires <= now:
+                table.remove(key_hash, key, now)
+            else:
+                table.store(key_hash, key, value, flags, expires, now)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key_hash, key = self._key(key, version)
+        value, flags = _serialize(value)
+        expires = self._expiry(timeout)
+        table = self._table
+        now = time.time()
+        with table.locked(table.buckets(key_hash)):
+            if table.find_any(key_hash, key, now):
+                return False
+            if expires and expires <= now:
+                return True
+            return table.store(key_hash, key, value, flags, expires, now)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key_hash, key = self._key(key, version)
+        expires = self._expiry(timeout)
+        table = self._table
+        now = time.time()
+        with table.locked(table.buckets(key_hash)):
+            found = table.find_any(key_hash, key, now)
+            if not found:
+                return False
+            struct.pack_into('<d', table.map, found[0] + EXPIRES_AT, expires)
+            return True
+
+    def delete(self, key, version=None):
+        key_hash, key = self._key(key, version)
+        table = self._table
+        with table.locked(table.buckets(key_hash)):
+            return table.remove(key_hash, key, time.time())
+
+    def has_key(self, key, version=None):
+        key_hash, key = self._key(key, version)
+        table = self._table
+        with table.locked(table.buckets(key_hash)):
+            return table.find_any(key_hash, key, time.time()) is not None
+
+    def incr(self, key, delta=1, version=None):
+        key_hash, key = self._key(key, version)
+        table = self._table
+        now = time.time()
+        with table.locked(table.buckets(key_hash)):
+            found = table.find_any(key_hash, key, now)
+            if not found:
+                raise ValueError(f"Key '{key.decode()}' not found")
+            value = pickle.loads(table.read_value(*found)) + delta
+            table.store(key_hash, key, *_serialize(value), found[1][1], now)
+        return value
+
+    def clear(self):
+        table = self._table
+        with table.locked_all():
+            table.clear()
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.checks import Info
+
+
+def check_email_backend(app_configs, **kwargs):
+    if settings.DEBUG and settings.EMAIL_BACKEND == 'django.core.mail.backends.console.EmailBackend':
+        return [Info(
+            'Using console email backend (DEBUG=True). Real email credentials not configured.',
+            hint='Set EMAIL_HOST_USER and EMAIL_HOST_PASSWORD to send real email.',
+            id='api.I001',
+        )]
+    return []
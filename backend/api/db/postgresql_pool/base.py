@@ -0,0 +1,100 @@
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+
+from .pool import ConnectionPool, PoolTimeout
+
+POOL_OPTIONS = {
+    'pool_size': int,
+    'pool_timeout': float,
+    'pool_recycle': float,
+    'pool_check_after': float,
+}
+
+# libpq transaction status values (the same in psycopg2 and psycopg 3).
+TRANSACTION_STATUS_IDLE = 0
+TRANSACTION_STATUS_UNKNOWN = 4
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    # Keyed on the target too: test database setup renames NAME on the same alias.
+    key = (alias, *(settings_dict[k] for k in ('NAME', 'USER', 'HOST', 'PORT')))
+    options = settings_dict['OPTIONS']
+    with _pools_lock:
+        if key not in _pools:
+            try:
+                kwargs = {
+                    key[len('pool_'):]: cast(options[key])
+                    for key, cast in POOL_OPTIONS.items() if key in options
+                }
+            except ValueError as e:
+                raise ImproperlyConfigured(f'Invalid pool option for database "{alias}": {e}')
+            _pools[key] = ConnectionPool(alias, **kwargs)
+        return _pools[key]
+
+
+def close_idle_connections():
+    """Close the idle pooled connections of every database, e.g. before forking workers."""
+    for pool in list(_pools.values()):
+        pool.close_idle(lambda connection: connection.close())
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    ``close()`` returns the connection to the pool instead of closing it, so
+    Django's per-request connection handling (``CONN_MAX_AGE = 0``) turns
+    into a checkout per request.
+    """
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for key in POOL_OPTIONS:
+            params.pop(key, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        def connect():
+            connection = super(DatabaseWrapper, self).get_new_connection(conn_params)
+            return connection, self.isolation_level
+
+        try:
+            connection, self.isolation_level = self.pool.borrow(connect, self._ping, self._discard)
+        except PoolTimeout as e:
+            # Surfaces as django.db.utils.OperationalError through wrap_database_errors.
+            raise self.Database.OperationalError(str(e)) from e
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.release(self.connection, self._reset, self._discard)
+
+    @staticmethod
+    def _ping(connection):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+
+    @staticmethod
+    def _reset(connection):
+        if connection.closed:
+            return False
+        status = connection.info.transaction_status
+        if status == TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+        return True
+
+    @staticmethod
+    def _discard(connection):
+        connection.close()
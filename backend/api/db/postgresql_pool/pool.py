@@ -0,0 +1,168 @@
+"""
+A small thread-safe connection pool, independent of the database driver.
+
+The pool hands out at most ``size`` connections. Borrowing waits up to
+``timeout`` seconds for one to be returned, then raises ``PoolTimeout``.
+Idle connections are health-checked with ``ping`` when they have been idle
+longer than ``check_after`` seconds and are replaced once they are older
+than ``recycle`` seconds. Connections inherited across a fork are never
+reused (nor closed, which would tear down the parent's session).
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from api import metrics
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class _Entry:
+    __slots__ = ('connection', 'created', 'released', 'state')
+
+    def __init__(self, connection, state=None):
+        self.connection = connection
+        self.created = self.released = time.monotonic()
+        # Whatever the creator wants to remember about the connection.
+        self.state = state
+
+
+class ConnectionPool:
+    def __init__(self, alias, size=10, timeout=30.0, recycle=3600.0, check_after=1.0):
+        self.alias = alias
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.check_after = check_after
+        self._inherited = []
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._in_use = {}
+        self._opening = 0
+        metrics.DB_POOL_MAX.set(self.size, alias=self.alias)
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._inherited.extend(entry.connection for entry in self._idle)
+            self._inherited.extend(entry.connection for entry in self._in_use.values())
+            self._reset()
+
+    def _report(self):
+        metrics.DB_POOL_CONNECTIONS.set(len(self._in_use), alias=self.alias, state='in_use')
+        metrics.DB_POOL_CONNECTIONS.set(len(self._idle), alias=self.alias, state='idle')
+
+    @property
+    def stats(self):
+        return {'size': self.size, 'in_use': len(self._in_use), 'idle': len(self._idle)}
+
+    def borrow(self, connect, ping, close):
+        """
+        Return ``(connection, state)``. ``connect()`` opens a new connection
+        and returns ``(connection, state)``; ``ping(connection)`` raises if
+        it is unusable and ``close(connection)`` discards it.
+        """
+        self._check_fork()
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            entry = self._wait_for_slot(deadline)
+            if entry is None or self._healthy(entry, ping, close):
+                break
+        metrics.DB_POOL_WAIT.observe(time.monotonic() - start, alias=self.alias)
+
+        if entry is None:
+            try:
+                entry = _Entry(*connect())
+            finally:
+                with self._cond:
+                    self._opening -= 1
+                    if entry is not None:
+                        self._in_use[id(entry.connection)] = entry
+                    self._cond.notify()
+        self._report()
+        return entry.connection, entry.state
+
+    def _wait_for_slot(self, deadline):
+        """Return an idle entry (now in use), or None with a slot reserved for a new connection."""
+        with self._cond:
+            while True:
+                if self._idle:
+                    # LIFO keeps a warm core busy and lets surplus connections age out.
+                    entry = self._idle.pop()
+                    self._in_use[id(entry.connection)] = entry
+                    return entry
+                if len(self._in_use) + self._opening < self.size:
+                    self._opening += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    metrics.DB_POOL_TIMEOUTS.inc(alias=self.alias)
+                    raise PoolTimeout(
+                        f'No free connection in the "{self.alias}" pool '
+                        f'(size {self.size}) after {self.timeout}s'
+                    )
+                self._cond.wait(remaining)
+
+    def _healthy(self, entry, ping, close):
+        now = time.monotonic()
+        healthy = now - entry.created <= self.recycle
+        if healthy and now - entry.released > self.check_after:
+            try:
+                ping(entry.connection)
+            except Exception:
+                healthy = False
+        if not healthy:
+            self._discard(entry, close)
+        return healthy
+
+    def _discard(self, entry, close):
+        with self._cond:
+            self._in_use.pop(id(entry.connection), None)
+            self._cond.notify()
+        try:
+            close(entry.connection)
+        except Exception:
+            pass
+
+    def release(self, connection, reset, close):
+        """
+        Give ``connection`` back. ``reset(connection)`` returns it to a clean
+        state and returns False if it should be discarded instead.
+        """
+        if self._pid != os.getpid():
+            return
+        entry = self._in_use.get(id(connection))
+        if entry is None:
+            close(connection)
+            return
+        try:
+            reusable = reset(connection) and time.monotonic() - entry.created <= self.recycle
+        except Exception:
+            reusable = False
+        if reusable:
+            with self._cond:
+                del self._in_use[id(connection)]
+                entry.released = time.monotonic()
+                self._idle.append(entry)
+                self._cond.notify()
+        else:
+            self._discard(entry, close)
+        self._report()
+
+    def close_idle(self, close):
+        """Close every idle connection, e.g. in a master process before forking."""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for entry in idle:
+            try:
+                close(entry.connection)
+            except Exception:
+                pass
+        self._report()
@@ -0,0 +1,104 @@
+"""
+Single-locale ("?lang=") mode for the bilingual serializers.
+
+By default responses carry both languages (``title`` and ``title_ar``).
+With ``?lang=en`` or ``?lang=ar`` only one set is returned, under the
+English field names, and the other language's columns are deferred in
+the query. ``?lang=auto`` picks the language from ``Accept-Language``
+and adds ``Vary: Accept-Language`` to the response.
+
+Serializers opt in with ``LocalizedSerializerMixin`` and a
+``Meta.localized_fields`` mapping of English to Arabic field names;
+viewsets with ``LocalizedViewSetMixin``.
+"""
+from django.utils.cache import patch_vary_headers
+from django.utils.translation.trans_real import parse_accept_lang_header
+
+LANGUAGES = ('en', 'ar')
+DEFAULT_LANGUAGE = 'en'
+
+
+def negotiate(request):
+    """
+    Return ``(language, varies)`` for a request: ``language`` is None for the
+    bilingual default; ``varies`` tells whether it came from Accept-Language.
+    """
+    requested = request.GET.get('lang')
+    if requested in LANGUAGES:
+        return requested, False
+    if requested != 'auto':
+        return None, False
+    for code, quality in parse_accept_lang_header(request.META.get('HTTP_ACCEPT_LANGUAGE', '')):
+        primary = code.split('-')[0].lower()
+        if primary in LANGUAGES and quality > 0:
+            return primary, True
+    return DEFAULT_LANGUAGE, True
+
+
+class LocalizedSerializerMixin:
+    """
+    Keep only the ``context['lang']`` variant of each ``Meta.localized_fields``
+    pair, output under the English name. Dropped fields are never read, so
+    their columns can be deferred.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        lang = self.context.get('lang')
+        if lang is None:
+            return fields
+        for name, name_ar in self.Meta.localized_fields.items():
+            field_ar = fields.pop(name_ar, None)
+            if lang == 'ar' and field_ar is not None:
+                field_ar.source = field_ar.source or name_ar
+                fields[name] = field_ar
+        # Restore the declared order (a popped/replaced key moves to the end).
+        return {key: fields[key] for key in self.Meta.fields if key in fields}
+
+    @classmethod
+    def localized_columns(cls, lang):
+        """ORM paths of the other language's columns, for ``QuerySet.defer()``."""
+        declared = cls._declared_fields
+        columns = []
+        for name, name_ar in cls.Meta.localized_fields.items():
+            unused = name_ar if lang == 'en' else name
+            field = declared.get(unused)
+            source = field.source if field is not None and field.source else unused
+            columns.append(source.replace('.', '__'))
+        return columns
+
+
+class LocalizedViewSetMixin:
+    """Pass the negotiated language to the serializer and defer unused columns on reads."""
+
+    @property
+    def language(self):
+        """``(language, varies)`` for this request; writes always use both languages."""
+        if not hasattr(self, '_language'):
+            if self.request.method in ('GET', 'HEAD'):
+                self._language = negotiate(self.request)
+            else:
+                self._language = (None, False)
+        return self._language
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        lang = self.language[0]
+        serializer_class = self.get_serializer_class()
+        if lang and hasattr(serializer_class, 'localized_columns'):
+            queryset = queryset.defer(*serializer_class.localized_columns(lang))
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['lang'] = self.language[0]
+        return context
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        lang, varies = self.language
+        if lang:
+            response['Content-Language'] = lang
+        if varies:
+            patch_vary_headers(response, ('Accept-Language',))
+        return response
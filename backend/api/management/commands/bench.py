@@ -0,0 +1,72 @@
+import json
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from api.bench import DATASET, compare, run_benchmarks
+from projects.seeding import seed_dataset
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every API route against a seeded test database and compare with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=DATASET['projects'])
+        parser.add_argument('--images', type=int, default=DATASET['images_per_project'], help='Gallery images per project')
+        parser.add_argument('--comments', type=int, default=DATASET['comments'])
+        parser.add_argument('--contacts', type=int, default=DATASET['contacts'])
+        parser.add_argument('--applications', type=int, default=DATASET['applications'])
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--route', action='append', dest='routes', help='Only run the named route (repeatable)')
+        parser.add_argument('--output', help='Write results as JSON to this file')
+        parser.add_argument('--baseline', help='Fail if any route regresses past this results file')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 slowdown (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        # Always run against a throwaway test database, never the configured one.
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            counts = seed_dataset(
+                projects=options['projects'],
+                images_per_project=options['images'],
+                comments=options['comments'],
+                contacts=options['contacts'],
+                applications=options['applications'],
+            )
+            self.stdout.write(f'Seeded: {counts}')
+            # Keys of their own, so that nothing cached for the real database is served.
+            caches = {'default': {**settings.CACHES['default'], 'KEY_PREFIX': f'bench-{uuid.uuid4().hex}'}}
+            with override_settings(SERVER_TIMING_SAMPLE_RATE=0.0, METRICS_ENABLED=False, CACHES=caches):
+                results = run_benchmarks(
+                    iterations=options['iterations'],
+                    warmup=options['warmup'],
+                    only=options['routes'],
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'route':<32}{'status':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'queries':>9}")
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<32}{r['status']:>7}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['queries']:>9}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump({'dataset': counts, 'results': results}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)['results']
+            regressions = compare(results, baseline, tolerance=options['tolerance'])
+            if regressions:
+                raise CommandError('Benchmark regressions:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline.'))
@@ -0,0 +1,84 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bench import percentile
+
+
+async def _request(host, port, path, read_delay, chunk_size):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f'GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: application/json\r\n'
+            f'Connection: close\r\n\r\n'.encode()
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        # Simulate a slow client: drain the response a small chunk at a time.
+        while True:
+            chunk = await reader.read(chunk_size)
+            if not chunk:
+                break
+            if read_delay:
+                await asyncio.sleep(read_delay)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def _worker(host, port, path, deadline, read_delay, chunk_size, latencies, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            status = await _request(host, port, path, read_delay, chunk_size)
+        except OSError:
+            errors.append('connection')
+            await asyncio.sleep(0.05)
+            continue
+        if status != 200:
+            errors.append(status)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive a running server with many concurrent, slow-reading clients and report '
+        'throughput, e.g. to compare the gunicorn WSGI and uvicorn ASGI deployments'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Full URL to request, e.g. http://127.0.0.1:8000/api/projects/')
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--duration', type=float, default=20, help='Seconds to run')
+        parser.add_argument('--read-delay', type=float, default=0.05,
+                            help='Seconds to wait between response chunks (slow client)')
+        parser.add_argument('--chunk-size', type=int, default=1024)
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http':
+            raise CommandError('Only plain http:// URLs are supported.')
+        path = url.path + (f'?{url.query}' if url.query else '')
+        latencies = []
+        errors = []
+
+        async def run():
+            deadline = time.perf_counter() + options['duration']
+            await asyncio.gather(*(
+                _worker(url.hostname, url.port or 80, path, deadline,
+                        options['read_delay'], options['chunk_size'], latencies, errors)
+                for _ in range(options['concurrency'])
+            ))
+
+        started = time.perf_counter()
+        asyncio.run(run())
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        self.stdout.write(
+            f"{len(latencies)} requests in {elapsed:.1f}s with {options['concurrency']} clients: "
+            f"{len(latencies) / elapsed:.1f} req/s, p50 {percentile(latencies, 50):.0f}ms, "
+            f"p95 {percentile(latencies, 95):.0f}ms, p99 {percentile(latencies, 99):.0f}ms, "
+            f"{len(errors)} errors"
+        )
@@ -0,0 +1,89 @@
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: load the WSGI app exactly as a server would,
+# then serve one request through it.
+FIRST_REQUEST_SCRIPT = '''
+import json, os, sys, time
+from wsgiref.util import setup_testing_defaults
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pervasion.settings')
+from pervasion.wsgi import application
+loaded = time.perf_counter()
+environ = {
+    'PATH_INFO': sys.argv[1], 'HTTP_HOST': sys.argv[2],
+    'HTTP_ACCEPT': 'application/json', 'HTTP_X_FORWARDED_PROTO': 'https',
+}
+setup_testing_defaults(environ)
+statuses = []
+b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+done = time.perf_counter()
+print(json.dumps({
+    'load_ms': (loaded - started) * 1000,
+    'first_request_ms': (done - loaded) * 1000,
+    'status': statuses[0],
+}))
+'''
+
+
+def parse_importtime(stderr):
+    """Parse ``python -X importtime`` output into ``(module, self_us, cumulative_us)``."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure cold start: an import-time breakdown of loading the WSGI app '
+        '(python -X importtime) and the time to serve the first request'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/categories/', help='Path of the first request')
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to time')
+        parser.add_argument('--top', type=int, default=15, help='Rows to show per breakdown')
+
+    def handle(self, *args, **options):
+        host = next((h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')), 'localhost')
+        command = [sys.executable, '-X', 'importtime', '-c', FIRST_REQUEST_SCRIPT, options['path'], host]
+
+        runs = []
+        for _ in range(options['runs']):
+            proc = subprocess.run(command, capture_output=True, text=True, cwd=settings.BASE_DIR)
+            if proc.returncode != 0:
+                raise CommandError(f'Startup failed:\n{proc.stderr[-2000:]}')
+            runs.append((json.loads(proc.stdout.strip().splitlines()[-1]), parse_importtime(proc.stderr)))
+
+        # The import breakdown comes from the last run, when the disk cache is warm.
+        imports = runs[-1][1]
+        by_package = defaultdict(int)
+        for module, self_us, _ in imports:
+            by_package[module.split('.')[0]] += self_us
+        total_us = sum(self_us for _, self_us, _ in imports)
+
+        self.stdout.write(f'{len(imports)} modules imported, {total_us / 1000:.1f}ms total\n')
+        self.stdout.write('By top-level package (self time):')
+        for package, us in sorted(by_package.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {us / 1000:8.1f}ms  {us / total_us:6.1%}  {package}')
+        self.stdout.write('\nSlowest modules (self time):')
+        for module, self_us, cumulative_us in sorted(imports, key=lambda row: -row[1])[:options['top']]:
+            self.stdout.write(f'  {self_us / 1000:8.1f}ms  (cumulative {cumulative_us / 1000:.1f}ms)  {module}')
+
+        timings = [timing for timing, _ in runs]
+        self.stdout.write(
+            f"\nMedian of {len(timings)} runs (importtime adds overhead): "
+            f"load app {statistics.median(t['load_ms'] for t in timings):.0f}ms, "
+            f"first request {statistics.median(t['first_request_ms'] for t in timings):.0f}ms "
+            f"({timings[-1]['status']} for {options['path']})"
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api.snapshot import publish
+
+
+class Command(BaseCommand):
+    help = 'Render the public portfolio endpoints to a new static JSON snapshot and make it live'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', help='Public origin of the API (defaults to SNAPSHOT_BASE_URL)')
+        parser.add_argument('--keep', type=int, help='Versions to keep (defaults to SNAPSHOT_KEEP_VERSIONS)')
+
+    def handle(self, *args, **options):
+        def progress(done):
+            self.stdout.write(f'  {done} projects')
+
+        manifest = publish(base_url=options['base_url'], keep=options['keep'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Published {manifest['version']}: {manifest['files']} files, "
+            f"{manifest['bytes'] / 1e6:.1f} MB, {manifest['projects']} projects"
+        ))
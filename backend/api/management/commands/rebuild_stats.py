@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily rollups behind /api/stats/ from the underlying tables'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {rows} daily stat rows in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.retention import apply, policies
+
+
+class Command(BaseCommand):
+    help = (
+        'Archive and delete old contacts, job applications and comments, and purge '
+        'unverified users and expired token revocations, in small batches (see api/retention.py)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'policies', nargs='*', metavar='policy',
+            help='Policies to run (default: all enabled ones)',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows deleted per statement')
+        parser.add_argument('--sleep', type=float, default=0.1, help='Seconds to pause between batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows are due')
+
+    def handle(self, *args, **options):
+        available = {policy.name: policy for policy in policies()}
+        unknown = set(options['policies']) - set(available)
+        if unknown:
+            raise CommandError(f"Unknown policies: {', '.join(sorted(unknown))}. Choose from {', '.join(available)}.")
+        selected = [available[name] for name in options['policies']] or [
+            policy for policy in available.values() if policy.enabled
+        ]
+
+        for policy in selected:
+            if not policy.enabled:
+                self.stdout.write(self.style.WARNING(f'{policy.name}: disabled (max age 0)'))
+                continue
+            if options['dry_run']:
+                self.stdout.write(f'{policy.name}: {policy.queryset().count()} rows due')
+                continue
+
+            def progress(done, name=policy.name):
+                if done % (options['batch_size'] * 20) == 0:
+                    self.stdout.write(f'  {name}: {done}')
+
+            deleted, seconds = apply(
+                policy, batch_size=options['batch_size'], pause=options['sleep'], progress=progress,
+            )
+            rate = deleted / seconds if seconds else 0
+            action = 'archived and deleted' if policy.archive else 'deleted'
+            self.stdout.write(self.style.SUCCESS(
+                f'{policy.name}: {action} {deleted} rows in {seconds:.1f}s ({rate:.0f} rows/s)'
+            ))
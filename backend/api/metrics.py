@@ -0,0 +1,344 @@
+"""
+Prometheus-format metrics shared across pre-forked workers.
+
+Every process writes its samples into its own mmap-backed file under
+``METRICS_DIR`` (one float per sample key, updated in place). The
+``/metrics`` endpoint reads and sums the files of all workers, so no
+external agent or shared lock is needed. Gauges are summed over live
+processes only, so a worker's pool size disappears when it exits.
+
+The file of a process that has exited is folded into ``archive.db``
+(its counters and histograms; its gauges are dropped) and removed,
+either by gunicorn's ``child_exit`` hook or by the next ``collect()``,
+so recycled workers don't leave files behind under any server.
+"""
+import fcntl
+import glob
+import json
+import mmap
+import os
+import shutil
+import struct
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+_HEADER = struct.Struct('I')     # bytes used
+_KEY_LEN = struct.Struct('I')
+_VALUE = struct.Struct('d')
+_INITIAL_SIZE = 64 * 1024
+
+
+class MmapValueStore:
+    """
+    Append-only ``key -> float`` store in a memory-mapped file.
+
+    Layout: a 4 byte "used" header (padded to 8), followed by entries of
+    ``[key length][utf-8 key, padded to 8 bytes][float64]``. Values are
+    8-byte aligned, so concurrent readers never see a torn float.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        exists = os.path.exists(path)
+        self._file = open(path, 'a+b')
+        if not exists or os.path.getsize(path) == 0:
+            self._file.truncate(_INITIAL_SIZE)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        self._used = _HEADER.unpack_from(self._mm, 0)[0] or 8
+        self._positions = {key: pos for key, value, pos in self._iter(self._mm, self._used)}
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    @staticmethod
+    def _iter(buf, used):
+        pos = 8
+        while pos < used:
+            length = _KEY_LEN.unpack_from(buf, pos)[0]
+            pos += _KEY_LEN.size
+            key = bytes(buf[pos:pos + length]).decode('utf-8')
+            pos += length + (-(length + _KEY_LEN.size) % 8)
+            yield key, _VALUE.unpack_from(buf, pos)[0], pos
+            pos += _VALUE.size
+
+    def _allocate(self, key):
+        encoded = key.encode('utf-8')
+        padding = -(len(encoded) + _KEY_LEN.size) % 8
+        size = _KEY_LEN.size + len(encoded) + padding + _VALUE.size
+        while self._used + size > len(self._mm):
+            new_size = len(self._mm) * 2
+            self._mm.close()
+            self._file.truncate(new_size)
+            self._mm = mmap.mmap(self._file.fileno(), new_size)
+        pos = self._used
+        _KEY_LEN.pack_into(self._mm, pos, len(encoded))
+        self._mm[pos + _KEY_LEN.size:pos + _KEY_LEN.size + len(encoded)] = encoded
+        value_pos = pos + _KEY_LEN.size + len(encoded) + padding
+        _VALUE.pack_into(self._mm, value_pos, 0.0)
+        self._used += size
+        _HEADER.pack_into(self._mm, 0, self._used)
+        self._positions[key] = value_pos
+        return value_pos
+
+    def inc(self, key, amount):
+        pos = self._positions.get(key)
+        if pos is None:
+            pos = self._allocate(key)
+        _VALUE.pack_into(self._mm, pos, _VALUE.unpack_from(self._mm, pos)[0] + amount)
+
+    def set(self, key, value):
+        pos = self._positions.get(key)
+        if pos is None:
+            pos = self._allocate(key)
+        _VALUE.pack_into(self._mm, pos, value)
+
+    @classmethod
+    def read_file(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < 8:
+            return []
+        used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+        return [(key, value) for key, value, pos in cls._iter(data, used)]
+
+
+class _ProcessStore:
+    """Lazily opens this process's value file, reopening after a fork."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._store = None
+
+    def _get(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            os.makedirs(settings.METRICS_DIR, exist_ok=True)
+            self._store = MmapValueStore(os.path.join(settings.METRICS_DIR, f'metrics_{pid}.db'))
+            self._pid = pid
+        return self._store
+
+    def inc(self, key, amount):
+        with self._lock:
+            self._get().inc(key, amount)
+
+    def set(self, key, value):
+        with self._lock:
+            self._get().set(key, value)
+
+
+_store = _ProcessStore()
+REGISTRY = {}
+
+
+def _sample_key(name, labels):
+    return json.dumps([name, sorted(labels.items())], separators=(',', ':'))
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY[name] = self
+
+    def _labels(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return {key: str(value) for key, value in labels.items()}
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if settings.METRICS_ENABLED:
+            _store.inc(_sample_key(f'{self.name}_total', self._labels(labels)), amount)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        if not settings.METRICS_ENABLED:
+            return
+        labels = self._labels(labels)
+        # Buckets are stored non-cumulatively and summed up on exposition.
+        bound = next(b for b in self.buckets if value <= b)
+        _store.inc(_sample_key(f'{self.name}_bucket', {**labels, 'le': _format_value(bound)}), 1)
+        _store.inc(_sample_key(f'{self.name}_sum', labels), value)
+        _store.inc(_sample_key(f'{self.name}_count', labels), 1)
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        if settings.METRICS_ENABLED:
+            _store.set(_sample_key(self.name, self._labels(labels)), value)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def _pid(path):
+    return int(os.path.basename(path)[len('metrics_'):-len('.db')])
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _gauges():
+    return {name for name, metric in REGISTRY.items() if isinstance(metric, Gauge)}
+
+
+@contextmanager
+def _archive_lock(operation):
+    """Exclusive while the archive changes, shared while the files are read."""
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    with open(os.path.join(settings.METRICS_DIR, '.archive.lock'), 'a') as lock:
+        fcntl.flock(lock, operation)
+        yield
+
+
+def archive_process(pid):
+    """Fold the file of the exited process ``pid`` into the archive and remove it."""
+    path = os.path.join(settings.METRICS_DIR, f'metrics_{pid}.db')
+    gauges = _gauges()
+    with _archive_lock(fcntl.LOCK_EX):
+        try:
+            values = MmapValueStore.read_file(path)
+        except FileNotFoundError:
+            return  # archived by another process meanwhile
+        archive = MmapValueStore(os.path.join(settings.METRICS_DIR, 'archive.db'))
+        try:
+            for key, value in values:
+                if json.loads(key)[0] not in gauges:
+                    archive.inc(key, value)
+        finally:
+            archive.close()
+        os.remove(path)
+
+
+def _worker_files():
+    return glob.glob(os.path.join(settings.METRICS_DIR, 'metrics_*.db'))
+
+
+def collect():
+    """Sum the samples of every worker file: ``{sample name: {labels tuple: value}}``."""
+    for path in _worker_files():
+        if not _process_alive(_pid(path)):
+            archive_process(_pid(path))
+    samples = defaultdict(lambda: defaultdict(float))
+    # Shared: a file being archived is counted either in itself or in the archive, never twice.
+    with _archive_lock(fcntl.LOCK_SH):
+        for path in _worker_files() + [os.path.join(settings.METRICS_DIR, 'archive.db')]:
+            try:
+                values = MmapValueStore.read_file(path)
+            except OSError:
+                continue
+            for key, value in values:
+                name, labels = json.loads(key)
+                samples[name][tuple(tuple(pair) for pair in labels)] += value
+    return samples
+
+
+def render_text():
+    """Render all registered metrics in the Prometheus text exposition format."""
+    samples = collect()
+    lines = []
+    for metric in REGISTRY.values():
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        if isinstance(metric, Histogram):
+            buckets = samples.get(f'{metric.name}_bucket', {})
+            series = defaultdict(dict)
+            for labels, value in buckets.items():
+                base = tuple(pair for pair in labels if pair[0] != 'le')
+                series[base][dict(labels)['le']] = value
+            for base in sorted(series):
+                cumulative = 0.0
+                for bound in metric.buckets:
+                    le = _format_value(bound)
+                    cumulative += series[base].get(le, 0.0)
+                    labels = tuple(sorted(base + (('le', le),)))
+                    lines.append(f'{metric.name}_bucket{_format_labels(labels)} {_format_value(cumulative)}')
+                for suffix in ('sum', 'count'):
+                    value = samples.get(f'{metric.name}_{suffix}', {}).get(base, 0.0)
+                    lines.append(f'{metric.name}_{suffix}{_format_labels(base)} {_format_value(value)}')
+        else:
+            sample_name = f'{metric.name}_total' if metric.type == 'counter' else metric.name
+            for labels, value in sorted(samples.get(sample_name, {}).items()):
+                lines.append(f'{sample_name}{_format_labels(labels)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def clear_metrics_dir():
+    """Remove worker files from a previous run; call once before workers start."""
+    shutil.rmtree(settings.METRICS_DIR, ignore_errors=True)
+
+
+REQUESTS = Counter(
+    'http_requests', 'HTTP requests by view action, method and status code.',
+    ['view', 'method', 'status'],
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by view action.',
+    ['view'], buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    'db_queries_per_request', 'Database queries issued per request by view action.',
+    ['view'], buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+UPLOAD_SIZE = Histogram(
+    'http_upload_size_bytes', 'Size of multipart uploads by view action.',
+    ['view'], buckets=(1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 2.5e7, 5e7, 1e8),
+)
+DB_POOL_CONNECTIONS = Gauge(
+    'db_pool_connections', 'Pooled database connections by state (in_use, idle).',
+    ['alias', 'state'],
+)
+DB_POOL_MAX = Gauge(
+    'db_pool_max_connections', 'Configured pool size; utilization is in_use / max.',
+    ['alias'],
+)
+DB_POOL_WAIT = Histogram(
+    'db_pool_wait_seconds', 'Time spent waiting to borrow a pooled connection.',
+    ['alias'], buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30),
+)
+DB_POOL_TIMEOUTS = Counter(
+    'db_pool_timeouts', 'Checkouts that gave up waiting for a free pooled connection.',
+    ['alias'],
+)
@@ -0,0 +1,269 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from whitenoise.base import WhiteNoise
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+from . import metrics, routers, snapshot
+from .timing import RequestTimer, activate, instrument_queries, view_label
+
+timing_logger = logging.getLogger('api.timing')
+
+
+class ObservingMiddleware:
+    """
+    Base for middleware that wraps the rest of the stack and works in both
+    WSGI and ASGI mode without a thread hop. Subclasses implement
+    ``observe(request)`` (a context manager around the inner call) and
+    ``finish(request, state, response)``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self.observe(request) as state:
+            response = self.get_response(request)
+        return self.finish(request, state, response)
+
+    async def __acall__(self, request):
+        with self.observe(request) as state:
+            response = await self.get_response(request)
+        return self.finish(request, state, response)
+
+    def observe(self, request):
+        return nullcontext()
+
+    def finish(self, request, state, response):
+        return response
+
+
+class ServerTimingMiddleware(ObservingMiddleware):
+    """
+    Record DB, serializer, render and total time for a sample of requests.
+
+    Sampled responses carry a ``Server-Timing`` header and a structured
+    ``api.timing`` log record tagged with the view label
+    (e.g. ``ProjectViewSet.list``). Place it first in ``MIDDLEWARE`` so the
+    total covers the rest of the stack.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 0.0)
+
+    @contextmanager
+    def observe(self, request):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            yield None
+            return
+        timer = RequestTimer()
+        request._timer = timer
+        with activate(timer), instrument_queries(timer.record_query):
+            yield timer
+
+    def finish(self, request, timer, response):
+        if timer is None:
+            return response
+        total = timer.total
+        response['Server-Timing'] = timer.server_timing(total)
+        record = timer.as_dict(total)
+        record.update(method=request.method, path=request.path, status=response.status_code)
+        timing_logger.info(
+            '%s %s %s %.2fms (%d queries)',
+            record['view'], request.method, response.status_code,
+            record['total_ms'], record['db_queries'],
+            extra={'timing': record},
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timer = getattr(request, '_timer', None)
+        if timer is not None:
+            timer.label = view_label(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered by the handler right after this hook.
+        timer = getattr(request, '_timer', None)
+        if timer is not None:
+            start = time.perf_counter()
+            response.add_post_render_callback(
+                lambda r: timer.add('render', time.perf_counter() - start)
+            )
+        return response
+
+
+class MetricsMiddleware(ObservingMiddleware):
+    """Feed request count, latency, query count and upload size into ``api.metrics``."""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    @contextmanager
+    def observe(self, request):
+        state = {'queries': 0, 'start': time.perf_counter()}
+
+        def count_query(execute, sql, params, many, context):
+            state['queries'] += 1
+            return execute(sql, params, many, context)
+
+        with instrument_queries(count_query):
+            yield state
+
+    def finish(self, request, state, response):
+        elapsed = time.perf_counter() - state['start']
+        view = getattr(request, '_metrics_view', 'unmatched')
+        metrics.REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        metrics.REQUEST_LATENCY.observe(elapsed, view=view)
+        metrics.REQUEST_QUERIES.observe(state['queries'], view=view)
+        if request.content_type == 'multipart/form-data':
+            metrics.UPLOAD_SIZE.observe(int(request.META.get('CONTENT_LENGTH') or 0), view=view)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view = view_label(view_func, request.method)
+
+
+class ReplicaRoutingMiddleware(ObservingMiddleware):
+    """
+    Let safe-method requests read from the replicas (see ``api.routers``)
+    unless the client wrote recently. Any other request pins the client to
+    the primary for ``REPLICA_PIN_SECONDS`` via a cookie and the
+    ``X-DB-Pin`` response header, which API clients echo back.
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        if not routers.replica_aliases():
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def observe(self, request):
+        return routers.replica_reads(
+            request.method in self.safe_methods and not routers.pinned_to_primary(request)
+        )
+
+    def finish(self, request, state, response):
+        if request.method not in self.safe_methods:
+            until = str(int(time.time() + settings.REPLICA_PIN_SECONDS))
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, until, max_age=settings.REPLICA_PIN_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax',
+            )
+            response['X-DB-Pin'] = until
+        return response
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoise with async support. The stock middleware is sync-only, which
+    forces every view behind it (including the async read views) into a
+    worker thread under ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, **kwargs):
+        super().__init__(get_response, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class SnapshotMiddleware:
+    """
+    Answer anonymous JSON reads of the public portfolio from the published
+    snapshot (see ``api.snapshot``) through WhiteNoise, without touching the
+    database. Requests the snapshot doesn't cover, from another host than
+    it was rendered for, or from clients reading their own writes fall
+    through to the views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SNAPSHOT_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self._lock = threading.Lock()
+        self._version = (None, None, None)  # (version dir, manifest, WhiteNoise)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        static_file = self.find_file(request)
+        if static_file is not None:
+            return BaseWhiteNoiseMiddleware.serve(static_file, request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        static_file = self.find_file(request)
+        if static_file is not None:
+            return BaseWhiteNoiseMiddleware.serve(static_file, request)
+        return await self.get_response(request)
+
+    def find_file(self, request):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or 'HTTP_AUTHORIZATION' in request.META
+            or 'text/html' in request.META.get('HTTP_ACCEPT', '')
+            or routers.pinned_to_primary(request)
+        ):
+            return None
+        url = snapshot.snapshot_path(request.path_info, request.GET)
+        if url is None:
+            return None
+        manifest, files = self._current()
+        if manifest is None or manifest['base_url'] != f'{request.scheme}://{request.get_host()}':
+            return None
+        return files.get(url)
+
+    def _current(self):
+        version_dir = snapshot.current_version_dir()
+        if version_dir is None:
+            return None, None
+        loaded_dir, manifest, files = self._version
+        if loaded_dir != version_dir:
+            with self._lock:
+                loaded_dir, manifest, files = self._version
+                if loaded_dir != version_dir:
+                    # New version went live: index its files once.
+                    manifest = snapshot.read_manifest(version_dir)
+                    whitenoise = WhiteNoise(
+                        None, max_age=settings.SNAPSHOT_MAX_AGE, allow_all_origins=False,
+                        add_headers_function=lambda headers, path, url: headers.__setitem__(
+                            'X-Snapshot-Version', manifest['version']),
+                    )
+                    whitenoise.add_files(version_dir, prefix='/')
+                    files = whitenoise.files
+                    self._version = (version_dir, manifest, files)
+        return manifest, files
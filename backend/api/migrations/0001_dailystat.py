@@ -0,0 +1,32 @@
+# Generated by Django 4.2.10 on 2026-10-19 14:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=100, verbose_name='metric')),
+                ('day', models.DateField(verbose_name='day')),
+                ('count', models.IntegerField(default=0, verbose_name='count')),
+            ],
+            options={
+                'verbose_name': 'daily stat',
+                'verbose_name_plural': 'daily stats',
+                'ordering': ['metric', 'day'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailystat',
+            constraint=models.UniqueConstraint(fields=('metric', 'day'), name='unique_daily_stat'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    from api.stats import rebuild
+
+    rebuild(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_dailystat'),
+        # Every model and field api.stats.METRICS counts.
+        ('comments', '0001_initial'),
+        ('contact', '0001_initial'),
+        ('jobapplicant', '0001_initial'),
+        ('projects', '0001_initial'),
+        ('users', '0002_user_email_verified_alter_user_is_active'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
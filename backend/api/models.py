@@ -1,3 +1,24 @@
 from django.db import models
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+
+class DailyStat(models.Model):
+    """
+    Number of rows matching ``metric`` created on ``day``, maintained
+    incrementally by ``api.stats``. Summing a metric over all days gives
+    its total.
+    """
+    metric = models.CharField(_('metric'), max_length=100)
+    day = models.DateField(_('day'))
+    count = models.IntegerField(_('count'), default=0)
+
+    class Meta:
+        verbose_name = _('daily stat')
+        verbose_name_plural = _('daily stats')
+        ordering = ['metric', 'day']
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'day'], name='unique_daily_stat'),
+        ]
+
+    def __str__(self):
+        return f'{self.metric} {self.day}: {self.count}'
@@ -0,0 +1,117 @@
+"""
+Bundled page payloads for the SPA, cached as a whole.
+
+Every cached page is stored under the current "pages version"; any change
+to a project, image, category or comment bumps the version (see
+``api.signals``), which invalidates all pages at once without having to
+know which pages a change affects. ``PAGE_CACHE_TIMEOUT`` bounds
+staleness for changes that bypass signals (``update()``, raw SQL).
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, prefetch_related_objects
+from django.urls import reverse
+from rest_framework.utils.urls import replace_query_param
+
+from comments.models import Comment
+from comments.serializers import CommentSerializer
+from projects.models import Category, Project
+from projects.serializers import CategorySerializer, ProjectDetailSerializer, ProjectSerializer
+
+VERSION_KEY = 'pages:version'
+
+
+def pages_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_pages_version(**kwargs):
+    """Signal receiver: invalidate every cached page."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 2, timeout=None)
+
+
+def cached_page(request, name, build):
+    """
+    Return the payload of page ``name`` from the cache, building it with
+    ``build()`` on a miss. Absolute media URLs depend on the host, so it
+    is part of the key.
+    """
+    key = f'pages:{name}:{request.scheme}://{request.get_host()}'
+    version = pages_version()
+    data = cache.get(key, version=version)
+    if data is None:
+        data = build()
+        cache.set(key, data, timeout=settings.PAGE_CACHE_TIMEOUT, version=version)
+    return data
+
+
+def _projects():
+    return Project.objects.select_related('category')
+
+
+def home_payload(request):
+    """Featured projects, categories with project counts and the latest projects: 5 queries."""
+    context = {'request': request}
+    featured = list(_projects().filter(featured=True)[:settings.FEATURED_PROJECTS_LIMIT])
+    # Share instances with the featured list so one images query covers both.
+    featured_by_pk = {project.pk: project for project in featured}
+    latest = [
+        featured_by_pk.get(project.pk, project)
+        for project in _projects().order_by('-date')[:settings.REST_FRAMEWORK['PAGE_SIZE']]
+    ]
+    prefetch_related_objects(list({p.pk: p for p in featured + latest}.values()), 'images')
+
+    counts = Counter({
+        row['category']: row['n']
+        for row in Project.objects.order_by().values('category').annotate(n=Count('id'))
+    })
+    categories = CategorySerializer(Category.objects.all(), many=True, context=context).data
+    for category in categories:
+        category['project_count'] = counts.get(category['id'], 0)
+
+    return {
+        'featured': ProjectSerializer(featured, many=True, context=context).data,
+        'categories': categories,
+        'latest': ProjectSerializer(latest, many=True, context=context).data,
+        'project_count': sum(counts.values()),
+    }
+
+
+def project_payload(request, project):
+    """
+    A project with its gallery and related project cards (as on
+    /projects/<id>/) plus the first comment page: 4 queries.
+    """
+    context = {'request': request}
+    prefetch_related_objects([project], 'images')
+
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    comments = list(
+        Comment.objects.select_related('user').filter(project=project)
+        .order_by('-created_at')[:page_size]
+    )
+    # A full first page needs the total, which the project's counter has.
+    count = len(comments) if len(comments) < page_size else project.comment_count
+    next_link = None
+    if count > page_size:
+        url = request.build_absolute_uri(f"{reverse('comment-list')}?project={project.pk}")
+        next_link = replace_query_param(url, 'page', 2)
+
+    return {
+        'project': ProjectDetailSerializer(project, context=context).data,
+        'comments': {
+            'count': count,
+            'next': next_link,
+            'previous': None,
+            'results': CommentSerializer(comments, many=True, context=context).data,
+        },
+    }
@@ -0,0 +1,13 @@
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def page_links(url, page, num_pages):
+    """``(next, previous)`` links for ``page`` of ``url``, exactly as DRF's PageNumberPagination builds them."""
+    next_link = replace_query_param(url, 'page', page + 1) if page < num_pages else None
+    if page == 1:
+        previous_link = None
+    elif page == 2:
+        previous_link = remove_query_param(url, 'page')
+    else:
+        previous_link = replace_query_param(url, 'page', page - 1)
+    return next_link, previous_link
@@ -0,0 +1,147 @@
+"""
+N+1 / duplicate query detection.
+
+Queries are fingerprinted by stripping literals, so ``WHERE project_id = 1``
+and ``WHERE project_id = 2`` count as the same shape. Any shape executed
+more than ``threshold`` times inside one request or test is reported along
+with the project stack frames that issued it.
+
+Usage in tests::
+
+    with QueryDetector(threshold=3, mode='raise'):
+        self.client.get('/api/projects/')
+
+    @QueryDetector(mode='raise')
+    def test_project_list(self):
+        ...
+
+For staging, enable ``DuplicateQueryMiddleware`` via ``QUERY_DETECTOR_ENABLED``.
+"""
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import ContextDecorator, ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .middleware import ObservingMiddleware
+from .timing import instrument_queries
+
+logger = logging.getLogger(__name__)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST_RE = re.compile(r'\(\s*(?:(?:%s|\?)\s*,\s*)+(?:%s|\?)\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+MODES = ('warn', 'raise')
+
+
+class DuplicateQueryError(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """Normalize literals and placeholders so queries of the same shape compare equal."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _PLACEHOLDER_LIST_RE.sub('(...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+def _project_stack(limit=8):
+    """Return the innermost stack frames that belong to this project (not Django/DRF)."""
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()[:-3]
+        if frame.filename.startswith(base_dir)
+        and 'site-packages' not in frame.filename
+        and not frame.filename.endswith(('query_detector.py', 'timing.py'))
+    ]
+    return frames[-limit:]
+
+
+class QueryDetector(ContextDecorator):
+    """Context manager / decorator that flags repeated identical-shape queries."""
+
+    def __init__(self, threshold=None, mode=None, label=None):
+        self.threshold = threshold if threshold is not None else settings.QUERY_DETECTOR_THRESHOLD
+        self.mode = mode or settings.QUERY_DETECTOR_MODE
+        if self.mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {self.mode!r}")
+        self.label = label
+        self.counts = Counter()
+        self.stacks = {}
+        self._stack = None
+
+    def __call__(self, func):
+        if self.label is None:
+            self.label = func.__qualname__
+        return super().__call__(func)
+
+    def _wrapper(self, execute, sql, params, many, context):
+        shape = fingerprint(sql)
+        self.counts[shape] += 1
+        if shape not in self.stacks:
+            self.stacks[shape] = _project_stack()
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.counts.clear()
+        self.stacks.clear()
+        self._stack = ExitStack()
+        self._stack.enter_context(instrument_queries(self._wrapper))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stack.close()
+        if exc_type is None:
+            self.check()
+        return False
+
+    @property
+    def duplicates(self):
+        """``(fingerprint, count, stack)`` for every shape above the threshold, worst first."""
+        return [
+            (shape, count, self.stacks[shape])
+            for shape, count in self.counts.most_common()
+            if count > self.threshold
+        ]
+
+    def report(self):
+        lines = []
+        for shape, count, stack in self.duplicates:
+            lines.append(f'{count}x {shape}')
+            lines.extend(
+                f'    {frame.filename}:{frame.lineno} in {frame.name}' for frame in stack
+            )
+        return '\n'.join(lines)
+
+    def check(self):
+        if not self.duplicates:
+            return
+        message = (
+            f"Repeated queries detected{f' in {self.label}' if self.label else ''} "
+            f"(threshold {self.threshold}):\n{self.report()}"
+        )
+        if self.mode == 'raise':
+            raise DuplicateQueryError(message)
+        logger.warning(message)
+
+
+class DuplicateQueryMiddleware(ObservingMiddleware):
+    """
+    Run every request under a ``QueryDetector``. Intended for staging; in
+    ``raise`` mode offending requests fail with a 500.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_DETECTOR_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def observe(self, request):
+        return QueryDetector(label=f'{request.method} {request.path}')
@@ -0,0 +1,131 @@
+"""
+Retention policies for tables that otherwise grow forever.
+
+Each ``Policy`` selects rows older than a cutoff (plus optional
+conditions) and deletes them in small batches, walking the primary key
+(keyset pagination) and sleeping between batches so that no statement
+holds locks on a hot table for long. Policies with ``archive`` first
+append the batch to ``RETENTION_ARCHIVE_DIR/<policy>/<timestamp>.ndjson.gz``
+(one JSON object per line). The archive is flushed before the batch is
+deleted, so an interrupted run can at worst archive a batch twice.
+
+Deletes go through ``QuerySet.delete()``, so signal receivers keep the
+dashboard rollups and project counters consistent.
+
+A policy whose age setting is 0 is disabled.
+"""
+import gzip
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+
+@dataclass
+class Policy:
+    name: str
+    model: str
+    date_field: str
+    max_age: timedelta
+    where: dict = field(default_factory=dict)
+    archive: bool = True
+
+    @property
+    def enabled(self):
+        return self.max_age > timedelta(0)
+
+    def queryset(self, now=None):
+        model = apps.get_model(self.model)
+        cutoff = (now or timezone.now()) - self.max_age
+        return model._default_manager.filter(**{f'{self.date_field}__lt': cutoff}, **self.where)
+
+
+def policies():
+    lifetime = settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME']
+    return [
+        Policy('contacts', 'contact.Contact', 'created_at',
+               timedelta(days=settings.RETENTION_CONTACT_DAYS), {'is_read': True}),
+        Policy('applications', 'jobapplicant.JobApplication', 'submitted_at',
+               timedelta(days=settings.RETENTION_APPLICATION_DAYS)),
+        Policy('comments', 'comments.Comment', 'created_at',
+               timedelta(days=settings.RETENTION_COMMENT_DAYS)),
+        # Their verification link (an access token) has expired; they can only register again.
+        Policy('unverified_users', settings.AUTH_USER_MODEL, 'created_at',
+               lifetime + timedelta(hours=settings.RETENTION_UNVERIFIED_USER_GRACE_HOURS),
+               {'email_verified': False, 'is_active': False, 'is_staff': False, 'is_superuser': False},
+               archive=False),
+        # Expired revocations are already ignored; this only keeps the table small.
+        Policy('revoked_tokens', 'users.RevokedToken', 'expires_at', timedelta(days=1), archive=False),
+    ]
+
+
+class _Archive:
+    """Gzipped NDJSON file, opened on the first batch."""
+
+    def __init__(self, policy, started):
+        self.path = os.path.join(
+            settings.RETENTION_ARCHIVE_DIR, policy.name, f'{started:%Y%m%dT%H%M%S}.ndjson.gz'
+        )
+        self._file = None
+
+    def write(self, rows):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = gzip.open(self.path, 'at', encoding='utf-8')
+        for row in rows:
+            self._file.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+            self._file.write('\n')
+        # Durable before the rows are deleted.
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def apply(policy, batch_size=500, pause=0.1, progress=None):
+    """
+    Archive (if configured) and delete the rows ``policy`` selects.
+    Returns ``(rows deleted, seconds)``.
+    """
+    started = timezone.now()
+    queryset = policy.queryset(started)
+    archive = _Archive(policy, started) if policy.archive else None
+    pk_name = queryset.model._meta.pk.attname
+    deleted = 0
+    last_pk = None
+    clock = time.perf_counter()
+    try:
+        while True:
+            batch = queryset.order_by('pk')
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            if archive is not None:
+                rows = list(batch.values()[:batch_size])
+                pks = [row[pk_name] for row in rows]
+            else:
+                pks = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            if archive is not None:
+                archive.write(rows)
+            # Re-checks the policy, in case a row changed since it was read.
+            queryset.filter(pk__in=pks).delete()
+            deleted += len(pks)
+            last_pk = pks[-1]
+            if progress:
+                progress(deleted)
+            if len(pks) < batch_size:
+                break
+            time.sleep(pause)
+    finally:
+        if archive is not None:
+            archive.close()
+    return deleted, time.perf_counter() - clock
@@ -0,0 +1,112 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+``ReplicaRoutingMiddleware`` marks safe-method requests as replica-eligible
+unless the client wrote recently (it is then pinned to the primary for
+``REPLICA_PIN_SECONDS`` through a cookie or the ``X-DB-Pin`` header).
+``ReplicaRouter`` sends reads of ``REPLICA_APPS`` models made during such a
+request to a healthy replica; everything else uses ``default``.
+"""
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+_read_from_replica = contextvars.ContextVar('read_from_replica', default=False)
+
+# Seconds of replay lag; 0 when the standby has replayed everything it received.
+_POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+# alias -> (checked at, healthy)
+_health = {}
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+def replica_lag(alias):
+    """Replication lag of ``alias`` in seconds (0 for backends that can't report it)."""
+    with connections[alias].cursor() as cursor:
+        if connections[alias].vendor == 'postgresql':
+            cursor.execute(_POSTGRES_LAG_SQL)
+            return float(cursor.fetchone()[0])
+        cursor.execute('SELECT 1')
+        return 0.0
+
+
+def replica_healthy(alias):
+    """Whether ``alias`` is reachable and within ``REPLICA_MAX_LAG``, cached per process."""
+    now = time.monotonic()
+    checked, healthy = _health.get(alias, (None, False))
+    if checked is not None and now - checked < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+        return healthy
+    try:
+        lag = replica_lag(alias)
+        healthy = lag <= settings.REPLICA_MAX_LAG
+        if not healthy:
+            logger.warning('Replica %s is %.1fs behind; reading from the primary', alias, lag)
+    except Exception as e:
+        logger.warning('Replica %s is unavailable (%s); reading from the primary', alias, e)
+        healthy = False
+    _health[alias] = (now, healthy)
+    return healthy
+
+
+def pinned_to_primary(request):
+    """Whether the client wrote recently and must read its own writes."""
+    now = time.time()
+    for value in (request.COOKIES.get(settings.REPLICA_PIN_COOKIE), request.META.get('HTTP_X_DB_PIN')):
+        try:
+            if float(value) > now:
+                return True
+        except (TypeError, ValueError):
+            pass
+    return False
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Allow (or forbid) reads in the enclosed block to go to a replica."""
+    token = _read_from_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            not _read_from_replica.get()
+            or model._meta.app_label not in settings.REPLICA_APPS
+            # Reads inside a transaction on the primary must see its writes.
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return None
+        healthy = [alias for alias in replica_aliases() if replica_healthy(alias)]
+        return random.choice(healthy) if healthy else None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary.
+        if db in replica_aliases():
+            return False
+        return None
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from . import snapshot, stats
+from .pages import bump_pages_version
+
+
+def connect_page_cache_signals():
+    from comments.models import Comment
+    from projects.models import Category, Project, ProjectImage
+    from projects.importer import projects_imported
+    from projects.related import related_projects_updated
+
+    for model in (Project, ProjectImage, Category, Comment):
+        uid = f'api.pages.{model._meta.label_lower}'
+        post_save.connect(bump_pages_version, sender=model, dispatch_uid=f'{uid}.save')
+        post_delete.connect(bump_pages_version, sender=model, dispatch_uid=f'{uid}.delete')
+    related_projects_updated.connect(bump_pages_version, dispatch_uid='api.pages.related')
+    projects_imported.connect(bump_pages_version, dispatch_uid='api.pages.imported')
+
+
+def connect_snapshot_signals():
+    if not settings.SNAPSHOT_ENABLED:
+        return
+    from projects.importer import projects_imported
+    from projects.models import Category, Project, ProjectImage
+    from projects.related import related_projects_updated
+
+    # Not Comment: the snapshot leaves out the comment counters (see api.snapshot).
+    for model in (Project, ProjectImage, Category):
+        uid = f'api.snapshot.{model._meta.label_lower}'
+        post_save.connect(snapshot.schedule, sender=model, dispatch_uid=f'{uid}.save')
+        post_delete.connect(snapshot.schedule, sender=model, dispatch_uid=f'{uid}.delete')
+    related_projects_updated.connect(snapshot.schedule, dispatch_uid='api.snapshot.related')
+    projects_imported.connect(snapshot.schedule, dispatch_uid='api.snapshot.imported')
+
+
+def connect_stats_signals():
+    from projects.importer import projects_imported
+
+    for model in stats.tracked_models():
+        uid = f'api.stats.{model._meta.label_lower}'
+        pre_save.connect(stats.remember_before_save, sender=model, dispatch_uid=f'{uid}.pre_save')
+        post_save.connect(stats.count_saved, sender=model, dispatch_uid=f'{uid}.save')
+        post_delete.connect(stats.count_deleted, sender=model, dispatch_uid=f'{uid}.delete')
+    projects_imported.connect(stats.count_imported, dispatch_uid='api.stats.imported')
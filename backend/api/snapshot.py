@@ -0,0 +1,266 @@
+"""
+Static JSON snapshots of the public portfolio.
+
+``publish()`` renders the anonymous responses of the project list pages,
+featured projects, every project detail and the category list pages into
+a new directory under ``SNAPSHOT_ROOT/versions``, with a gzipped copy of
+each file, and then atomically repoints the ``SNAPSHOT_ROOT/current``
+symlink at it. ``SnapshotMiddleware`` serves matching requests from the
+current version through WhiteNoise, so those endpoints keep answering
+without touching the database.
+
+Files are laid out by API path::
+
+    api/projects/page-<n>.json     /api/projects/?page=<n>
+    api/projects/featured.json     /api/projects/featured/
+    api/projects/<id>.json         /api/projects/<id>/
+    api/categories/page-<n>.json   /api/categories/?page=<n>
+
+Model changes schedule a debounced publish after commit (``schedule``).
+Comments don't: every publish renders the whole portfolio, and comments
+are the busiest writes. Snapshot projects therefore leave out the
+comment counters (``COMMENT_FIELDS``); the live endpoints have them.
+"""
+import fcntl
+import gzip
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connections, transaction
+from rest_framework.renderers import JSONRenderer
+
+from projects.models import Category, Project
+from projects.related import related_cards_for
+from projects.serializers import CategorySerializer, ProjectDetailSerializer
+from .pagination import page_links
+
+logger = logging.getLogger(__name__)
+
+_renderer = JSONRenderer()
+_PROJECT_URL_RE = re.compile(r'^/api/projects/(\d+)/$')
+_CHUNK_SIZE = 1000
+# Changed by every comment, which doesn't republish the snapshot.
+COMMENT_FIELDS = ('comment_count', 'last_comment_at')
+
+
+def snapshot_path(path, query):
+    """
+    Map a request path and query dict to a snapshot file URL, or None when
+    the request is not covered by the snapshot.
+    """
+    if set(query) - {'page'}:
+        return None
+    page = query.get('page', '1')
+    if not page.isdigit():
+        return None
+    if path in ('/api/projects/', '/api/categories/'):
+        return f'{path}page-{int(page)}.json'
+    if query:
+        return None
+    if path == '/api/projects/featured/':
+        return '/api/projects/featured.json'
+    match = _PROJECT_URL_RE.match(path)
+    if match:
+        return f'/api/projects/{int(match.group(1))}.json'
+    return None
+
+
+def current_version_dir():
+    """Absolute path of the live snapshot version, or None if nothing is published."""
+    try:
+        target = os.readlink(os.path.join(settings.SNAPSHOT_ROOT, 'current'))
+    except OSError:
+        return None
+    return os.path.join(settings.SNAPSHOT_ROOT, target)
+
+
+def read_manifest(version_dir):
+    with open(os.path.join(version_dir, 'manifest.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+class _Writer:
+    def __init__(self, root):
+        self.root = root
+        self.files = 0
+        self.bytes = 0
+
+    def write(self, url, data):
+        path = os.path.join(self.root, url.lstrip('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        content = _renderer.render(data)
+        with open(path, 'wb') as f:
+            f.write(content)
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) < len(content):
+            with open(f'{path}.gz', 'wb') as f:
+                f.write(compressed)
+        self.files += 1
+        self.bytes += len(content)
+
+
+def _base_request(base_url):
+    from django.test import RequestFactory
+    parts = urlsplit(base_url)
+    return RequestFactory().get('/', HTTP_HOST=parts.netloc, secure=parts.scheme == 'https')
+
+
+def _write_pages(writer, base_url, path, items, count):
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    num_pages = max(math.ceil(count / page_size), 1)
+    url = f'{base_url}{path}'
+    for page in range(1, num_pages + 1):
+        next_link, previous_link = page_links(url, page, num_pages)
+        writer.write(f'{path}page-{page}.json', {
+            'count': count,
+            'next': next_link,
+            'previous': previous_link,
+            'results': items[(page - 1) * page_size:page * page_size],
+        })
+
+
+def _render(writer, base_url, progress=None):
+    request = _base_request(base_url)
+    context = {'request': request}
+
+    # One pass over all projects: each detail file is the list entry plus
+    # its related projects, so every project is serialized once.
+    projects = (
+        Project.objects.select_related('category').prefetch_related('images')
+        .order_by('-date').iterator(chunk_size=_CHUNK_SIZE)
+    )
+    listed, featured, chunk = [], [], []
+
+    def flush():
+        links = related_cards_for(project.pk for project in chunk)
+        for project in chunk:
+            project.related_links_cache = links.get(project.pk, [])
+        # many=True builds the serializer fields once per chunk instead of per project.
+        for project, data in zip(chunk, ProjectDetailSerializer(chunk, many=True, context=context).data):
+            for field in COMMENT_FIELDS:
+                data.pop(field, None)
+            writer.write(f'/api/projects/{project.pk}.json', data)
+            item = {key: value for key, value in data.items() if key != 'related_projects'}
+            listed.append(item)
+            if project.featured and len(featured) < settings.FEATURED_PROJECTS_LIMIT:
+                featured.append(item)
+        chunk.clear()
+        if progress:
+            progress(len(listed))
+
+    for project in projects:
+        chunk.append(project)
+        if len(chunk) >= _CHUNK_SIZE:
+            flush()
+    flush()
+
+    _write_pages(writer, base_url, '/api/projects/', listed, len(listed))
+    writer.write('/api/projects/featured.json', featured)
+    categories = CategorySerializer(Category.objects.order_by('name'), many=True, context=context).data
+    _write_pages(writer, base_url, '/api/categories/', list(categories), len(categories))
+    return {'projects': len(listed), 'featured': len(featured), 'categories': len(categories)}
+
+
+@contextmanager
+def _publish_lock(root):
+    # Serializes publishes across worker processes.
+    with open(os.path.join(root, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _swap_current(root, version):
+    # A symlink can't be overwritten atomically, but a rename over it can.
+    tmp_link = os.path.join(root, f'.current-{os.getpid()}')
+    os.symlink(os.path.join('versions', version), tmp_link)
+    os.replace(tmp_link, os.path.join(root, 'current'))
+
+
+def _prune(versions_dir, keep, current):
+    versions = sorted(name for name in os.listdir(versions_dir) if not name.startswith('.'))
+    for name in versions[:-keep]:
+        if name != current:
+            shutil.rmtree(os.path.join(versions_dir, name), ignore_errors=True)
+
+
+def publish(base_url=None, keep=None, progress=None):
+    """Render a new snapshot version and make it live. Returns its manifest."""
+    base_url = (base_url or settings.SNAPSHOT_BASE_URL).rstrip('/')
+    keep = keep or settings.SNAPSHOT_KEEP_VERSIONS
+    root = settings.SNAPSHOT_ROOT
+    versions_dir = os.path.join(root, 'versions')
+    os.makedirs(versions_dir, exist_ok=True)
+
+    with _publish_lock(root):
+        started = time.perf_counter()
+        version = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        tmp_dir = os.path.join(versions_dir, f'.{version}')
+        writer = _Writer(tmp_dir)
+        try:
+            counts = _render(writer, base_url, progress)
+            manifest = {
+                'version': version,
+                'base_url': base_url,
+                'created': time.time(),
+                'files': writer.files,
+                'bytes': writer.bytes,
+                **counts,
+            }
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.rename(tmp_dir, os.path.join(versions_dir, version))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        _swap_current(root, version)
+        _prune(versions_dir, keep, version)
+    logger.info(
+        'Published snapshot %s: %d files in %.1fs', version, writer.files, time.perf_counter() - started
+    )
+    return manifest
+
+
+_timer = None
+_timer_lock = threading.Lock()
+
+
+def _publish_in_background():
+    global _timer
+    with _timer_lock:
+        _timer = None
+    try:
+        publish()
+    except Exception:
+        logger.exception('Publishing the snapshot failed')
+    finally:
+        connections.close_all()
+
+
+def schedule(**kwargs):
+    """
+    Signal receiver: publish a new snapshot ``SNAPSHOT_DEBOUNCE`` seconds
+    after the current transaction commits. Further changes in that window
+    are picked up by the same publish.
+    """
+    def start():
+        global _timer
+        with _timer_lock:
+            if _timer is None:
+                _timer = threading.Timer(settings.SNAPSHOT_DEBOUNCE, _publish_in_background)
+                _timer.daemon = True
+                _timer.start()
+
+    transaction.on_commit(start)
@@ -0,0 +1,210 @@
+"""
+Admin dashboard statistics (``/api/stats/``) served from ``DailyStat`` rollups.
+
+Each ``Metric`` counts the rows of one model matching ``where``, per day
+of ``date_field`` (and, with ``group_by``, per value of that field,
+stored as ``metric:value``). Signal receivers move a row's day count by
+one when it is created or deleted, or when an update makes it enter or
+leave a metric (a contact marked read, a user verifying their email).
+``rebuild()`` (the ``rebuild_stats`` command) recomputes everything,
+for rows written without signals (``bulk_create``, ``QuerySet.update()``);
+code that bulk-creates tracked rows can call ``count_bulk_created``.
+
+A dashboard request therefore reads two small rollup queries no matter
+how large the underlying tables are.
+"""
+from collections import Counter, namedtuple
+from datetime import timedelta
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyStat
+
+Metric = namedtuple('Metric', 'name model date_field where group_by', defaults=({}, None))
+
+METRICS = (
+    Metric('projects', 'projects.Project', 'created_at'),
+    Metric('projects_featured', 'projects.Project', 'created_at', {'featured': True}),
+    Metric('users', settings.AUTH_USER_MODEL, 'created_at'),
+    Metric('users_unverified', settings.AUTH_USER_MODEL, 'created_at', {'email_verified': False}),
+    Metric('contacts', 'contact.Contact', 'created_at'),
+    Metric('contacts_unread', 'contact.Contact', 'created_at', {'is_read': False}),
+    Metric('applications', 'jobapplicant.JobApplication', 'submitted_at'),
+    Metric('applications_position', 'jobapplicant.JobApplication', 'submitted_at', group_by='position'),
+    Metric('comments', 'comments.Comment', 'created_at'),
+)
+
+# Response name -> metric
+TOTALS = {
+    'projects': 'projects',
+    'featured_projects': 'projects_featured',
+    'users': 'users',
+    'unverified_users': 'users_unverified',
+    'contacts': 'contacts',
+    'unread_contacts': 'contacts_unread',
+    'applications': 'applications',
+    'comments': 'comments',
+}
+SERIES = {
+    'contacts': 'contacts',
+    'applications': 'applications',
+    'registrations': 'users',
+    'comments': 'comments',
+}
+DEFAULT_DAYS = 30
+MAX_DAYS = 365
+
+
+def tracked_models():
+    return list(_metrics_by_model())
+
+
+@lru_cache(maxsize=None)
+def _metrics_by_model():
+    by_model = {}
+    for metric in METRICS:
+        by_model.setdefault(apps.get_model(metric.model), []).append(metric)
+    return by_model
+
+
+def _tracked_fields(metrics):
+    fields = set()
+    for metric in metrics:
+        fields.add(metric.date_field)
+        fields.update(metric.where)
+        if metric.group_by:
+            fields.add(metric.group_by)
+    return fields
+
+
+def _day(value):
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def _entries(metrics, values):
+    """The ``(DailyStat.metric, day)`` pairs a row with ``values`` counts towards."""
+    entries = []
+    for metric in metrics:
+        if any(values[field] != expected for field, expected in metric.where.items()):
+            continue
+        name = f'{metric.name}:{values[metric.group_by]}' if metric.group_by else metric.name
+        entries.append((name, _day(values[metric.date_field])))
+    return entries
+
+
+def _instance_entries(metrics, instance):
+    return _entries(metrics, {field: getattr(instance, field) for field in _tracked_fields(metrics)})
+
+
+def _add(metric, day, delta):
+    updated = DailyStat.objects.filter(metric=metric, day=day).update(count=F('count') + delta)
+    if not updated:
+        try:
+            with transaction.atomic():
+                DailyStat.objects.create(metric=metric, day=day, count=delta)
+        except IntegrityError:
+            # Created concurrently
+            DailyStat.objects.filter(metric=metric, day=day).update(count=F('count') + delta)
+
+
+def _apply(before, after):
+    delta = Counter(after)
+    delta.subtract(before)
+    for (metric, day), change in delta.items():
+        if change:
+            _add(metric, day, change)
+
+
+def remember_before_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """``pre_save`` receiver: note which metrics an existing row counted towards."""
+    metrics = _metrics_by_model()[sender]
+    fields = _tracked_fields(metrics)
+    # Only updates that can move the row between metrics need the old values.
+    if raw or instance._state.adding or (update_fields is not None and not fields & set(update_fields)):
+        return
+    old = sender._default_manager.filter(pk=instance.pk).values(*fields).first()
+    instance._stats_before = _entries(metrics, old) if old else []
+
+
+def count_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = [] if created else instance.__dict__.pop('_stats_before', None)
+    if before is not None:
+        _apply(before, _instance_entries(_metrics_by_model()[sender], instance))
+
+
+def count_deleted(sender, instance, **kwargs):
+    _apply(_instance_entries(_metrics_by_model()[sender], instance), [])
+
+
+def count_bulk_created(model, instances):
+    metrics = _metrics_by_model()[model]
+    _apply([], [entry for instance in instances for entry in _instance_entries(metrics, instance)])
+
+
+def count_imported(sender, projects, **kwargs):
+    """``projects_imported`` receiver."""
+    count_bulk_created(sender, projects)
+
+
+def rebuild(registry=apps):
+    """
+    Recompute every rollup from the tables. Returns the number of rows
+    written. A migration passes its historical app ``registry``.
+    """
+    DailyStat = registry.get_model('api', 'DailyStat')
+    rows = []
+    for metric in METRICS:
+        model = registry.get_model(metric.model)
+        group = [metric.group_by] if metric.group_by else []
+        counts = (
+            model._default_manager.filter(**metric.where).order_by()
+            .annotate(stat_day=TruncDate(metric.date_field))
+            .values('stat_day', *group).annotate(n=Count('pk'))
+        )
+        for row in counts:
+            name = f'{metric.name}:{row[metric.group_by]}' if metric.group_by else metric.name
+            rows.append(DailyStat(metric=name, day=row['stat_day'], count=row['n']))
+    with transaction.atomic():
+        DailyStat.objects.all().delete()
+        DailyStat.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def dashboard(days=DEFAULT_DAYS):
+    """Totals, applications per position and zero-filled per-day series for the last ``days`` days."""
+    totals = dict(
+        DailyStat.objects.order_by().values('metric').annotate(total=Sum('count'))
+        .values_list('metric', 'total')
+    )
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    daily = {
+        (metric, day): count for metric, day, count in
+        DailyStat.objects.filter(day__gte=start, metric__in=SERIES.values())
+        .values_list('metric', 'day', 'count')
+    }
+    dates = [start + timedelta(days=offset) for offset in range(days)]
+
+    JobApplication = apps.get_model('jobapplicant.JobApplication')
+    return {
+        'totals': {name: totals.get(metric, 0) for name, metric in TOTALS.items()},
+        'applications_by_position': {
+            position: totals.get(f'applications_position:{position}', 0)
+            for position, label in JobApplication.POSITION_CHOICES
+        },
+        'series': {
+            'dates': [day.isoformat() for day in dates],
+            **{
+                name: [daily.get((metric, day), 0) for day in dates]
+                for name, metric in SERIES.items()
+            },
+        },
+    }
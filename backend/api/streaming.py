@@ -0,0 +1,79 @@
+"""
+Streaming JSON for list responses that aren't paginated.
+
+``StreamingListMixin.streaming_response(queryset)`` reads the queryset
+with ``iterator()`` (prefetches run per chunk), serializes one chunk at a
+time and sends each as a fragment of the JSON array, so memory depends
+on ``stream_chunk_size`` rather than on the size of the table. The bytes
+are the ones ``JSONRenderer`` would produce for the whole list.
+
+Once the response has started, an error can only cut it short: clients
+see invalid JSON rather than an error status.
+
+Under ASGI, Django reads a plain iterator into a list before sending any
+of it, so ``streaming_content`` hands the response an async iterator
+there instead: each item is still produced by the sync generator, one
+``next()`` at a time on the thread that ran the view (where its
+database connection lives).
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+_END = object()
+
+
+async def _iterate_async(iterator):
+    step = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (item := await step(iterator, _END)) is not _END:
+            yield item
+    finally:
+        if hasattr(iterator, 'close'):
+            await sync_to_async(iterator.close, thread_sensitive=True)()
+
+
+def streaming_content(iterable, request):
+    """``iterable`` as ``StreamingHttpResponse`` content for the server ``request`` came through."""
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        return _iterate_async(iter(iterable))
+    return iterable
+
+
+class StreamingListMixin:
+    """For viewsets: stream large unpaginated lists instead of building them in memory."""
+    stream_chunk_size = 500
+
+    def streaming_response(self, queryset, envelope=None):
+        """
+        Respond with the serialized ``queryset``, or with ``envelope`` (a
+        dict) plus the list under ``'results'``. Other renderers than JSON
+        (the browsable API) get an ordinary response.
+        """
+        if not isinstance(getattr(self.request, 'accepted_renderer', None), JSONRenderer):
+            data = self.get_serializer(queryset, many=True).data
+            return Response({**envelope, 'results': data} if envelope is not None else data)
+        return StreamingHttpResponse(
+            streaming_content(self._stream(queryset, envelope, self.request.accepted_renderer), self.request),
+            content_type=self.request.accepted_media_type or 'application/json',
+        )
+
+    def _stream(self, queryset, envelope, renderer):
+        if envelope is not None:
+            # '{"count":1,...}' -> '{"count":1,...,"results":['
+            head = renderer.render(envelope)[:-1]
+            yield head + (b',"results":[' if envelope else b'"results":[')
+        else:
+            yield b'['
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        separator = b''
+        while chunk := list(islice(rows, self.stream_chunk_size)):
+            # The rendered chunk without its brackets
+            body = renderer.render(self.get_serializer(chunk, many=True).data)[1:-1]
+            yield separator + body
+            separator = b','
+        yield b']}' if envelope is not None else b']'
@@ -1,3 +1,500 @@
-from django.test import TestCase
+import itertools
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import metrics, routers
+from api.cache import PAGE, MmapCache
+from api.bench import BASELINE_PATH, DATASET, _methods, _walk, compare, run_benchmarks
+from api.db.postgresql_pool.pool import ConnectionPool, PoolTimeout
+from projects.models import Category
+from projects.seeding import seed_dataset
+
+
+class BenchmarkTests(TransactionTestCase):
+    """
+    Every API route on the baseline's dataset, compared with
+    ``api/bench_baseline.json``: query counts always, p95 latency only
+    with ``BENCH_TOLERANCE`` set (0.2 = 20% slower allowed), as timings
+    are only comparable on the machine the baseline was recorded on.
+    Refresh the baseline with ``manage.py bench --output api/bench_baseline.json``.
+    """
+    iterations = int(os.getenv('BENCH_ITERATIONS', 10))
+
+    def setUp(self):
+        seed_dataset(**DATASET)
+        with open(BASELINE_PATH, encoding='utf-8') as f:
+            self.baseline = json.load(f)['results']
+
+    def test_routes_against_baseline(self):
+        caches = {'default': {**settings.CACHES['default'], 'KEY_PREFIX': f'test-{uuid.uuid4().hex}'}}
+        with override_settings(SERVER_TIMING_SAMPLE_RATE=0.0, METRICS_ENABLED=False, CACHES=caches):
+            results = run_benchmarks(iterations=self.iterations, warmup=2)
+
+        from api.urls import urlpatterns
+        readable = {name for name, pattern in _walk(urlpatterns) if 'get' in _methods(pattern.callback)}
+        self.assertLessEqual(readable, set(results))
+        for name, result in results.items():
+            with self.subTest(route=name):
+                self.assertLess(result['status'], 400)
+
+        tolerance = float(os.getenv('BENCH_TOLERANCE', 'inf'))
+        self.assertEqual(compare(results, self.baseline, tolerance=tolerance), [])
+
+
+class StubConnections:
+    """Connection factory and callbacks for ``ConnectionPool``, recording what it is asked to do."""
+
+    def __init__(self):
+        self.numbers = itertools.count(1)
+        self.broken = set()
+        self.pinged = []
+        self.closed = []
+
+    def connect(self):
+        return object(), next(self.numbers)
+
+    def ping(self, connection):
+        self.pinged.append(connection)
+        if connection in self.broken:
+            raise ConnectionError('server closed the connection')
+
+    def close(self, connection):
+        self.closed.append(connection)
+
+    @staticmethod
+    def reset(connection):
+        return True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.stub = StubConnections()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        metrics_settings = override_settings(METRICS_ENABLED=True, METRICS_DIR=directory.name)
+        metrics_settings.enable()
+        self.addCleanup(metrics_settings.disable)
+        # A store of its own, opened in the temporary METRICS_DIR.
+        store = mock.patch.object(metrics, '_store', metrics._ProcessStore())
+        store.start()
+        self.addCleanup(store.stop)
+
+    def pool(self, **kwargs):
+        return ConnectionPool('test', **kwargs)
+
+    def borrow(self, pool):
+        return pool.borrow(self.stub.connect, self.stub.ping, self.stub.close)[0]
+
+    def release(self, pool, connection, reset=None):
+        pool.release(connection, reset or self.stub.reset, self.stub.close)
+
+    def sample(self, name, **labels):
+        return metrics.collect()[name].get(tuple(sorted(labels.items())), 0.0)
+
+    def test_idle_connection_is_reused(self):
+        pool = self.pool(size=2)
+        connection = self.borrow(pool)
+        self.release(pool, connection)
+        self.assertIs(self.borrow(pool), connection)
+        self.assertEqual(pool.stats, {'size': 2, 'in_use': 1, 'idle': 0})
+
+    def test_checkout_times_out_when_all_connections_are_in_use(self):
+        pool = self.pool(size=2, timeout=0.05)
+        self.borrow(pool)
+        self.borrow(pool)
+        start = time.monotonic()
+        with self.assertRaises(PoolTimeout):
+            self.borrow(pool)
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        self.assertEqual(pool.stats['in_use'], 2)
+        self.assertEqual(self.sample('db_pool_timeouts_total', alias='test'), 1)
+
+    def test_waiting_checkout_gets_a_released_connection(self):
+        pool = self.pool(size=1, timeout=5)
+        connection = self.borrow(pool)
+        timer = threading.Timer(0.05, self.release, (pool, connection))
+        timer.start()
+        self.addCleanup(timer.join)
+        self.assertIs(self.borrow(pool), connection)
+        self.assertEqual(self.sample('db_pool_wait_seconds_count', alias='test'), 2)
+        self.assertGreaterEqual(self.sample('db_pool_wait_seconds_sum', alias='test'), 0.05)
+
+    def test_health_check_on_borrow_replaces_a_dead_connection(self):
+        pool = self.pool(size=1, check_after=0)
+        connection = self.borrow(pool)
+        self.release(pool, connection)
+        self.stub.broken.add(connection)
+        replacement = self.borrow(pool)
+        self.assertIsNot(replacement, connection)
+        self.assertEqual(self.stub.pinged, [connection])
+        self.assertEqual(self.stub.closed, [connection])
+
+    def test_recently_used_connection_is_not_pinged(self):
+        pool = self.pool(size=1, check_after=60)
+        self.release(pool, self.borrow(pool))
+        self.borrow(pool)
+        self.assertEqual(self.stub.pinged, [])
+
+    def test_connection_older_than_recycle_is_replaced(self):
+        pool = self.pool(size=1, recycle=0.05)
+        connection = self.borrow(pool)
+        self.release(pool, connection)
+        time.sleep(0.06)
+        replacement = self.borrow(pool)
+        self.assertIsNot(replacement, connection)
+        # Past its age when given back, a connection is closed instead of kept idle.
+        time.sleep(0.06)
+        self.release(pool, replacement)
+        self.assertEqual(self.stub.closed, [connection, replacement])
+        self.assertEqual(pool.stats['idle'], 0)
+
+    def test_connection_that_fails_to_reset_is_discarded(self):
+        pool = self.pool(size=1)
+        connection = self.borrow(pool)
+        self.release(pool, connection, reset=lambda connection: False)
+        self.assertEqual(self.stub.closed, [connection])
+        self.assertEqual(pool.stats, {'size': 1, 'in_use': 0, 'idle': 0})
+
+    def test_gauges(self):
+        pool = self.pool(size=3)
+        first, second = self.borrow(pool), self.borrow(pool)
+        self.release(pool, first)
+        self.assertEqual(self.sample('db_pool_max_connections', alias='test'), 3)
+        self.assertEqual(self.sample('db_pool_connections', alias='test', state='in_use'), 1)
+        self.assertEqual(self.sample('db_pool_connections', alias='test', state='idle'), 1)
+
+
+def _record_metrics():
+    metrics.DB_POOL_TIMEOUTS.inc(alias='worker')
+    metrics.DB_POOL_MAX.set(5, alias='worker')
+
+
+class MetricsArchiveTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        metrics_settings = override_settings(METRICS_ENABLED=True, METRICS_DIR=directory.name)
+        metrics_settings.enable()
+        self.addCleanup(metrics_settings.disable)
+        store = mock.patch.object(metrics, '_store', metrics._ProcessStore())
+        store.start()
+        self.addCleanup(store.stop)
+
+    def sample(self, name, **labels):
+        return metrics.collect()[name].get(tuple(sorted(labels.items())), 0.0)
+
+    def run_worker(self):
+        worker = multiprocessing.get_context('fork').Process(target=_record_metrics)
+        worker.start()
+        worker.join()
+        self.assertEqual(worker.exitcode, 0)
+        return worker.pid
+
+    def test_exited_worker_is_archived(self):
+        _record_metrics()
+        self.run_worker()
+        self.run_worker()
+        self.assertEqual(self.sample('db_pool_timeouts_total', alias='worker'), 3)
+        # Gauges only count live processes.
+        self.assertEqual(self.sample('db_pool_max_connections', alias='worker'), 5)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['.archive.lock', 'archive.db', f'metrics_{os.getpid()}.db'])
+        # Archived once: collecting again counts the same.
+        self.assertEqual(self.sample('db_pool_timeouts_total', alias='worker'), 3)
+
+    def test_archive_process(self):
+        pid = self.run_worker()
+        metrics.archive_process(pid)
+        metrics.archive_process(pid)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['.archive.lock', 'archive.db'])
+        self.assertEqual(self.sample('db_pool_timeouts_total', alias='worker'), 1)
+        self.assertEqual(self.sample('db_pool_max_connections', alias='worker'), 0)
+
+
+def _incr_many(cache, times):
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class MmapCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'cache')
+        # A single bucket of 8 small slots, and one larger slot.
+        self.size_classes = ((1024, 8), (PAGE, 1))
+
+    def cache(self):
+        return MmapCache(self.location, {'OPTIONS': {'SIZE_CLASSES': self.size_classes}})
+
+    def test_get_set_delete(self):
+        cache = self.cache()
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.get('key', 'default'), 'default')
+        cache.set('key', {'value': [1, 2]})
+        cache.set('large', 'x' * 2000)
+        self.assertEqual(cache.get('key'), {'value': [1, 2]})
+        self.assertEqual(cache.get('large'), 'x' * 2000)
+        self.assertIsNone(cache.get('key', version=2))
+        cache.set('key', 'replaced')
+        self.assertEqual(cache.get('key'), 'replaced')
+        self.assertTrue(cache.delete('key'))
+        self.assertFalse(cache.has_key('key'))
+        # Larger than every slot: not cached.
+        cache.set('huge', os.urandom(2 * PAGE))
+        self.assertIsNone(cache.get('huge'))
+
+    def test_timeout(self):
+        cache = self.cache()
+        with mock.patch('time.time', return_value=1000.0):
+            cache.set('key', 'value', timeout=10)
+            cache.set('forever', 'value', timeout=None)
+        with mock.patch('time.time', return_value=1009.0):
+            self.assertEqual(cache.get('key'), 'value')
+            self.assertTrue(cache.touch('key', timeout=10))
+        with mock.patch('time.time', return_value=1018.0):
+            self.assertEqual(cache.get('key'), 'value')
+        with mock.patch('time.time', return_value=1020.0):
+            self.assertIsNone(cache.get('key'))
+            self.assertEqual(cache.get('forever'), 'value')
+        cache.set('key', 'value', timeout=0)
+        self.assertIsNone(cache.get('key'))
+
+    def test_add(self):
+        cache = self.cache()
+        self.assertTrue(cache.add('key', 'first'))
+        self.assertFalse(cache.add('key', 'second'))
+        self.assertEqual(cache.get('key'), 'first')
+        with mock.patch('time.time', return_value=time.time() + 1000):
+            self.assertTrue(cache.add('key', 'after expiry'))
+
+    def test_incr(self):
+        cache = self.cache()
+        cache.set('counter', 1)
+        self.assertEqual(cache.incr('counter'), 2)
+        self.assertEqual(cache.incr('counter', 10), 12)
+        self.assertEqual(cache.decr('counter', 2), 10)
+        self.assertEqual(cache.get('counter'), 10)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+
+    def test_full_bucket_evicts_with_second_chance(self):
+        cache = self.cache()
+        for number in range(8):
+            cache.set(f'key{number}', number)
+        # Every slot was just written (referenced): the hand clears them all and takes the first.
+        cache.set('key8', 8)
+        self.assertIsNone(cache.get('key0'))
+        self.assertEqual([cache.has_key(f'key{number}') for number in range(1, 9)], [True] * 8)
+        # The has_key calls don't count as reads; get does.
+        self.assertEqual(cache.get('key1'), 1)
+        cache.set('key9', 9)
+        self.assertEqual(cache.get('key1'), 1)
+        self.assertIsNone(cache.get('key2'))
+        self.assertEqual(cache.get('key9'), 9)
+
+    def test_clear(self):
+        cache = self.cache()
+        cache.set('key', 'value')
+        cache.clear()
+        self.assertIsNone(cache.get('key'))
+        cache.set('key', 'again')
+        self.assertEqual(cache.get('key'), 'again')
+
+    def test_incr_is_atomic_across_processes(self):
+        cache = self.cache()
+        cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=_incr_many, args=(cache, 200)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        _incr_many(cache, 200)
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        self.assertEqual(cache.get('counter'), 1000)
+
+    def test_file_larger_than_the_free_space_is_refused(self):
+        # One free block of 4 KiB.
+        free = os.statvfs_result((4096, 4096, 1000, 1, 1, 1000, 100, 100, 0, 255))
+        with mock.patch('os.fstatvfs', return_value=free), self.assertRaises(ImproperlyConfigured):
+            self.cache().get('key')
+        self.assertIsNone(self.cache().get('key'))
+
+    def path(self):
+        cache = self.cache()
+        cache.set('key', 'value')
+        return next(os.scandir(os.path.dirname(self.location))).path
+
+    def test_file_is_created_private(self):
+        self.assertEqual(os.stat(self.path()).st_mode & 0o777, 0o600)
+        self.assertEqual(self.cache().get('key'), 'value')
+
+    def test_file_others_can_write_is_refused(self):
+        path = self.path()
+        os.chmod(path, 0o666)
+        # A process of its own opens the file again.
+        with mock.patch('os.getpid', return_value=-1), self.assertRaises(ImproperlyConfigured):
+            self.cache().get('key')
+
+    def test_file_of_another_user_is_refused(self):
+        path = self.path()
+        with mock.patch('os.getpid', return_value=-1), \
+                mock.patch('os.getuid', return_value=os.stat(path).st_uid + 1), \
+                self.assertRaises(ImproperlyConfigured):
+            self.cache().get('key')
+
+    def test_symlink_is_not_followed(self):
+        path = self.path()
+        os.rename(path, path + '.target')
+        os.symlink(path + '.target', path)
+        with mock.patch('os.getpid', return_value=-1), self.assertRaises(OSError):
+            self.cache().get('key')
+
+
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Category.objects.create(name='branding', name_ar='هوية')
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1.0)
+    def test_header_and_log_record(self):
+        with self.assertLogs('api.timing', 'INFO') as logs:
+            response = self.client.get('/api/categories/')
+        self.assertEqual(response.status_code, 200)
+        parts = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertEqual(list(parts), ['db', 'serialize', 'render', 'total'])
+        self.assertRegex(parts['db'], r'^dur=\d+\.\d\d;desc="\d+ queries"$')
+
+        [record] = logs.records
+        timing = record.timing
+        self.assertEqual(timing['view'], 'CategoryViewSet.list')
+        self.assertEqual((timing['method'], timing['path'], timing['status']), ('GET', '/api/categories/', 200))
+        self.assertIn(f'desc="{timing["db_queries"]} queries"', parts['db'])
+        self.assertEqual(parts['total'], f'dur={timing["total_ms"]:.2f}')
+        self.assertGreaterEqual(timing['total_ms'], timing['db_ms'])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0.0)
+    def test_unsampled_request(self):
+        with self.assertNoLogs('api.timing', 'INFO'):
+            response = self.client.get('/api/categories/')
+        self.assertNotIn('Server-Timing', response)
+
+
+class StreamingListTests(TestCase):
+    """The unpaginated user list, streamed in chunks of two under WSGI and ASGI."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'password', is_staff=True, is_active=True)
+        for number in range(4):
+            User.objects.create_user(f'user{number}', f'user{number}@example.com', 'password')
+
+    def setUp(self):
+        for name, value in (('stream_chunk_size', 2), ('pagination_class', None)):
+            patch = mock.patch(f'users.views.UserViewSet.{name}', value)
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.authorization = f'Bearer {AccessToken.for_user(self.admin)}'
+
+    def assert_user_list(self, chunks):
+        data = json.loads(b''.join(chunks))
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(len(data['results']), 5)
+        # '{...,"results":[', three chunks of rows, ']}'
+        self.assertEqual(len(chunks), 5)
+
+    def test_wsgi(self):
+        response = Client().get('/api/users/', HTTP_AUTHORIZATION=self.authorization)
+        self.assertFalse(response.is_async)
+        self.assert_user_list(list(response.streaming_content))
+
+    async def test_asgi_is_not_buffered(self):
+        response = await AsyncClient().get('/api/users/', headers={'Authorization': self.authorization})
+        # A sync iterator would be read into a list before the first chunk is sent.
+        self.assertTrue(response.is_async)
+        self.assert_user_list([chunk async for chunk in response.streaming_content])
+
+
+@skipUnless(
+    'replica_0' in settings.DATABASES,
+    'needs a replica, e.g. DATABASE_REPLICA_URLS=sqlite:////tmp/replica.sqlite3',
+)
+@override_settings(REPLICA_PIN_SECONDS=60)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Routing between two real databases. The replica's test database is a
+    separate one without replication, so each read shows where it went.
+    """
+    databases = {'default', 'replica_0'}
+
+    def setUp(self):
+        routers._health.clear()
+        self.addCleanup(routers._health.clear)
+        caches = {'default': {**settings.CACHES['default'], 'KEY_PREFIX': f'test-{uuid.uuid4().hex}'}}
+        cache_settings = override_settings(CACHES=caches)
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+        # Replicas get no migrations; give this one the table the test reads.
+        with connections['replica_0'].schema_editor() as editor:
+            editor.create_model(Category)
+        self.addCleanup(self.drop_replica_table)
+        Category.objects.using('default').create(name='primary', name_ar='primary')
+        Category.objects.using('replica_0').create(name='replica', name_ar='replica')
+
+    def drop_replica_table(self):
+        with connections['replica_0'].schema_editor() as editor:
+            editor.delete_model(Category)
+
+    def category_names(self, client=None, **extra):
+        response = (client or Client()).get('/api/categories/', **extra)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [category['name'] for category in data.get('results', data)]
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(self.category_names(), ['replica'])
+
+    def test_reads_outside_requests_and_writes_go_to_the_primary(self):
+        self.assertEqual(list(Category.objects.values_list('name', flat=True)), ['primary'])
+        with routers.replica_reads():
+            self.assertEqual(list(Category.objects.values_list('name', flat=True)), ['replica'])
+            Category.objects.create(name='written', name_ar='written')
+        self.assertTrue(Category.objects.using('default').filter(name='written').exists())
+        self.assertFalse(Category.objects.using('replica_0').filter(name='written').exists())
+
+    def test_write_pins_the_client_to_the_primary(self):
+        client = Client()
+        response = client.post('/api/contacts/', {
+            'name': 'Reader', 'email': 'reader@example.com', 'subject': 'Hi', 'message': 'Hello',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        self.assertEqual(self.category_names(client), ['primary'])
+        # API clients echo the header instead of keeping the cookie.
+        self.assertEqual(self.category_names(HTTP_X_DB_PIN=response['X-DB-Pin']), ['primary'])
+        self.assertEqual(self.category_names(HTTP_X_DB_PIN=str(int(time.time()) - 1)), ['replica'])
+
+    def test_unavailable_replica_falls_back_to_the_primary(self):
+        with mock.patch.object(routers, 'replica_lag', side_effect=ConnectionError('replica down')), \
+                self.assertLogs('api.routers', 'WARNING'):
+            self.assertEqual(self.category_names(), ['primary'])
+
+    @override_settings(REPLICA_MAX_LAG=5)
+    def test_lagging_replica_falls_back_to_the_primary(self):
+        with mock.patch.object(routers, 'replica_lag', return_value=30.0), self.assertLogs('api.routers', 'WARNING'):
+            self.assertEqual(self.category_names(), ['primary'])
@@ -0,0 +1,164 @@
+"""
+Per-request timing helpers.
+
+A ``RequestTimer`` is attached to the current request through a context
+variable so that code deep inside serializers can attribute time to the
+request without having the request object at hand.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from functools import partial
+
+from rest_framework import serializers
+
+_current_timer = contextvars.ContextVar('request_timer', default=None)
+_query_observers = contextvars.ContextVar('query_observers', default=())
+
+
+class RequestTimer:
+    """Accumulates named durations (in seconds) and DB query stats for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.label = None
+        self._depth = {}
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, name):
+        # Nested spans of the same name (e.g. a nested serializer) are only
+        # counted once, by the outermost span.
+        depth = self._depth.get(name, 0)
+        self._depth[name] = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth[name] = depth
+            if depth == 0:
+                self.add(name, time.perf_counter() - start)
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - start
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self, total=None):
+        data = {
+            'view': self.label,
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_time * 1000, 2),
+        }
+        for name, seconds in self.durations.items():
+            data[f'{name}_ms'] = round(seconds * 1000, 2)
+        data['total_ms'] = round((self.total if total is None else total) * 1000, 2)
+        return data
+
+    def server_timing(self, total=None):
+        """Render the collected values as a ``Server-Timing`` header value."""
+        parts = [f'db;dur={self.db_time * 1000:.2f};desc="{self.db_queries} queries"']
+        parts.extend(f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.durations.items())
+        parts.append(f'total;dur={(self.total if total is None else total) * 1000:.2f}')
+        return ', '.join(parts)
+
+
+def get_current_timer():
+    return _current_timer.get()
+
+
+@contextmanager
+def activate(timer):
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_timer.reset(token)
+
+
+@contextmanager
+def measure(name):
+    """Attribute the enclosed block to ``name`` on the active timer, if any."""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.measure(name):
+        yield
+
+
+def _dispatch_query(execute, sql, params, many, context):
+    observers = _query_observers.get()
+    for observer in reversed(observers):
+        execute = partial(observer, execute)
+    return execute(sql, params, many, context)
+
+
+def install_query_dispatcher(sender, connection, **kwargs):
+    """
+    ``connection_created`` receiver that adds a permanent execute wrapper
+    forwarding to the observers registered by ``instrument_queries``.
+    Observers live in a context variable rather than on the (thread-local)
+    connection, so queries that async views run through ``sync_to_async``
+    are seen as well.
+    """
+    if _dispatch_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_dispatch_query)
+
+
+@contextmanager
+def instrument_queries(wrapper):
+    """Route every query executed in the current context through ``wrapper``."""
+    token = _query_observers.set(_query_observers.get() + (wrapper,))
+    try:
+        yield
+    finally:
+        _query_observers.reset(token)
+
+
+def view_label(view_func, method):
+    """
+    Build a ``ViewSet.action`` style label for a resolved view,
+    e.g. ``ProjectViewSet.list`` or ``LoginView.post``.
+    """
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', view_func.__class__.__name__)
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return f'{cls.__name__}.{action}'
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with measure('serialize'):
+            return super().data
+
+
+class TimedSerializerMixin:
+    """Report the time spent building ``serializer.data`` as the ``serialize`` span."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_serializer = super().many_init(*args, **kwargs)
+        if type(list_serializer) is serializers.ListSerializer:
+            list_serializer.__class__ = TimedListSerializer
+        return list_serializer
+
+    @property
+    def data(self):
+        with measure('serialize'):
+            return super().data
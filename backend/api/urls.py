@@ -1,12 +1,14 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 
-from users.views import UserViewSet, LoginView, RegisterView, verify_email  # Add verify_email import
+from users.views import UserViewSet, LoginView, LogoutView, LogoutAllView, RegisterView, verify_email  # Add verify_email import
 from projects.views import ProjectViewSet, CategoryViewSet
 from contact.views import ContactViewSet
 from comments.views import CommentViewSet
 from jobapplicant.views import JobApplicationViewSet
+from .views import HomePageView, ProjectPageView, StatsView
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
@@ -16,10 +18,30 @@ router.register(r'contacts', ContactViewSet)
 router.register(r'comments', CommentViewSet)
 router.register(r'job-applications', JobApplicationViewSet)
 
+if settings.ASYNC_READ_VIEWS:
+    from .async_views import hybrid_view, project_list, project_detail, project_featured, category_list, comment_list
+
+    async_routes = {
+        'project-list': project_list,
+        'project-detail': project_detail,
+        'project-featured': project_featured,
+        'category-list': category_list,
+        'comment-list': comment_list,
+    }
+    for pattern in router.urls:
+        # Skip the format-suffix variants (e.g. /projects.json); DRF keeps serving those.
+        if pattern.name in async_routes and 'format' not in pattern.pattern.regex.groupindex:
+            pattern.callback = hybrid_view(async_routes[pattern.name], pattern.callback)
+
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/login/', LoginView.as_view(), name='token_obtain_pair'),
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('auth/logout/', LogoutView.as_view(), name='logout'),
+    path('auth/logout-all/', LogoutAllView.as_view(), name='logout-all'),
     path('auth/register/', RegisterView.as_view(), name='register'),
     path('auth/verify-email/', verify_email, name='verify-email'), 
+    path('pages/home/', HomePageView.as_view(), name='page-home'),
+    path('pages/project/<int:pk>/', ProjectPageView.as_view(), name='page-project'),
+    path('stats/', StatsView.as_view(), name='stats'),
 ]
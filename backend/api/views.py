@@ -1,3 +1,75 @@
-from django.shortcuts import render
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from projects.models import Project
+from projects.serializers import ProjectSerializer
+from users.authentication import JWTAuthentication
+from users.permissions import IsAdminOrStaff
+from . import metrics, pages, stats
+
+
+class MetricsView(APIView):
+    """
+    Prometheus scrape endpoint. Admin/staff only; scrapers can use basic
+    auth with a staff account, browsers an admin session.
+    """
+    authentication_classes = [JWTAuthentication, BasicAuthentication, SessionAuthentication]
+    permission_classes = [IsAdminOrStaff]
+
+    def get(self, request):
+        return HttpResponse(
+            metrics.render_text(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+
+
+class StatsView(APIView):
+    """
+    Admin dashboard numbers in one request: totals, applications per
+    position, per-day series for the last ``?days=`` days (default 30)
+    and the latest projects. Served from the ``DailyStat`` rollups.
+    """
+    permission_classes = [IsAdminOrStaff]
+    recent_projects = 5
+
+    def get(self, request):
+        try:
+            days = int(request.query_params.get('days', stats.DEFAULT_DAYS))
+        except ValueError:
+            days = stats.DEFAULT_DAYS
+        data = stats.dashboard(max(1, min(days, stats.MAX_DAYS)))
+        recent = (
+            Project.objects.select_related('category').prefetch_related('images')
+            .order_by('-created_at')[:self.recent_projects]
+        )
+        data['recent_projects'] = ProjectSerializer(recent, many=True, context={'request': request}).data
+        return Response(data)
+
+
+class HomePageView(APIView):
+    """
+    Everything the SPA home page needs in one request: featured projects,
+    categories with project counts and the latest projects.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return Response(pages.cached_page(request, 'home', lambda: pages.home_payload(request)))
+
+
+class ProjectPageView(APIView):
+    """A project with its gallery, first page of comments and related projects."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, pk):
+        def build():
+            project = get_object_or_404(Project.objects.select_related('category'), pk=pk)
+            return pages.project_payload(request, project)
+
+        return Response(pages.cached_page(request, f'project:{pk}', build))
@@ -1,10 +1,12 @@
 from django.contrib import admin
+from api.admin import AutocompleteListFilter, ScalableAdminMixin
 from .models import Comment
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'project', 'content_preview', 'created_at')
-    list_filter = ('created_at', 'project')
+    list_select_related = ('user', 'project')
+    list_filter = ('created_at', ('project', AutocompleteListFilter), ('user', AutocompleteListFilter))
     search_fields = ('content', 'user__email', 'project__title')
     readonly_fields = ('created_at', 'updated_at')
     
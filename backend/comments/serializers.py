@@ -2,8 +2,9 @@ from rest_framework import serializers
 from .models import Comment
 from users.models import User
 from users.serializers import UserSerializer
+from api.timing import TimedSerializerMixin
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user_details = UserSerializer(source='user', read_only=True)
     user = serializers.PrimaryKeyRelatedField(
         queryset=User.objects.all(),
@@ -3,9 +3,12 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Comment
 from .serializers import CommentSerializer
+import logging
+
+logger = logging.getLogger(__name__)
 
 class CommentViewSet(viewsets.ModelViewSet):
-    queryset = Comment.objects.all().order_by('-created_at')
+    queryset = Comment.objects.select_related('user').order_by('-created_at')
     serializer_class = CommentSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
     filterset_fields = ['project', 'user']
@@ -33,11 +36,7 @@ class CommentViewSet(viewsets.ModelViewSet):
         """
         Create a new comment with proper error handling.
         """
-        print("Received data:", request.data)  # Debug log
-        print("Request user:", request.user)    # Debug log
-        
         if not request.user or not request.user.is_authenticated:
-            print("User not authenticated")  # Debug log
             return Response(
                 {"detail": "Authentication credentials were not provided."},
                 status=status.HTTP_401_UNAUTHORIZED
@@ -57,9 +56,8 @@ class CommentViewSet(viewsets.ModelViewSet):
         # Pass the request to the serializer context
         serializer = self.get_serializer(data=data, context={'request': request})
         
-        # Print validation errors for debugging
         if not serializer.is_valid():
-            print("Validation errors:", serializer.errors)  # Debug log
+            logger.debug("Invalid comment data: %s", serializer.errors)
             return Response(
                 {"detail": "Invalid data", "errors": serializer.errors},
                 status=status.HTTP_400_BAD_REQUEST
@@ -74,7 +72,7 @@ class CommentViewSet(viewsets.ModelViewSet):
                 headers=headers
             )
         except Exception as e:
-            print("Error creating comment:", str(e))  # Debug log
+            logger.exception("Error creating comment: %s", e)
             return Response(
                 {"detail": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -1,7 +1,8 @@
 from django.contrib import admin
+from api.admin import ScalableAdminMixin
 from .models import Contact
 
-class ContactAdmin(admin.ModelAdmin):
+class ContactAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'email', 'subject', 'created_at', 'is_read')
     list_filter = ('is_read', 'created_at')
     search_fields = ('name', 'email', 'subject', 'message')
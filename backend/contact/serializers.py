@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from .models import Contact
+from api.timing import TimedSerializerMixin
 
-class ContactSerializer(serializers.ModelSerializer):
+class ContactSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Contact
         fields = ['id', 'name', 'email', 'subject', 'message', 'created_at', 'is_read']
@@ -0,0 +1,56 @@
+"""
+Gunicorn configuration, picked up automatically when gunicorn is started
+from this directory:
+
+    gunicorn pervasion.wsgi
+
+The app is loaded once in the master (``preload_app``) and workers are
+forked from it, so they start warm and share the imported modules
+copy-on-write instead of each importing Django, DRF and the URLconf.
+Code changes therefore need a full restart rather than a HUP.
+"""
+import gc
+import multiprocessing
+import os
+import sys
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+preload_app = True
+
+# Worker metrics (api/metrics.py) are kept under this server's control:
+# emptied at start and archived as workers exit.
+os.environ.setdefault('METRICS_ENABLED', 'true')
+
+
+def on_starting(server):
+    # With preload_app the app (and so Django) is already loaded when the
+    # master starts; this runs once, before any worker is forked.
+    from api.metrics import clear_metrics_dir
+    clear_metrics_dir()
+
+
+def when_ready(server):
+    # Move everything allocated while preloading into the permanent
+    # generation so that garbage collection in the workers doesn't touch
+    # (and thereby copy) those pages.
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    # Fold the exited worker's metrics into the archive right away.
+    from django.conf import settings
+    if settings.METRICS_ENABLED:
+        from api.metrics import archive_process
+        archive_process(worker.pid)
+
+
+def pre_fork(server, worker):
+    # A connection opened by the master must not be shared by the workers.
+    from django.db import connections
+    connections.close_all()
+    # With the pooled backend, "closing" only returned them to the pool.
+    pool_backend = sys.modules.get('api.db.postgresql_pool.base')
+    if pool_backend is not None:
+        pool_backend.close_idle_connections()
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from .models import JobApplication
+from api.timing import TimedSerializerMixin
 
-class JobApplicationSerializer(serializers.ModelSerializer):
+class JobApplicationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = JobApplication
         fields = [
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pervasion.settings')
+# Serve the public read endpoints with the native async views.
+os.environ.setdefault('ASYNC_READ_VIEWS', 'true')
 
 application = get_asgi_application()
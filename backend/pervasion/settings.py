@@ -4,14 +4,24 @@ Generated by 'django-admin startproject' using Django 4.2.10.
 This settings file reads configuration from environment (.env) and is
 prepared for both development and production usage.
 """
+import hashlib
 import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
 from django.core.exceptions import ImproperlyConfigured
 
-# Load environment variables from .env (if present)
-load_dotenv()
+# BASE_DIR
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Load environment variables from the nearest .env at or above this
+# directory, as a bare load_dotenv() would, but without python-dotenv's
+# stack-walking search for the calling file.
+for _directory in Path(__file__).resolve().parents:
+    if (_directory / ".env").is_file():
+        load_dotenv(_directory / ".env")
+        break
 
 # Helpers
 def env_bool(key, default=False):
@@ -30,9 +40,6 @@ def get_env(key, default=None, required_in_prod=False):
         raise ImproperlyConfigured(f"Missing required environment variable: {key}")
     return v
 
-# BASE_DIR
-BASE_DIR = Path(__file__).resolve().parent.parent
-
 # SECURITY
 SECRET_KEY = get_env("SECRET_KEY", None, required_in_prod=True)
 
@@ -68,15 +75,20 @@ INSTALLED_APPS = [
 
 # Middleware ordering: Security -> WhiteNoise -> CORS -> Sessions -> Common -> ...
 MIDDLEWARE = [
+    "api.middleware.ServerTimingMiddleware",  # first, so "total" covers the whole stack
+    "api.middleware.MetricsMiddleware",
+    "api.middleware.ReplicaRoutingMiddleware",  # no-op unless DATABASE_REPLICA_URLS is set
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",  # serve static files efficiently
+    "api.middleware.WhiteNoiseMiddleware",  # serve static files efficiently (async-capable WhiteNoise)
+    "api.middleware.SnapshotMiddleware",  # no-op unless SNAPSHOT_ENABLED
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.query_detector.DuplicateQueryMiddleware",  # no-op unless QUERY_DETECTOR_ENABLED
 ]
 
 ROOT_URLCONF = "pervasion.urls"
@@ -110,6 +122,48 @@ DATABASES = {
     )
 }
 
+# Read replicas (comma separated URLs), used by api.routers.ReplicaRouter for
+# safe-method reads of the REPLICA_APPS models. Under tests each replica is a
+# test database of its own, so that routing can be observed (api/tests.py).
+for index, url in enumerate(env_list("DATABASE_REPLICA_URLS")):
+    DATABASES[f"replica_{index}"] = dj_database_url.parse(
+        url, conn_max_age=DATABASES["default"]["CONN_MAX_AGE"], conn_health_checks=True,
+    )
+DATABASE_ROUTERS = ["api.routers.ReplicaRouter"]
+REPLICA_APPS = env_list("REPLICA_APPS", "projects,comments")  # categories live in projects
+REPLICA_MAX_LAG = float(get_env("REPLICA_MAX_LAG", 5))  # seconds; beyond that read the primary
+REPLICA_HEALTH_CHECK_INTERVAL = float(get_env("REPLICA_HEALTH_CHECK_INTERVAL", 5))
+REPLICA_PIN_SECONDS = int(get_env("REPLICA_PIN_SECONDS", 10))  # read-your-writes window after a write
+REPLICA_PIN_COOKIE = "db_pin"
+
+# In-process connection pool: add pool_* options to a database URL, e.g.
+# ?pool_size=10&pool_timeout=5 (see api/db/postgresql_pool). Django then
+# "closes" the connection after each request, which returns it to the pool.
+for database in DATABASES.values():
+    if any(key.startswith("pool_") for key in database.get("OPTIONS", {})):
+        database["ENGINE"] = "api.db.postgresql_pool"
+        database["CONN_MAX_AGE"] = 0
+
+# Cache shared by all worker processes on this host, without a cache server:
+# a hash table in a memory-mapped file (api/cache.py). CACHE_LOCATION is the
+# file's path prefix; put it on tmpfs. By default it is on /dev/shm (or the
+# temporary directory) and named after this checkout and its database, so
+# that two deployments on one host never share entries. CACHE_BACKEND can
+# select another backend (e.g. django.core.cache.backends.locmem.LocMemCache).
+_cache_owner = "|".join(
+    [str(BASE_DIR)] + [str(DATABASES["default"].get(key, "")) for key in ("HOST", "PORT", "NAME")]
+)
+_cache_directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+CACHES = {
+    "default": {
+        "BACKEND": get_env("CACHE_BACKEND", "api.cache.MmapCache"),
+        "LOCATION": get_env(
+            "CACHE_LOCATION",
+            os.path.join(_cache_directory, f"pervasion-cache-{hashlib.sha256(_cache_owner.encode()).hexdigest()[:12]}"),
+        ),
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -137,8 +191,7 @@ if not DEBUG:
 
 # Media files
 MEDIA_URL = "/media/"
-MEDIA_ROOT = BASE_DIR / "media"
-os.makedirs(MEDIA_ROOT, exist_ok=True)
+MEDIA_ROOT = BASE_DIR / "media"  # created by ApiConfig.ready()
 
 # Default file storage (can be changed to S3 via env)
 DEFAULT_FILE_STORAGE = get_env("DEFAULT_FILE_STORAGE", "django.core.files.storage.FileSystemStorage")
@@ -153,7 +206,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # REST Framework
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.JWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
@@ -185,8 +238,16 @@ SIMPLE_JWT = {
     "USER_ID_CLAIM": "user_id",
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_TYPE_CLAIM": "token_type",
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.TokenRefreshSerializer",
 }
 
+# Token revocation (users/revocation.py): each process checks tokens against
+# a Bloom filter of the revoked ones, rebuilt when a revocation bumps the
+# cache version and at least every REVOCATION_SYNC_SECONDS. Only filter
+# hits (revoked tokens plus this fraction of the others) query the table.
+REVOCATION_SYNC_SECONDS = int(get_env("REVOCATION_SYNC_SECONDS", 60))
+REVOCATION_BLOOM_ERROR_RATE = float(get_env("REVOCATION_BLOOM_ERROR_RATE", 0.001))
+
 # CORS configuration
 # prefer reading origins from env; fallback to a sensible local-dev list
 # CORS_ALLOWED_ORIGINS = env_list(
@@ -219,9 +280,9 @@ CORS_ALLOW_METHODS = [
 ]
 CORS_ALLOW_HEADERS = env_list(
     "CORS_ALLOW_HEADERS",
-    "accept,accept-encoding,authorization,content-type,dnt,origin,user-agent,x-csrftoken,x-requested-with",
+    "accept,accept-encoding,authorization,content-type,dnt,origin,user-agent,x-csrftoken,x-requested-with,x-db-pin",
 )
-CORS_EXPOSE_HEADERS = env_list("CORS_EXPOSE_HEADERS", "content-disposition")
+CORS_EXPOSE_HEADERS = env_list("CORS_EXPOSE_HEADERS", "content-disposition,server-timing,x-db-pin")
 CORS_PREFLIGHT_MAX_AGE = int(get_env("CORS_PREFLIGHT_MAX_AGE", 86400))
 
 # Custom user model
@@ -241,8 +302,7 @@ DEFAULT_FROM_EMAIL = get_env("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER)
 # For local development: fallback to console backend if credentials not provided
 if DEBUG and (not EMAIL_HOST_USER or not EMAIL_HOST_PASSWORD):
     EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
-    # avoid printing secrets; only informational
-    print("INFO: Using console email backend (DEBUG=True). Real email credentials not configured.")
+    # reported by the api.I001 system check rather than printed on every import
 
 # Frontend URL (include scheme if possible)
 FRONTEND_URL = get_env("FRONTEND_URL", "http://localhost:8000")
@@ -263,8 +323,7 @@ SECURE_BROWSER_XSS_FILTER = True
 X_FRAME_OPTIONS = "DENY"
 
 # Logging: basic file logging for production; console in DEBUG
-LOG_DIR = BASE_DIR / "logs"
-LOG_DIR.mkdir(exist_ok=True)
+LOG_DIR = BASE_DIR / "logs"  # created by ApiConfig.ready(); the file handler opens lazily
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -274,6 +333,7 @@ LOGGING = {
             "level": "INFO",
             "class": "logging.FileHandler",
             "filename": str(LOG_DIR / "django.log"),
+            "delay": True,
         },
     },
     "root": {"handlers": ["console", "file"] if not DEBUG else ["console"], "level": "INFO"},
@@ -291,6 +351,71 @@ SECURE_SSL_REDIRECT = SECURE_SSL_REDIRECT
 # Example: pagination default page size (can be overridden by PAGE_SIZE env)
 PAGE_SIZE = int(get_env("PAGE_SIZE", 10))
 
+# Performance instrumentation: fraction of requests (0.0-1.0) that get a
+# Server-Timing header and an "api.timing" log record.
+SERVER_TIMING_SAMPLE_RATE = float(get_env("SERVER_TIMING_SAMPLE_RATE", 1.0 if DEBUG else 0.0))
+
+# N+1 / duplicate query detection (see api/query_detector.py). Enable on staging;
+# MODE is "warn" (log) or "raise" (fail the request).
+QUERY_DETECTOR_ENABLED = env_bool("QUERY_DETECTOR_ENABLED", False)
+QUERY_DETECTOR_THRESHOLD = int(get_env("QUERY_DETECTOR_THRESHOLD", 5))
+QUERY_DETECTOR_MODE = get_env("QUERY_DETECTOR_MODE", "warn")
+
+# Prometheus metrics exposed at /metrics (admin only). Each worker process
+# writes to its own mmap file in METRICS_DIR; the endpoint sums them, and
+# folds the files of exited processes into one archive. gunicorn.conf.py
+# turns them on, as it also starts each run with an empty METRICS_DIR.
+METRICS_ENABLED = env_bool("METRICS_ENABLED", False)
+METRICS_DIR = get_env("METRICS_DIR", os.path.join(tempfile.gettempdir(), "pervasion-metrics"))
+
+# Serve the public read endpoints with native async views (api/async_views.py).
+# pervasion/asgi.py turns this on; under WSGI the sync viewsets are used.
+ASYNC_READ_VIEWS = env_bool("ASYNC_READ_VIEWS", False)
+
+# Seconds a bundled /api/pages/ payload may be cached. Model changes
+# invalidate them immediately; this bounds changes made without signals.
+PAGE_CACHE_TIMEOUT = int(get_env("PAGE_CACHE_TIMEOUT", 300))
+
+# Upper bound in seconds on the age of a process's /api/projects/suggest/
+# index; project changes made through the ORM rebuild it right away.
+SUGGEST_INDEX_MAX_AGE = int(get_env("SUGGEST_INDEX_MAX_AGE", 300))
+
+# /api/projects/featured/ returns at most ?limit= projects, by default
+# FEATURED_PROJECTS_LIMIT; ?page= pages through all of them instead.
+FEATURED_PROJECTS_LIMIT = int(get_env("FEATURED_PROJECTS_LIMIT", 12))
+FEATURED_PROJECTS_MAX_LIMIT = int(get_env("FEATURED_PROJECTS_MAX_LIMIT", 100))
+
+# Static JSON snapshot of the public portfolio (api/snapshot.py), published by
+# `manage.py publish_snapshot` and after model changes, served by WhiteNoise.
+# SNAPSHOT_BASE_URL is the public origin of this API; absolute links in the
+# files use it and only requests to that origin are served from the snapshot.
+SNAPSHOT_ENABLED = env_bool("SNAPSHOT_ENABLED", False)
+SNAPSHOT_ROOT = get_env("SNAPSHOT_ROOT", str(BASE_DIR / "snapshots"))
+SNAPSHOT_BASE_URL = get_env("SNAPSHOT_BASE_URL", "http://localhost:8000")
+SNAPSHOT_KEEP_VERSIONS = int(get_env("SNAPSHOT_KEEP_VERSIONS", 3))
+SNAPSHOT_DEBOUNCE = float(get_env("SNAPSHOT_DEBOUNCE", 5))  # seconds after a change before publishing
+SNAPSHOT_MAX_AGE = int(get_env("SNAPSHOT_MAX_AGE", 60))  # Cache-Control max-age of snapshot responses
+
+# Admin changelists over unfiltered tables at least this large (PostgreSQL
+# row estimate) show the estimate instead of running COUNT(*) (api/admin.py).
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(get_env("ADMIN_ESTIMATED_COUNT_THRESHOLD", 10000))
+
+# Retention (`manage.py retention`, api/retention.py): age in days after which
+# rows are archived to RETENTION_ARCHIVE_DIR and deleted; 0 keeps them forever.
+# Read contacts only; unverified users once their verification link expired.
+RETENTION_CONTACT_DAYS = int(get_env("RETENTION_CONTACT_DAYS", 365))
+RETENTION_APPLICATION_DAYS = int(get_env("RETENTION_APPLICATION_DAYS", 730))
+RETENTION_COMMENT_DAYS = int(get_env("RETENTION_COMMENT_DAYS", 0))
+RETENTION_UNVERIFIED_USER_GRACE_HOURS = int(get_env("RETENTION_UNVERIFIED_USER_GRACE_HOURS", 24))
+RETENTION_ARCHIVE_DIR = get_env("RETENTION_ARCHIVE_DIR", str(BASE_DIR / "archive"))
+
+# Bulk project import (POST /api/projects/import/, `manage.py import_projects`):
+# the most a bundle may expand to, the longest side images are downscaled
+# to, and the image-processing processes (0: one per CPU).
+IMPORT_MAX_BUNDLE_BYTES = int(get_env("IMPORT_MAX_BUNDLE_BYTES", 2 * 1024 ** 3))
+IMPORT_MAX_IMAGE_SIDE = int(get_env("IMPORT_MAX_IMAGE_SIDE", 2560))
+IMPORT_WORKERS = int(get_env("IMPORT_WORKERS", 0))
+
 # Example: additional third-party config placeholders
 # SIMPLE_THIRD_PARTY_CONFIG = { ... }
 
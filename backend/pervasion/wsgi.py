@@ -10,7 +10,13 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 import os
 
 from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pervasion.settings')
 
 application = get_wsgi_application()
+
+# Import the URLconf (and with it every view, serializer and DRF module) now
+# instead of on the first request. With gunicorn's preload_app (see
+# gunicorn.conf.py) this happens once in the master and workers share it.
+get_resolver().url_patterns
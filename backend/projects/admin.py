@@ -1,16 +1,19 @@
 from django.contrib import admin
+from api.admin import PaginatedInlineMixin, ScalableAdminMixin
 from .models import Project, Category, ProjectImage
 
-class ProjectImageInline(admin.TabularInline):
+class ProjectImageInline(PaginatedInlineMixin, admin.TabularInline):
     model = ProjectImage
     extra = 1
+    per_page = 20
 
-class ProjectAdmin(admin.ModelAdmin):
-    list_display = ('title', 'category', 'client', 'date', 'featured')
+class ProjectAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('title', 'category', 'client', 'date', 'featured', 'comment_count', 'image_count')
+    list_select_related = ('category',)
     list_filter = ('category', 'featured', 'date')
     search_fields = ('title', 'title_ar', 'description', 'description_ar', 'client')
     date_hierarchy = 'date'
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'comment_count', 'image_count', 'last_comment_at')
     inlines = [ProjectImageInline]
 
 class CategoryAdmin(admin.ModelAdmin):
@@ -0,0 +1,73 @@
+"""
+Denormalized ``Project`` counters: ``comment_count``, ``image_count`` and
+``last_comment_at``.
+
+The receivers in ``projects.signals`` adjust them with single ``F()``
+updates as comments and gallery images are created and deleted. Code
+that bypasses signals (``bulk_create``) calls ``images_added`` or runs
+``recount``. ``recount()`` (the ``recount`` command) repairs drift in
+batches.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Greatest
+
+from comments.models import Comment
+from .models import COUNTER_FIELDS, Project, ProjectImage
+
+
+def comment_added(project_id, created_at):
+    Project.objects.filter(pk=project_id).update(
+        comment_count=F('comment_count') + 1, last_comment_at=created_at,
+    )
+
+
+def comment_removed(project_id):
+    latest = Comment.objects.filter(project=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+    Project.objects.filter(pk=project_id).update(
+        comment_count=Greatest(F('comment_count') - 1, 0), last_comment_at=Subquery(latest),
+    )
+
+
+def images_added(project_id, count=1):
+    Project.objects.filter(pk=project_id).update(image_count=F('image_count') + count)
+
+
+def images_removed(project_id, count=1):
+    Project.objects.filter(pk=project_id).update(image_count=Greatest(F('image_count') - count, 0))
+
+
+def recount(batch_size=1000, progress=None):
+    """
+    Recompute the counters of every project, ``batch_size`` projects per
+    transaction, and write those that drifted. Returns the number of
+    projects corrected.
+    """
+    project_ids = list(Project.objects.order_by('pk').values_list('pk', flat=True))
+    corrected = 0
+    for start in range(0, len(project_ids), batch_size):
+        batch = project_ids[start:start + batch_size]
+        with transaction.atomic():
+            # Locking the rows holds back concurrent F() updates until the batch is written.
+            projects = list(Project.objects.filter(pk__in=batch).select_for_update().only('pk', *COUNTER_FIELDS))
+            comments = {
+                row['project']: row for row in
+                Comment.objects.filter(project__in=batch).order_by()
+                .values('project').annotate(count=Count('pk'), last=Max('created_at'))
+            }
+            images = dict(
+                ProjectImage.objects.filter(project__in=batch).order_by()
+                .values('project').annotate(count=Count('pk')).values_list('project', 'count')
+            )
+            stale = []
+            for project in projects:
+                row = comments.get(project.pk, {'count': 0, 'last': None})
+                actual = (row['count'], images.get(project.pk, 0), row['last'])
+                if (project.comment_count, project.image_count, project.last_comment_at) != actual:
+                    project.comment_count, project.image_count, project.last_comment_at = actual
+                    stale.append(project)
+            Project.objects.bulk_update(stale, COUNTER_FIELDS)
+        corrected += len(stale)
+        if progress:
+            progress(min(start + batch_size, len(project_ids)), len(project_ids))
+    return corrected
@@ -0,0 +1,398 @@
+"""
+ZIP export of projects and their media (``GET /api/projects/export/`` and
+``manage.py export_projects``), for backups and migrations.
+
+The archive holds every main and gallery image under its storage name,
+followed by ``manifest.json`` in the format ``projects.importer`` reads,
+so an export can be imported elsewhere as it is.
+
+The ZIP is written here rather than with ``zipfile`` so that its bytes
+are a pure function of the data:
+
+* Images are stored, not deflated: the formats we accept are already
+  compressed. Their sizes are therefore known from the storage up front,
+  and only their CRC follows the data (in a data descriptor), computed
+  while the file is sent.
+* The manifest is deflated into a spooled temporary file before its
+  entry is written.
+* Timestamps come from the files and the projects, not from the clock.
+
+A full download is generated while it is sent, one chunk at a time, with
+memory bounded by the central directory (a few dozen bytes per file).
+A file shared by several projects is archived once.
+Knowing every size lets a ``Range`` request be answered too: the archive
+is laid out without reading any image, and images before the range are
+skipped (their CRC comes from the cache, filled by earlier downloads, or
+is computed from the file). ``etag`` changes whenever the selected
+projects do, so that a client resuming with ``If-Range`` after a change
+gets the whole new archive instead of a mix of two.
+
+Files of 4 GiB or more are left out; the archive itself uses ZIP64 when
+it grows past 4 GiB or 65535 entries.
+
+A file that disappears or changes size between the layout and its turn
+to be sent would make the rest of the archive wrong, so sending stops
+there with ``ExportChanged``. Nothing inconsistent has been sent by
+then, and the client gets an incomplete download instead of a corrupt
+archive that looks whole.
+"""
+import datetime
+import hashlib
+import json
+import logging
+import struct
+import tempfile
+import zlib
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import Category, Project, ProjectImage
+
+logger = logging.getLogger(__name__)
+MANIFEST_NAME = 'manifest.json'
+CHUNK_SIZE = 64 * 1024
+# CRCs of exported files, keyed by name, size and modification time.
+CRC_CACHE_TIMEOUT = 30 * 24 * 3600
+
+STORED, DEFLATED = 0, 8
+UTF8_NAMES = 0x800
+DATA_DESCRIPTOR = 0x08
+MAX_32 = 0xFFFFFFFF
+MAX_16 = 0xFFFF
+DOS_EPOCH = datetime.datetime(1980, 1, 1)
+
+
+class ExportChanged(Exception):
+    """A file no longer matches the archive's layout."""
+
+
+class _Entry:
+    """One archive member: a stored file from the storage, or the deflated manifest."""
+
+    def __init__(self, name, size, modified, path=None, data=None, crc=None, raw_size=None):
+        self.name = name
+        self.encoded_name = name.encode('utf-8')
+        self.size = size
+        self.raw_size = size if raw_size is None else raw_size
+        self.path = path
+        self.data = data
+        self.crc = crc
+        self.dos_time, self.dos_date = _dos_datetime(modified)
+
+    @property
+    def method(self):
+        return STORED if self.path else DEFLATED
+
+    @property
+    def flags(self):
+        # Only the CRC of storage files is unknown when their header is written.
+        return UTF8_NAMES | (DATA_DESCRIPTOR if self.path else 0)
+
+    @property
+    def crc_key(self):
+        name = hashlib.md5(self.encoded_name).hexdigest()
+        return f'projects:export:crc:{name}:{self.size}:{self.dos_date}:{self.dos_time}'
+
+    def local_header(self):
+        crc, size, raw_size = (0, 0, 0) if self.path else (self.crc, self.size, self.raw_size)
+        return struct.pack(
+            '<IHHHHHIIIHH', 0x04034B50, 20, self.flags, self.method, self.dos_time, self.dos_date,
+            crc, size, raw_size, len(self.encoded_name), 0,
+        ) + self.encoded_name
+
+    def descriptor(self, crc):
+        if not self.path:
+            return b''
+        return struct.pack('<IIII', 0x08074B50, crc, self.size, self.raw_size)
+
+    def central_header(self, crc, offset):
+        extra = b''
+        if offset >= MAX_32:
+            extra = struct.pack('<HHQ', 0x0001, 8, offset)
+            offset = MAX_32
+        version = 45 if extra else 20
+        return struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014B50, version, version, self.flags, self.method,
+            self.dos_time, self.dos_date, crc, self.size, self.raw_size,
+            len(self.encoded_name), len(extra), 0, 0, 0, 0o100644 << 16, offset,
+        ) + self.encoded_name + extra
+
+    def chunks(self):
+        if self.path:
+            try:
+                f = default_storage.open(self.path, 'rb')
+            except OSError as e:
+                raise ExportChanged(f'{self.path} can no longer be read: {e}') from e
+            with f:
+                # Exactly the size laid out, which the headers and offsets depend on.
+                remaining = self.size
+                while remaining:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise ExportChanged(f'{self.path} shrank below {self.size} bytes')
+                    remaining -= len(chunk)
+                    yield chunk
+                if f.read(1):
+                    raise ExportChanged(f'{self.path} grew past {self.size} bytes')
+        else:
+            self.data.seek(0)
+            yield from iter(lambda: self.data.read(CHUNK_SIZE), b'')
+
+    def read_crc(self):
+        """The CRC of a storage file, from the cache or by reading it."""
+        crc = cache.get(self.crc_key)
+        if crc is None:
+            crc = 0
+            for chunk in self.chunks():
+                crc = zlib.crc32(chunk, crc)
+            cache.set(self.crc_key, crc, CRC_CACHE_TIMEOUT)
+        return crc
+
+
+def _dos_datetime(value):
+    if timezone.is_aware(value):
+        value = timezone.localtime(value).replace(tzinfo=None)
+    value = max(value, DOS_EPOCH)
+    return (
+        value.hour << 11 | value.minute << 5 | value.second // 2,
+        (value.year - 1980) << 9 | value.month << 5 | value.day,
+    )
+
+
+def _end_of_archive(entries, directory_offset, directory_size):
+    end = b''
+    if entries >= MAX_16 or directory_offset >= MAX_32 or directory_size >= MAX_32:
+        zip64_offset = directory_offset + directory_size
+        end += struct.pack(
+            '<IQHHIIQQQQ', 0x06064B50, 44, 45, 45, 0, 0,
+            entries, entries, directory_size, directory_offset,
+        )
+        end += struct.pack('<IIQI', 0x07064B50, 0, zip64_offset, 1)
+    return end + struct.pack(
+        '<IHHHHIIH', 0x06054B50, 0, 0, min(entries, MAX_16), min(entries, MAX_16),
+        min(directory_size, MAX_32), min(directory_offset, MAX_32), 0,
+    )
+
+
+class ProjectExport:
+    """The ZIP export of ``queryset``; see the module docstring."""
+
+    def __init__(self, queryset):
+        self.queryset = queryset.select_related('category').prefetch_related('images').order_by('pk')
+
+    @cached_property
+    def _state(self):
+        projects = self.queryset.aggregate(count=Count('pk'), changed=Max('updated_at'))
+        images = ProjectImage.objects.filter(project__in=self.queryset.values('pk')).aggregate(
+            count=Count('pk'), last=Max('pk'),
+        )
+        categories = Category.objects.aggregate(changed=Max('updated_at'))
+        return projects, images, categories
+
+    @cached_property
+    def etag(self):
+        """Changes when a selected project, its gallery or a category does."""
+        state = repr((str(self.queryset.query), self._state))
+        return f'"{hashlib.md5(state.encode()).hexdigest()}"'
+
+    @cached_property
+    def last_modified(self):
+        projects, images, categories = self._state
+        changes = [value for value in (projects['changed'], categories['changed']) if value]
+        return max(changes) if changes else DOS_EPOCH
+
+    def _file(self, name):
+        """The entry for a stored image, or None if it is missing or too large."""
+        try:
+            size = default_storage.size(name)
+            modified = default_storage.get_modified_time(name)
+        except (OSError, NotImplementedError):
+            return None
+        if size >= MAX_32:
+            return None
+        return _Entry(name, size, modified, path=name)
+
+    def _entries(self):
+        """Every image entry, then the manifest's; generated as the projects are read."""
+        manifest = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        crc = raw_size = 0
+
+        def write(text):
+            nonlocal crc, raw_size
+            data = text.encode('utf-8')
+            crc = zlib.crc32(data, crc)
+            raw_size += len(data)
+            manifest.write(compressor.compress(data))
+
+        try:
+            yield from self._image_entries(write)
+        except BaseException:
+            # Including GeneratorExit: the stream stopped before the manifest.
+            manifest.close()
+            raise
+        manifest.write(compressor.flush())
+        yield _Entry(MANIFEST_NAME, manifest.tell(), self.last_modified, data=manifest, crc=crc, raw_size=raw_size)
+
+    def _image_entries(self, write):
+        """Yield the image entries and ``write`` the manifest's JSON."""
+        # Storage name -> whether it is in the archive; projects may share a file.
+        exported = {}
+
+        write('{"projects": [')
+        for number, project in enumerate(self.queryset.iterator(chunk_size=500)):
+            names = [project.image.name] + [image.image.name for image in project.images.all()]
+            for name in names:
+                if name and name not in exported:
+                    entry = self._file(name)
+                    exported[name] = entry is not None
+                    if entry:
+                        yield entry
+            image, *gallery = [name if name and exported[name] else None for name in names]
+            category = project.category
+            row = {
+                'id': project.pk,
+                'title': project.title,
+                'title_ar': project.title_ar,
+                'description': project.description,
+                'description_ar': project.description_ar,
+                'category': category.name if category else None,
+                'category_ar': category.name_ar if category else None,
+                'client': project.client,
+                'date': project.date,
+                'featured': project.featured,
+                'image': image,
+                'gallery': [name for name in gallery if name],
+                'created_at': project.created_at,
+            }
+            write((',\n' if number else '\n') + json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+        write('\n]}\n')
+
+    @cached_property
+    def entries(self):
+        """All entries, materialized; needed to know the length before sending."""
+        return list(self._entries())
+
+    @cached_property
+    def length(self):
+        offset = directory_size = 0
+        for entry in self.entries:
+            directory_size += len(entry.central_header(0, offset))
+            offset += len(entry.local_header()) + entry.size + len(entry.descriptor(0))
+        return offset + directory_size + len(_end_of_archive(len(self.entries), offset, directory_size))
+
+    def stream(self, start=0, stop=None):
+        """
+        Yield the bytes ``start`` to ``stop`` (exclusive) of the archive.
+        Only the whole archive is generated while the projects are read.
+        Raises ``ExportChanged`` if a file changed since the layout.
+        """
+        chunks = self._stream(start, stop)
+        try:
+            for chunk in chunks:
+                if chunk:
+                    yield chunk
+        finally:
+            # Now rather than whenever it is collected: StreamingHttpResponse closes us.
+            chunks.close()
+
+    def _stream(self, start, stop):
+        materialized = bool(start) or stop is not None
+        entries = self.entries if materialized else self._entries()
+        position = 0
+
+        def cut(data):
+            """The part of ``data`` (found at ``position``) inside the range."""
+            nonlocal position
+            begin = position
+            position += len(data)
+            if position <= start or (stop is not None and begin >= stop):
+                return b''
+            return data[max(start - begin, 0):len(data) if stop is None else stop - begin]
+
+        def done():
+            return stop is not None and position >= stop
+
+        directory = []
+        sent = []
+        try:
+            for entry in entries:
+                sent.append(entry)
+                offset = position
+                yield cut(entry.local_header())
+                if not entry.path:
+                    crc = entry.crc
+                    for chunk in entry.chunks():
+                        yield cut(chunk)
+                        if done():
+                            return
+                elif position + entry.size <= start:
+                    crc = entry.read_crc()
+                    position += entry.size
+                else:
+                    crc = 0
+                    for chunk in entry.chunks():
+                        crc = zlib.crc32(chunk, crc)
+                        yield cut(chunk)
+                        if done():
+                            return
+                    cache.set(entry.crc_key, crc, CRC_CACHE_TIMEOUT)
+                yield cut(entry.descriptor(crc))
+                directory.append((entry, crc, offset))
+                if done():
+                    return
+            directory_offset = position
+            for entry, crc, offset in directory:
+                yield cut(entry.central_header(crc, offset))
+            yield cut(_end_of_archive(len(directory), directory_offset, position - directory_offset))
+        except ExportChanged as e:
+            logger.warning('Export stopped at byte %d: %s', position, e)
+            raise
+        finally:
+            if not materialized:
+                # Closes the manifest if it wasn't handed out yet.
+                entries.close()
+            for entry in entries if materialized else sent:
+                if entry.data is not None:
+                    entry.data.close()
+
+
+def parse_range(header, length):
+    """
+    ``(start, stop)`` for a single ``bytes=`` range of a ``length``-byte
+    body, None if ``header`` isn't one (the whole body is sent), or
+    ValueError if the range is unsatisfiable.
+    """
+    unit, _, spec = (header or '').partition('=')
+    if unit.strip() != 'bytes' or ',' in spec:
+        return None
+    first, _, last = spec.strip().partition('-')
+    try:
+        if first:
+            start = int(first)
+            stop = min(int(last) + 1, length) if last else length
+        else:
+            start = max(length - int(last), 0)
+            stop = length
+    except ValueError:
+        return None
+    if start >= length or stop <= start:
+        raise ValueError(f'Range not satisfiable for {length} bytes')
+    return start, stop
+
+
+def select_projects(category=None, date_from=None, date_to=None):
+    """The projects to export: all of them, or those of a category and/or date range."""
+    queryset = Project.objects.all()
+    if category is not None:
+        queryset = queryset.filter(category_id=category)
+    if date_from is not None:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to is not None:
+        queryset = queryset.filter(date__lte=date_to)
+    return queryset
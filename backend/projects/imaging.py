@@ -0,0 +1,30 @@
+"""
+Image checks for bulk imports, run in worker processes.
+
+This module imports nothing from Django so that ``spawn``-ed pool
+workers can load it without configuring settings.
+"""
+from PIL import Image, UnidentifiedImageError
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+
+
+def process_image(path, max_side):
+    """
+    Verify the image at ``path`` and downscale it in place so neither side
+    exceeds ``max_side``. Returns an error message, or None if it is usable.
+    """
+    try:
+        with Image.open(path) as image:
+            image.verify()
+        with Image.open(path) as image:
+            if image.format not in ALLOWED_FORMATS:
+                return f'Unsupported image format {image.format}.'
+            if max(image.size) > max_side:
+                image_format = image.format
+                image.thumbnail((max_side, max_side))
+                options = {'quality': 90} if image_format == 'JPEG' else {}
+                image.save(path, format=image_format, **options)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        return 'Not a valid image.'
+    return None
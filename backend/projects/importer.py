@@ -0,0 +1,219 @@
+"""
+Bulk import of projects from a ZIP bundle (``POST /api/projects/import/``
+and ``manage.py import_projects``).
+
+The bundle holds ``manifest.csv`` or ``manifest.json`` at its root plus
+the images it references. Each manifest row has ``title``, ``title_ar``,
+``description``, ``description_ar``, ``category`` (its name in either
+language), ``client``, ``date`` (YYYY-MM-DD), ``featured``, ``image`` (a
+path inside the bundle) and optionally ``gallery`` (``;``-separated
+paths in CSV, a list in JSON).
+
+The archive is extracted member by member to a temporary directory, so
+it is never held in memory. Rows are validated with
+``ProjectImportRowSerializer``. The images they reference are verified
+and downscaled in a process pool. Valid rows are inserted with
+``bulk_create``, ``batch_size`` projects per transaction. Rows that fail
+are skipped and listed in the report with their errors.
+
+``bulk_create`` sends no ``post_save``, so ``projects_imported`` is sent
+instead, with the new projects and gallery rows. Its receivers update
+what the save signals normally would.
+"""
+import csv
+import json
+import multiprocessing
+import os
+import posixpath
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.dispatch import Signal
+
+from .imaging import process_image
+from .models import Category, Project, ProjectImage, project_gallery_image_path, project_image_path
+from .serializers import ProjectImportRowSerializer
+
+MANIFEST_NAMES = ('manifest.csv', 'manifest.json')
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Sent with ``projects`` and ``images`` after each imported batch commits.
+projects_imported = Signal()
+
+
+class ImportBundleError(Exception):
+    """The bundle as a whole can't be imported (not a ZIP, no manifest, too large)."""
+
+
+def _extract(source, directory):
+    """Stream every file of the ZIP ``source`` into ``directory``; return their paths."""
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile:
+        raise ImportBundleError('The bundle is not a ZIP file.')
+    names = set()
+    total = 0
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            name = posixpath.normpath(info.filename)
+            if name.startswith(('/', '../')) or name == '..':
+                raise ImportBundleError(f'Unsafe path in bundle: {info.filename}')
+            # Reads stop at the declared size, so this bounds what is written.
+            total += info.file_size
+            if total > settings.IMPORT_MAX_BUNDLE_BYTES:
+                raise ImportBundleError(
+                    f'The bundle expands to more than {settings.IMPORT_MAX_BUNDLE_BYTES} bytes.'
+                )
+            target = os.path.join(directory, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with archive.open(info) as src, open(target, 'wb') as dst:
+                shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+            names.add(name)
+    return names
+
+
+def _read_manifest(directory, names):
+    """Return ``(row number, row)`` pairs from the bundle's manifest."""
+    if 'manifest.csv' in names:
+        with open(os.path.join(directory, 'manifest.csv'), encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f)
+            rows = []
+            for row in reader:
+                # Empty cells mean "use the default"; the header is line 1.
+                row = {key: value for key, value in row.items() if key and value not in ('', None)}
+                if 'gallery' in row:
+                    row['gallery'] = row['gallery'].split(';')
+                rows.append((reader.line_num, row))
+            return rows
+    if 'manifest.json' in names:
+        with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as f:
+            try:
+                data = json.load(f)
+            except ValueError as e:
+                raise ImportBundleError(f'manifest.json is not valid JSON: {e}')
+        if isinstance(data, dict):
+            data = data.get('projects')
+        if not isinstance(data, list):
+            raise ImportBundleError('manifest.json must be a list of projects.')
+        return list(enumerate(data, start=1))
+    raise ImportBundleError(f"The bundle has no {' or '.join(MANIFEST_NAMES)} at its root.")
+
+
+def _category_lookup():
+    lookup = {}
+    for pk, name, name_ar in Category.objects.values_list('pk', 'name', 'name_ar'):
+        lookup.setdefault(name.casefold(), pk)
+        lookup.setdefault(name_ar.casefold(), pk)
+    return lookup
+
+
+def _process_images(directory, paths, workers):
+    """Verify/downscale ``paths`` in a process pool; return ``{path: error}`` for the failures."""
+    paths = sorted(paths)
+    full_paths = [os.path.join(directory, path) for path in paths]
+    max_side = settings.IMPORT_MAX_IMAGE_SIDE
+    if workers <= 1 or len(paths) < 2:
+        results = map(process_image, full_paths, repeat(max_side))
+        return {path: error for path, error in zip(paths, results) if error}
+    # spawn: don't fork a process holding DB connections and server threads.
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        results = pool.map(process_image, full_paths, repeat(max_side), chunksize=8)
+        return {path: error for path, error in zip(paths, results) if error}
+
+
+def _store(directory, path, name):
+    with open(os.path.join(directory, path), 'rb') as f:
+        return default_storage.save(name, File(f))
+
+
+def _insert_batch(directory, rows):
+    """Store the files of ``rows`` and insert them in one transaction."""
+    stored = []
+    try:
+        projects = []
+        for data in rows:
+            name = _store(directory, data['image'], project_image_path(None, posixpath.basename(data['image'])))
+            stored.append(name)
+            projects.append(Project(
+                title=data['title'], title_ar=data['title_ar'],
+                description=data['description'], description_ar=data['description_ar'],
+                category_id=data['category'], client=data['client'], date=data['date'],
+                featured=data['featured'], image=name, image_count=len(data['gallery']),
+            ))
+        with transaction.atomic():
+            Project.objects.bulk_create(projects)
+            images = []
+            for project, data in zip(projects, rows):
+                for order, path in enumerate(data['gallery']):
+                    image = ProjectImage(project=project, order=order)
+                    image.image = _store(directory, path, project_gallery_image_path(image, posixpath.basename(path)))
+                    stored.append(image.image.name)
+                    images.append(image)
+            ProjectImage.objects.bulk_create(images)
+            transaction.on_commit(lambda: projects_imported.send(
+                sender=Project, projects=projects, images=images,
+            ))
+    except Exception:
+        for name in stored:
+            default_storage.delete(name)
+        raise
+    return projects
+
+
+def import_bundle(source, workers=None, batch_size=100, progress=None):
+    """
+    Import the projects of the ZIP ``source`` (a path or a seekable file).
+    Returns ``{'created': n, 'project_ids': [...], 'errors': [...]}``, where
+    each error is ``{'row': n, 'title': ..., 'errors': {field: [messages]}}``.
+    Raises ``ImportBundleError`` if nothing can be imported.
+    """
+    workers = workers or settings.IMPORT_WORKERS or os.cpu_count() or 1
+    errors = []
+    created = []
+    with tempfile.TemporaryDirectory(prefix='project-import-') as directory:
+        names = _extract(source, directory)
+        manifest = _read_manifest(directory, names)
+        context = {'categories': _category_lookup(), 'files': names}
+
+        valid = []
+        for number, row in manifest:
+            serializer = ProjectImportRowSerializer(data=row, context=context)
+            if serializer.is_valid():
+                valid.append((number, serializer.validated_data))
+            else:
+                errors.append({'row': number, 'title': row.get('title') if isinstance(row, dict) else None,
+                               'errors': serializer.errors})
+
+        paths = {path for _, data in valid for path in [data['image'], *data['gallery']]}
+        image_errors = _process_images(directory, paths, workers)
+        rows = []
+        for number, data in valid:
+            row_errors = {}
+            if data['image'] in image_errors:
+                row_errors['image'] = [image_errors[data['image']]]
+            gallery_errors = [f'{path}: {image_errors[path]}' for path in data['gallery'] if path in image_errors]
+            if gallery_errors:
+                row_errors['gallery'] = gallery_errors
+            if row_errors:
+                errors.append({'row': number, 'title': data['title'], 'errors': row_errors})
+            else:
+                rows.append(data)
+
+        for start in range(0, len(rows), batch_size):
+            projects = _insert_batch(directory, rows[start:start + batch_size])
+            created.extend(project.pk for project in projects)
+            if progress:
+                progress(len(created), len(rows))
+
+    errors.sort(key=lambda error: error['row'])
+    return {'created': len(created), 'project_ids': created, 'errors': errors}
@@ -0,0 +1,108 @@
+"""
+Incremental reader for large JSON documents shaped like the legacy
+JSON Server ``db.json`` (a top-level object of arrays).
+
+Only one array element is held in memory at a time; the read buffer is
+compacted as it is consumed.
+"""
+import json
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _Reader:
+    def __init__(self, fp, chunk_size=64 * 1024):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        data = self.fp.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f'Expected {char!r} at offset {self.pos}, found {self.peek()!r}')
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number may continue past the end of the buffer.
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self):
+        """Yield the elements of the array starting at the current position."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            char = self.peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f'Expected "," or "]" at offset {self.pos - 1}, found {char!r}')
+
+    def skip(self):
+        if self.peek() == '[':
+            for _ in self.items():
+                pass
+        else:
+            self.value()
+
+
+def iter_array(fp, key):
+    """
+    Yield the elements of the top-level array ``key`` from an open text
+    file, without loading the whole document. Yields nothing if the key
+    is missing.
+    """
+    reader = _Reader(fp)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        name = reader.value()
+        reader.expect(':')
+        if name == key:
+            if reader.peek() == '[':
+                yield from reader.items()
+            else:
+                reader.value()
+            return
+        reader.skip()
+        char = reader.peek()
+        reader.pos += 1
+        if char == '}':
+            return
+        if char != ',':
+            raise ValueError(f'Expected "," or "}}" at offset {reader.pos - 1}, found {char!r}')
@@ -0,0 +1,35 @@
+import datetime
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.export import ExportChanged, ProjectExport, select_projects
+
+
+class Command(BaseCommand):
+    help = 'Write a ZIP of the projects, their images and a manifest that import_projects can read'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the ZIP file to write')
+        parser.add_argument('--category', type=int, help='Only projects of this category id')
+        parser.add_argument('--date-from', type=datetime.date.fromisoformat, help='Only projects dated on or after (YYYY-MM-DD)')
+        parser.add_argument('--date-to', type=datetime.date.fromisoformat, help='Only projects dated on or before (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        export = ProjectExport(select_projects(
+            category=options['category'], date_from=options['date_from'], date_to=options['date_to'],
+        ))
+        written = 0
+        try:
+            with open(options['output'], 'wb') as f:
+                for chunk in export.stream():
+                    f.write(chunk)
+                    written += len(chunk)
+        except ExportChanged as e:
+            os.remove(options['output'])
+            raise CommandError(f'{e}; run the export again.')
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} bytes to {options['output']} in {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.importer import ImportBundleError, import_bundle
+
+
+class Command(BaseCommand):
+    help = 'Import projects from a ZIP bundle with a manifest.csv or manifest.json and their images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('bundle', help='Path of the ZIP bundle')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Image-processing processes (default: IMPORT_WORKERS, or one per CPU)')
+        parser.add_argument('--batch-size', type=int, default=100, help='Projects inserted per transaction')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(done, total):
+            self.stdout.write(f'  {done}/{total} projects')
+
+        try:
+            report = import_bundle(
+                options['bundle'], workers=options['workers'],
+                batch_size=options['batch_size'], progress=progress,
+            )
+        except (ImportBundleError, OSError) as e:
+            raise CommandError(str(e))
+        for error in report['errors']:
+            messages = '; '.join(
+                f'{field}: {" ".join(str(m) for m in problems)}' for field, problems in error['errors'].items()
+            )
+            self.stderr.write(f"  row {error['row']} ({error['title'] or 'untitled'}): {messages}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} projects, skipped {len(report['errors'])} rows "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
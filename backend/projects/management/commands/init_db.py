@@ -1,119 +1,190 @@
-import json
 import os
-from django.core.management.base import BaseCommand
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
-from projects.models import Category, Project
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction, DataError, IntegrityError
+from projects.jsonstream import iter_array
+from projects.models import Category, ImportProgress, Project
 from contact.models import Contact
 
 User = get_user_model()
 
+# Import order matters: projects reference the category id map.
+SECTIONS = ('users', 'categories', 'projects', 'contact')
+# What a bad record raises on insert (duplicates, malformed dates, values
+# too long or of the wrong type); such records are reported and skipped.
+ROW_ERRORS = (IntegrityError, ValidationError, DataError, ValueError)
+
+
 class Command(BaseCommand):
     help = 'Initialize database with sample data from the old JSON Server'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='Path to the legacy db.json (defaults to ../server/db.json)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Discard the progress of an interrupted import of the file and start over',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Import even if the database already contains users',
+        )
+
     def handle(self, *args, **kwargs):
         self.stdout.write(self.style.SUCCESS('Starting database initialization...'))
-        
-        # Check if we already have data
-        if User.objects.exists():
+        self.batch_size = kwargs['batch_size']
+
+        # Try to find the old db.json file
+        json_file_path = kwargs['file'] or os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '..', 'server', 'db.json')
+        source = os.path.abspath(json_file_path)
+        if kwargs['restart']:
+            ImportProgress.objects.filter(source=source).delete()
+        progress = ImportProgress.objects.filter(source=source).first()
+
+        # Check if we already have data (an interrupted import is resumed instead)
+        if progress is None and User.objects.exists() and not kwargs['force']:
             self.stdout.write(self.style.WARNING('Database already contains data. Skipping initialization.'))
             return
-        
-        # Try to find the old db.json file
-        json_file_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '..', 'server', 'db.json')
-        
+
         if not os.path.exists(json_file_path):
             self.stdout.write(self.style.WARNING(f'Could not find db.json at {json_file_path}. Creating default data instead.'))
             self._create_default_data()
             return
-        
+
+        if progress is None:
+            progress = ImportProgress.objects.create(source=source)
+        else:
+            self.stdout.write(self.style.WARNING(f"Resuming import: {progress.done}"))
+        self.progress = progress
+        # old JSON id -> new category pk; JSON object keys are always strings
+        self.category_map = progress.category_map
+
         try:
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            # Create users
-            self.stdout.write('Creating users...')
-            for user_data in data.get('users', []):
-                try:
-                    # Skip if user doesn't have required fields
-                    if not all(k in user_data for k in ['username', 'email', 'password']):
-                        continue
-                        
-                    User.objects.create_user(
-                        email=user_data['email'],
-                        username=user_data['username'],
-                        password=user_data['password'],
-                        name=user_data.get('name', ''),
-                        role=user_data.get('role', 'user')
-                    )
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f'Error creating user {user_data.get("username")}: {str(e)}'))
-            
-            # Create categories
-            self.stdout.write('Creating categories...')
-            category_map = {}  # To map old IDs to new objects
-            for cat_data in data.get('categories', []):
-                try:
-                    category = Category.objects.create(
-                        name=cat_data.get('name', ''),
-                        name_ar=cat_data.get('nameAr', '')
-                    )
-                    category_map[cat_data.get('id')] = category
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f'Error creating category {cat_data.get("name")}: {str(e)}'))
-            
-            # Create projects
-            self.stdout.write('Creating projects...')
-            for project_data in data.get('projects', []):
-                try:
-                    # Get category or use the first one
-                    category_id = project_data.get('category')
-                    category = category_map.get(category_id)
-                    
-                    if not category and Category.objects.exists():
-                        category = Category.objects.first()
-                    elif not category:
-                        # Create a default category if none exists
-                        category = Category.objects.create(name='Default', name_ar='افتراضي')
-                    
-                    # Create project
-                    Project.objects.create(
-                        title=project_data.get('title', ''),
-                        title_ar=project_data.get('titleAr', ''),
-                        description=project_data.get('description', ''),
-                        description_ar=project_data.get('descriptionAr', ''),
-                        category=category,
-                        image=project_data.get('image', ''),  # This will be a URL, not a file
-                        client=project_data.get('client', ''),
-                        date=project_data.get('date', '2025-01-01'),
-                        featured=project_data.get('featured', False)
-                    )
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f'Error creating project {project_data.get("title")}: {str(e)}'))
-            
-            # Create contacts
-            self.stdout.write('Creating contacts...')
-            for contact_data in data.get('contact', []):
-                try:
-                    Contact.objects.create(
-                        name=contact_data.get('name', ''),
-                        email=contact_data.get('email', ''),
-                        subject=contact_data.get('subject', ''),
-                        message=contact_data.get('message', ''),
-                        is_read=contact_data.get('is_read', False)
-                    )
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f'Error creating contact from {contact_data.get("name")}: {str(e)}'))
-            
-            self.stdout.write(self.style.SUCCESS('Database initialization completed successfully!'))
-            
+            for section in SECTIONS:
+                self.stdout.write(f'Importing {section}...')
+                self._import_section(json_file_path, section)
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Error initializing database: {str(e)}'))
-            self._create_default_data()
-    
+            raise CommandError(
+                f'Error initializing database: {str(e)}. '
+                'Progress has been saved; run the command again to resume.'
+            )
+
+        progress.delete()
+        # Batches are bulk-inserted, which skips the signals behind the dashboard stats.
+        call_command('rebuild_stats', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS('Database initialization completed successfully!'))
+
+    def _import_section(self, path, section):
+        done = self.progress.done.get(section, 0)
+        builder = getattr(self, f'_build_{section}')
+        batch = []
+        count = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for index, item in enumerate(iter_array(f, section)):
+                if index < done:
+                    continue
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    count += self._insert_batch(section, builder, batch)
+                    batch = []
+            if batch:
+                count += self._insert_batch(section, builder, batch)
+        self.stdout.write(f'  {count} {section} imported')
+
+    def _insert_batch(self, section, builder, items):
+        """Insert one batch in the transaction that also records progress."""
+        rows = [(item, obj) for item, obj in ((item, builder(item)) for item in items) if obj is not None]
+        model = type(rows[0][1]) if rows else None
+        created = []
+        category_map = dict(self.category_map)
+        done = {**self.progress.done, section: self.progress.done.get(section, 0) + len(items)}
+        with transaction.atomic():
+            if rows:
+                try:
+                    with transaction.atomic():
+                        created = model.objects.bulk_create([obj for item, obj in rows])
+                except ROW_ERRORS:
+                    # Fall back to row-by-row so one bad record doesn't sink the batch
+                    created = []
+                    for item, obj in rows:
+                        try:
+                            with transaction.atomic():
+                                obj.save(force_insert=True)
+                            created.append(obj)
+                        except ROW_ERRORS as e:
+                            self.stdout.write(self.style.ERROR(f'Error importing {section} {item.get("id")}: {str(e)}'))
+                            created.append(None)
+                if section == 'categories':
+                    for (item, obj), saved in zip(rows, created):
+                        if saved is not None:
+                            category_map[str(item.get('id'))] = saved.pk
+            # Committed with the rows or rolled back with them: a resumed
+            # import neither skips nor repeats the batch.
+            ImportProgress.objects.filter(pk=self.progress.pk).update(done=done, category_map=category_map)
+        # Only now that the batch is committed.
+        self.progress.done = done
+        self.progress.category_map = self.category_map = category_map
+        return sum(1 for obj in created if obj is not None)
+
+    def _build_users(self, user_data):
+        # Skip if user doesn't have required fields
+        if not all(k in user_data for k in ['username', 'email', 'password']):
+            return None
+        return User(
+            email=User.objects.normalize_email(user_data['email']),
+            username=user_data['username'],
+            password=make_password(user_data['password']),
+            name=user_data.get('name', ''),
+            role=user_data.get('role', 'user')
+        )
+
+    def _build_categories(self, cat_data):
+        return Category(
+            name=cat_data.get('name', ''),
+            name_ar=cat_data.get('nameAr', '')
+        )
+
+    def _build_projects(self, project_data):
+        category_id = self.category_map.get(str(project_data.get('category')))
+        if category_id is None:
+            category_id = self._fallback_category_id()
+        return Project(
+            title=project_data.get('title', ''),
+            title_ar=project_data.get('titleAr', ''),
+            description=project_data.get('description', ''),
+            description_ar=project_data.get('descriptionAr', ''),
+            category_id=category_id,
+            image=project_data.get('image', ''),  # This will be a URL, not a file
+            client=project_data.get('client', ''),
+            date=project_data.get('date', '2025-01-01'),
+            featured=project_data.get('featured', False)
+        )
+
+    def _fallback_category_id(self):
+        # Looked up once per run instead of once per project
+        if not hasattr(self, '_fallback_category'):
+            category = Category.objects.order_by('name').first()
+            if category is None:
+                category = Category.objects.create(name='Default', name_ar='افتراضي')
+            self._fallback_category = category.pk
+        return self._fallback_category
+
+    def _build_contact(self, contact_data):
+        return Contact(
+            name=contact_data.get('name', ''),
+            email=contact_data.get('email', ''),
+            subject=contact_data.get('subject', ''),
+            message=contact_data.get('message', ''),
+            is_read=contact_data.get('is_read', False)
+        )
+
     def _create_default_data(self):
         """Create default data if JSON import fails"""
         self.stdout.write('Creating default data...')
-        
+
         # Create admin user
         self.stdout.write('Creating admin user...')
         User.objects.create_superuser(
@@ -122,7 +193,7 @@ class Command(BaseCommand):
             password='admin123',
             name='Admin User'
         )
-        
+
         # Create categories
         self.stdout.write('Creating default categories...')
         categories = [
@@ -133,8 +204,7 @@ class Command(BaseCommand):
             {'name': 'print', 'name_ar': 'تصميم مطبوع'},
             {'name': 'motion', 'name_ar': 'رسومات متحركة'}
         ]
-        
-        for cat_data in categories:
-            Category.objects.create(**cat_data)
-        
+
+        Category.objects.bulk_create([Category(**cat_data) for cat_data in categories])
+
         self.stdout.write(self.style.SUCCESS('Default data created successfully!'))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.related import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the precomputed related projects of every project'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Projects written per transaction')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(done, total):
+            self.stdout.write(f'  {done}/{total} projects')
+
+        rows = rebuild(batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {rows} related project rows in {time.perf_counter() - started:.1f}s'
+        ))
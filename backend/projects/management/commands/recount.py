@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Recompute the comment and image counters of every project and fix any that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Projects checked per transaction')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(done, total):
+            self.stdout.write(f'  {done}/{total} projects')
+
+        corrected = recount(batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Corrected {corrected} projects in {time.perf_counter() - started:.1f}s'
+        ))
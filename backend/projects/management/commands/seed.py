@@ -0,0 +1,59 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from api.pages import bump_pages_version
+from projects import suggest
+from projects.seeding import SCALE_UNIT, seed_scale
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic bilingual data at a given scale factor using batched bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=float, default=1,
+            help=f'Scale factor; 1 unit = {SCALE_UNIT}',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (same seed, same data)')
+        parser.add_argument(
+            '--images', action='store_true',
+            help='Write tiny placeholder image files instead of referencing missing paths',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        last = {}
+
+        def progress(model, done):
+            # Report roughly every 50k rows per model.
+            name = model._meta.verbose_name_plural
+            if done - last.get(name, 0) >= 50000:
+                last[name] = done
+                self.stdout.write(f'  {name}: {done}')
+
+        self.stdout.write(f"Seeding scale {options['scale']}...")
+        counts = seed_scale(
+            options['scale'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            placeholder_images=options['images'],
+            progress=progress,
+        )
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Inserted {total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s): {counts}'
+        ))
+        # bulk_create skips the signals that keep related projects and the counters up to date.
+        self.stdout.write('Rebuilding related projects...')
+        call_command('rebuild_related', stdout=self.stdout)
+        self.stdout.write('Recounting comments and images...')
+        call_command('recount', stdout=self.stdout)
+        self.stdout.write('Rebuilding dashboard stats...')
+        call_command('rebuild_stats', stdout=self.stdout)
+        # Nor do the cached pages and the suggest index learn about the new projects.
+        suggest.bump_version()
+        bump_pages_version()
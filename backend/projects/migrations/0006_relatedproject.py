@@ -0,0 +1,33 @@
+# Generated by Django 4.2.10 on 2026-10-19 14:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_alter_project_category'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedProject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='rank')),
+                ('score', models.FloatField(verbose_name='score')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='projects.project', verbose_name='project')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.project', verbose_name='related project')),
+            ],
+            options={
+                'verbose_name': 'related project',
+                'verbose_name_plural': 'related projects',
+                'ordering': ['project', 'rank'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='relatedproject',
+            constraint=models.UniqueConstraint(fields=('project', 'rank'), name='unique_related_project_rank'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+import sys
+
+from django.db import DatabaseError, migrations, transaction
+
+# Trigram indexes for ?search= on /api/projects/ (SearchFilter's icontains
+# on title, title_ar and client); /api/projects/suggest/ doesn't use them,
+# it searches in memory. They index UPPER(column::text), the expression
+# Django's icontains lookup compares on PostgreSQL. Other databases are
+# left as they are.
+#
+# They need the pg_trgm extension. Creating it takes a role that may
+# create extensions in the database (its owner, on PostgreSQL 13+ for
+# trusted extensions like this one, or a superuser). Without it the
+# indexes are skipped: search still works, by sequential scan. To add
+# them later, run "CREATE EXTENSION pg_trgm" as such a role and then the
+# CREATE INDEX statements below as the app's role.
+INDEXED_COLUMNS = ('title', 'title_ar', 'client')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        # A savepoint: a refused CREATE EXTENSION mustn't abort the migration's transaction.
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError as e:
+        sys.stderr.write(f'  Skipping the trigram indexes, pg_trgm is not available: {e}\n')
+        return
+    for column in INDEXED_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS projects_project_{column}_trgm '
+            f'ON projects_project USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in INDEXED_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS projects_project_{column}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_relatedproject'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
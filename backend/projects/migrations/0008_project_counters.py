@@ -0,0 +1,50 @@
+# Generated by Django 4.2.10 on 2026-10-19 14:45
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    ProjectImage = apps.get_model('projects', 'ProjectImage')
+    Comment = apps.get_model('comments', 'Comment')
+
+    def per_project(model, aggregate):
+        return Subquery(
+            model.objects.filter(project=OuterRef('pk')).order_by()
+            .values('project').annotate(value=aggregate).values('value')
+        )
+
+    Project.objects.update(
+        comment_count=Coalesce(per_project(Comment, Count('pk')), 0, output_field=IntegerField()),
+        image_count=Coalesce(per_project(ProjectImage, Count('pk')), 0, output_field=IntegerField()),
+        last_comment_at=per_project(Comment, Max('created_at')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_project_trigram_indexes'),
+        ('comments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='comment count'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='image_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='image count'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='last_comment_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='last comment at'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.10 on 2026-10-19 15:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_terms(apps, schema_editor):
+    from projects.related import project_terms
+
+    Project = apps.get_model('projects', 'Project')
+    ProjectTerm = apps.get_model('projects', 'ProjectTerm')
+    batch = []
+    for row in Project.objects.order_by().values('id', 'title', 'title_ar', 'client').iterator(chunk_size=2000):
+        batch += [
+            ProjectTerm(project_id=row['id'], term=term, count=min(count, 32767))
+            for term, count in project_terms(row).items()
+        ]
+        if len(batch) >= 5000:
+            ProjectTerm.objects.bulk_create(batch)
+            batch = []
+    ProjectTerm.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_project_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(db_index=True, max_length=200, verbose_name='term')),
+                ('count', models.PositiveSmallIntegerField(default=1, verbose_name='count')),
+            ],
+            options={
+                'verbose_name': 'project term',
+                'verbose_name_plural': 'project terms',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['category', '-date'], name='project_category_date'),
+        ),
+        migrations.AddField(
+            model_name='projectterm',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.project', verbose_name='project'),
+        ),
+        migrations.AddConstraint(
+            model_name='projectterm',
+            constraint=models.UniqueConstraint(fields=('project', 'term'), name='unique_project_term'),
+        ),
+        migrations.RunPython(backfill_terms, migrations.RunPython.noop),
+    ]
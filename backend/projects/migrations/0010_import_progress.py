@@ -0,0 +1,27 @@
+# Generated by Django 4.2.10 on 2026-10-19 15:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_project_terms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=500, unique=True, verbose_name='source file')),
+                ('done', models.JSONField(default=dict, verbose_name='records done per section')),
+                ('category_map', models.JSONField(default=dict, verbose_name='category id map')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'import progress',
+                'verbose_name_plural': 'import progress',
+            },
+        ),
+    ]
@@ -1,13 +1,17 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+COUNTER_FIELDS = ('comment_count', 'image_count', 'last_comment_at')
+
+
 def project_image_path(instance, filename):
-    """Generate unique path for project images"""
-    if instance.id:
-        return f'projects/{instance.id}/{filename}'
-    from datetime import datetime
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    return f'projects/temp/{timestamp}_{filename}'
+    """
+    Generate the path for a project's main image. It doesn't depend on the
+    project id, so a new project's image is written once, at its final
+    location, before the row is inserted (the storage makes names unique).
+    """
+    return f'projects/images/{timezone.now():%Y/%m}/{filename}'
 
 
 def project_gallery_image_path(instance, filename):
@@ -68,11 +72,19 @@ class Project(models.Model):
     featured = models.BooleanField(_('featured'), default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters maintained by projects.counters
+    comment_count = models.PositiveIntegerField(_('comment count'), default=0, editable=False)
+    image_count = models.PositiveIntegerField(_('image count'), default=0, editable=False)
+    last_comment_at = models.DateTimeField(_('last comment at'), null=True, blank=True, editable=False)
     
     class Meta:
         verbose_name = _('project')
         verbose_name_plural = _('projects')
         ordering = ['-date']
+        indexes = [
+            # The newest projects of a category (related projects fill-up).
+            models.Index(fields=['category', '-date'], name='project_category_date'),
+        ]
     
     def __str__(self):
         return self.title
@@ -86,28 +98,17 @@ class Project(models.Model):
         return self.category.name_ar if self.category else _('غير مصنف')
 
     def save(self, *args, **kwargs):
-        is_new = self.pk is None
+        # The counters are only ever written with F() updates; a full save
+        # of a stale in-memory copy must not overwrite them.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
         super().save(*args, **kwargs)
-        
-        if is_new and self.image and 'temp' in self.image.name:
-            import os
-            from django.core.files.storage import default_storage
-            
-            # Get the old file path and name
-            old_name = self.image.name
-            filename = os.path.basename(old_name)
-            
-            # Generate the new path
-            new_path = f'projects/{self.id}/{filename}'
-            
-            # If the old file exists, move it to the new location
-            if default_storage.exists(old_name):
-                new_image = default_storage.save(new_path, self.image)
-                # Update the image field
-                self.image.name = new_image
-                super().save(update_fields=['image'])
-                # Delete the old file
-                default_storage.delete(old_name)
 
 class ProjectImage(models.Model):
     project = models.ForeignKey(
@@ -127,7 +128,76 @@ class ProjectImage(models.Model):
     def __str__(self):
         return f'{self.project.title} - Image {self.order}'
 
-    def save(self, *args, **kwargs):
-        if self.project.id is None:
-            self.project.save()
-        super().save(*args, **kwargs)
+
+class RelatedProject(models.Model):
+    """Precomputed "more like this" entry, maintained by ``projects.related``."""
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='related_links',
+        verbose_name=_('project')
+    )
+    related = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('related project')
+    )
+    rank = models.PositiveSmallIntegerField(_('rank'))
+    score = models.FloatField(_('score'))
+
+    class Meta:
+        verbose_name = _('related project')
+        verbose_name_plural = _('related projects')
+        ordering = ['project', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'rank'], name='unique_related_project_rank'),
+        ]
+
+    def __str__(self):
+        return f'{self.project_id} -> {self.related_id} ({self.score:.2f})'
+
+
+class ProjectTerm(models.Model):
+    """
+    A title term of a project, or its client as ``client:<name>``; lets
+    ``projects.related`` find the projects similar to one with an index.
+    """
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('project')
+    )
+    term = models.CharField(_('term'), max_length=200, db_index=True)
+    count = models.PositiveSmallIntegerField(_('count'), default=1)
+
+    class Meta:
+        verbose_name = _('project term')
+        verbose_name_plural = _('project terms')
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'term'], name='unique_project_term'),
+        ]
+
+    def __str__(self):
+        return f'{self.project_id}: {self.term}'
+
+
+class ImportProgress(models.Model):
+    """
+    How far ``manage.py init_db`` got with a source file. Saved in each
+    batch's transaction, so a resumed import continues exactly after the
+    last batch that was committed.
+    """
+    source = models.CharField(_('source file'), max_length=500, unique=True)
+    done = models.JSONField(_('records done per section'), default=dict)
+    # old JSON category id (a string) -> new category pk
+    category_map = models.JSONField(_('category id map'), default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('import progress')
+        verbose_name_plural = _('import progress')
+
+    def __str__(self):
+        return f'{self.source}: {self.done}'
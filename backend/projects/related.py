@@ -0,0 +1,332 @@
+"""
+Precomputed related projects ("more like this").
+
+Projects are compared on three signals: the same category, the same
+client, and overlap of title terms in both languages (TF-IDF weighted
+cosine similarity). Similarity is computed with sparse vectors and an
+inverted index, so each project is only compared with projects sharing
+at least one term, client or category, rather than with every project.
+
+The results are stored in ``RelatedProject`` (``RELATED_LIMIT`` rows per
+project). ``rebuild()`` recomputes everything; ``refresh_for_project()``
+is called after a project is saved and updates only the lists it enters
+or leaves. It doesn't read the whole table: each project's terms and
+client are kept in ``ProjectTerm``, whose index yields the projects that
+can score against the changed one, and whose counts give the term
+statistics. Lists the project enters have it merged into their stored
+entries, whose scores were computed with the statistics of their time,
+so an occasional full rebuild keeps them consistent.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.db.models import Count, Min
+
+from .models import Project, ProjectTerm, RelatedProject
+
+RELATED_LIMIT = 6
+TERM_WEIGHT = 0.5
+CATEGORY_WEIGHT = 0.3
+CLIENT_WEIGHT = 0.2
+# Terms in more than this share of projects carry little signal and would
+# make every project a candidate of every other one.
+MAX_DOCUMENT_FREQUENCY = 0.05
+
+# Sent with ``project_ids`` after their related lists were rewritten.
+related_projects_updated = Signal()
+
+# Fields whose change can affect similarity.
+SIMILARITY_FIELDS = {'title', 'title_ar', 'client', 'category', 'date'}
+ROW_FIELDS = ('id', 'title', 'title_ar', 'client', 'category_id', 'date')
+# Clients are stored with the terms; \w+ tokens never contain the colon.
+CLIENT_PREFIX = 'client:'
+TERM_MAX_LENGTH = 200
+
+_TOKEN_RE = re.compile(r'\w+')
+_ARABIC_DIACRITICS_RE = re.compile('[ً-ْـ]')
+_ARABIC_LETTERS = str.maketrans({'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ى': 'ي', 'ة': 'ه'})
+STOPWORDS = {
+    'the', 'and', 'for', 'of', 'a', 'an', 'in', 'on', 'to', 'with', 'by',
+    'في', 'من', 'على', 'الى', 'الي', 'عن', 'مع', 'و',
+}
+
+
+def normalize(text):
+    """Lowercase and fold Arabic diacritics and letter variants."""
+    return _ARABIC_DIACRITICS_RE.sub('', (text or '').lower()).translate(_ARABIC_LETTERS)
+
+
+def tokenize(text):
+    tokens = []
+    for token in _TOKEN_RE.findall(normalize(text)):
+        if token.startswith('ال') and len(token) > 4:
+            token = token[2:]  # Arabic definite article
+        if len(token) > 1 and token not in STOPWORDS and not token.isdigit():
+            tokens.append(token)
+    return tokens
+
+
+def title_terms(row):
+    return Counter(tokenize(row['title']) + tokenize(row['title_ar']))
+
+
+def client_key(row):
+    return normalize(row['client']).strip()
+
+
+def project_terms(row):
+    """``{term: count}`` stored in ``ProjectTerm`` for a project row."""
+    terms = {term[:TERM_MAX_LENGTH]: count for term, count in title_terms(row).items()}
+    if client_key(row):
+        terms[(CLIENT_PREFIX + client_key(row))[:TERM_MAX_LENGTH]] = 1
+    return terms
+
+
+def _max_document_frequency(total):
+    return max(MAX_DOCUMENT_FREQUENCY * total, 50)
+
+
+class RelatedIndex:
+    """
+    Sparse TF-IDF vectors plus category/client groups for a set of
+    projects. Term statistics come from the rows, unless ``total`` and
+    ``document_frequency`` give those of the whole table (the rows being
+    only the part of it needed).
+    """
+
+    def __init__(self, rows, total=None, document_frequency=None):
+        self.category = {}
+        self.client = {}
+        self.date = {}
+        self.by_category = defaultdict(list)
+        by_client = defaultdict(list)
+        terms = {}
+        for row in rows:
+            pid = row['id']
+            self.category[pid] = row['category_id']
+            self.client[pid] = client_key(row)
+            self.date[pid] = row['date']
+            terms[pid] = title_terms(row)
+            if row['category_id'] is not None:
+                self.by_category[row['category_id']].append(pid)
+            if self.client[pid]:
+                by_client[self.client[pid]].append(pid)
+        self.by_client = dict(by_client)
+        for members in self.by_category.values():
+            members.sort(key=self.date.__getitem__, reverse=True)
+
+        if total is None:
+            total = len(terms)
+            document_frequency = Counter(term for counts in terms.values() for term in counts)
+        idf = {
+            term: math.log((1 + total) / (1 + document_frequency.get(term, 1))) + 1
+            for counts in terms.values() for term in counts
+        }
+        max_df = _max_document_frequency(total)
+        self.vectors = {}
+        self.postings = defaultdict(list)
+        for pid, counts in terms.items():
+            vector = {term: count * idf[term] for term, count in counts.items()}
+            norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+            vector = {term: weight / norm for term, weight in vector.items()}
+            self.vectors[pid] = vector
+            for term, weight in vector.items():
+                if document_frequency.get(term, 1) <= max_df:
+                    self.postings[term].append((pid, weight))
+
+    @classmethod
+    def load(cls):
+        return cls(Project.objects.order_by().values(*ROW_FIELDS))
+
+    @classmethod
+    def load_around(cls, project_ids):
+        """
+        The index of ``project_ids`` and of every project that can score
+        against one of them: those sharing a term (short of the too common
+        ones) or the client, and the newest of their categories for the
+        fill-up. Neighbours and scores are those of a full index.
+        """
+        rows = list(Project.objects.filter(pk__in=list(project_ids)).order_by().values(*ROW_FIELDS))
+        if not rows:
+            return cls([])
+        total = Project.objects.count()
+        max_df = _max_document_frequency(total)
+        terms = {term for row in rows for term in title_terms(row)}
+        document_frequency = _document_frequency(terms)
+        keys = [term for term in terms if document_frequency.get(term, 1) <= max_df]
+        keys += [CLIENT_PREFIX + client_key(row) for row in rows if client_key(row)]
+        others = set(ProjectTerm.objects.filter(term__in=keys).values_list('project_id', flat=True))
+        for category in {row['category_id'] for row in rows} - {None}:
+            others.update(
+                Project.objects.filter(category_id=category).order_by('-date')
+                .values_list('id', flat=True)[:RELATED_LIMIT + 1]
+            )
+        others -= {row['id'] for row in rows}
+        rows += Project.objects.filter(pk__in=list(others)).order_by().values(*ROW_FIELDS)
+        # Every loaded vector is normalized with the idf of all its terms.
+        document_frequency.update(_document_frequency(
+            {term for row in rows for term in title_terms(row)} - set(document_frequency)
+        ))
+        return cls(rows, total=total, document_frequency=document_frequency)
+
+    def scores(self, pid):
+        """Similarity of ``pid`` to every project sharing a term or client with it."""
+        scores = defaultdict(float)
+        for term, weight in self.vectors[pid].items():
+            for other, other_weight in self.postings.get(term, ()):
+                scores[other] += TERM_WEIGHT * weight * other_weight
+        for other in self.by_client.get(self.client[pid], ()):
+            scores[other] += CLIENT_WEIGHT
+        category = self.category[pid]
+        if category is not None:
+            for other in scores:
+                if self.category[other] == category:
+                    scores[other] += CATEGORY_WEIGHT
+        scores.pop(pid, None)
+        return scores
+
+    def neighbours(self, pid, limit=RELATED_LIMIT):
+        """Top ``limit`` ``(project id, score)`` pairs; ties go to the newer project."""
+        scores = self.scores(pid)
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], self.date[item[0]]))
+        # Not enough overlap: fill up with the newest projects of the same category.
+        for other in self.by_category.get(self.category[pid], ()):
+            if len(top) >= limit:
+                break
+            if other != pid and other not in scores:
+                top.append((other, CATEGORY_WEIGHT))
+        return top
+
+
+def _document_frequency(terms):
+    """Number of projects with each of ``terms``, from ``ProjectTerm``."""
+    return dict(
+        ProjectTerm.objects.filter(term__in=[term[:TERM_MAX_LENGTH] for term in terms])
+        .values_list('term').annotate(n=Count('id')).order_by()
+    )
+
+
+def store_terms(rows):
+    """Replace the ``ProjectTerm`` rows of the projects in ``rows`` (``ROW_FIELDS`` dicts)."""
+    with transaction.atomic():
+        ProjectTerm.objects.filter(project_id__in=[row['id'] for row in rows]).delete()
+        ProjectTerm.objects.bulk_create([
+            ProjectTerm(project_id=row['id'], term=term, count=min(count, 32767))
+            for row in rows
+            for term, count in project_terms(row).items()
+        ], batch_size=1000)
+
+
+def _write(lists):
+    """Replace the related projects of ``{project id: [(related id, score), ...]}``."""
+    project_ids = sorted(lists)
+    rows = [
+        RelatedProject(project_id=pid, related_id=other, rank=rank, score=round(score, 6))
+        for pid in project_ids
+        for rank, (other, score) in enumerate(lists[pid])
+    ]
+    with transaction.atomic():
+        RelatedProject.objects.filter(project_id__in=project_ids).delete()
+        RelatedProject.objects.bulk_create(rows, batch_size=1000)
+    related_projects_updated.send(sender=RelatedProject, project_ids=project_ids)
+    return len(rows)
+
+
+def rebuild(batch_size=2000, progress=None):
+    """Recompute the terms and related projects of every project. Returns the number of rows written."""
+    rows = list(Project.objects.order_by().values(*ROW_FIELDS))
+    index = RelatedIndex(rows)
+    rows.sort(key=lambda row: row['id'])
+    written = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        store_terms(batch)
+        written += _write({row['id']: index.neighbours(row['id']) for row in batch})
+        if progress:
+            progress(min(start + batch_size, len(rows)), len(rows))
+    # Projects deleted since are dropped along with their rows by the FK cascade.
+    return written
+
+
+def rebuild_lists(project_ids):
+    """Recompute the lists of the given projects only."""
+    index = RelatedIndex.load_around(project_ids)
+    project_ids = sorted(set(project_ids) & set(index.vectors))
+    if project_ids:
+        _write({pid: index.neighbours(pid) for pid in project_ids})
+
+
+def refresh_for_project(pid):
+    """
+    Update the index after project ``pid`` was created or changed: its
+    terms, its own list, the lists it used to appear in, and the lists its
+    new score now earns it a place in (similarity is symmetric).
+    """
+    return refresh_for_projects([pid])
+
+
+def refresh_for_projects(project_ids):
+    """``refresh_for_project`` for several projects, loading the index once."""
+    changed = list(Project.objects.filter(pk__in=list(project_ids)).order_by().values(*ROW_FIELDS))
+    store_terms(changed)
+    changed_ids = {row['id'] for row in changed}
+    # Lists they were in are recomputed: they may have to leave them.
+    recompute = changed_ids | set(
+        RelatedProject.objects.filter(related_id__in=list(project_ids)).values_list('project_id', flat=True)
+    )
+    index = RelatedIndex.load_around(recompute)
+    recompute &= set(index.vectors)
+
+    entering = defaultdict(list)
+    for pid in changed_ids:
+        scores = {other: score for other, score in index.scores(pid).items() if other not in recompute}
+        current = {
+            row['project']: row
+            for row in RelatedProject.objects.filter(project_id__in=list(scores))
+            .values('project').annotate(worst=Min('score'), n=Count('id')).order_by()
+        }
+        for other, score in scores.items():
+            row = current.get(other)
+            if row is None or row['n'] < RELATED_LIMIT or score > row['worst']:
+                entering[other].append((pid, score))
+
+    lists = {pid: index.neighbours(pid) for pid in recompute}
+    # Lists they enter: merged into the stored entries, without loading those projects' neighbours.
+    stored = defaultdict(list)
+    for row in RelatedProject.objects.filter(project_id__in=list(entering)).order_by('project', 'rank'):
+        stored[row.project_id].append((row.related_id, row.score))
+    for pid, entries in entering.items():
+        merged = sorted(stored[pid] + entries, key=lambda item: item[1], reverse=True)
+        lists[pid] = merged[:RELATED_LIMIT]
+    if lists:
+        _write(lists)
+    return set(lists)
+
+
+def _cards():
+    return (
+        RelatedProject.objects.select_related('related__category')
+        .only(
+            'project', 'rank', 'related__id', 'related__title', 'related__title_ar', 'related__image',
+            'related__client', 'related__date', 'related__category', 'related__category__name',
+            'related__category__name_ar',
+        )
+        .order_by('project', 'rank')
+    )
+
+
+def related_cards(pid):
+    """The stored related projects of ``pid``, in rank order, with what a card needs."""
+    return _cards().filter(project_id=pid)
+
+
+def related_cards_for(project_ids):
+    """``{project id: [RelatedProject, ...]}`` for many projects in one query."""
+    links = defaultdict(list)
+    for link in _cards().filter(project_id__in=list(project_ids)):
+        links[link.project_id].append(link)
+    return links
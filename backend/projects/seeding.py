@@ -0,0 +1,285 @@
+"""
+Deterministic synthetic data for benchmarks and local load testing.
+
+Rows are generated from a seeded ``random.Random`` so two runs with the
+same arguments produce identical content, and inserted in batches, one
+transaction per batch. All users share a single precomputed password
+hash, so seeding does no per-row hashing.
+
+Rows are plain tuples written with multi-row ``INSERT`` statements rather
+than ``bulk_create``: at a million rows, building a model instance and
+preparing every field of it through the ORM took most of the time. Only
+the values that need converting for the database (dates, JSON) go through
+their field; columns the seed doesn't set get their default once per
+table. Bulk inserts send no signals, which the ``seed`` command makes up
+for afterwards.
+"""
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import BooleanField, CharField, ForeignKey, IntegerField, Max, TextField
+from django.utils import timezone
+
+from comments.models import Comment
+from contact.models import Contact
+from jobapplicant.models import JobApplication
+from .models import Category, Project, ProjectImage
+
+User = get_user_model()
+
+SEED_PASSWORD = 'seed-password'
+CATEGORIES = [
+    ('branding', 'تصميم الهوية'),
+    ('ui-design', 'تصميم واجهة المستخدم'),
+    ('social-media', 'وسائل التواصل الاجتماعي'),
+    ('packaging', 'تصميم العبوات'),
+    ('print', 'تصميم مطبوع'),
+    ('motion', 'رسومات متحركة'),
+]
+ADJECTIVES = [
+    ('Bold', 'جريء'), ('Modern', 'عصري'), ('Minimal', 'بسيط'), ('Vibrant', 'نابض'),
+    ('Classic', 'كلاسيكي'), ('Urban', 'حضري'), ('Desert', 'صحراوي'), ('Royal', 'ملكي'),
+    ('Fresh', 'منعش'), ('Digital', 'رقمي'),
+]
+NOUNS = [
+    ('Identity', 'هوية'), ('Campaign', 'حملة'), ('Packaging', 'تغليف'), ('Website', 'موقع'),
+    ('Launch', 'إطلاق'), ('Rebrand', 'إعادة تصميم'), ('Catalogue', 'كتالوج'),
+    ('Storyboard', 'لوحة قصصية'), ('Poster', 'ملصق'), ('App', 'تطبيق'),
+]
+CLIENTS = [
+    'Najd Coffee', 'Al Waha Dates', 'Saqr Logistics', 'Qamar Bakery', 'Noor Clinics',
+    'Rimal Resorts', 'Sahm Fintech', 'Dar Al Oud', 'Jazeera Motors', 'Tamr Foods',
+    'Falak Academy', 'Masar Travel',
+]
+SENTENCES = [
+    ('A complete visual system built around the brand story.',
+     'نظام بصري متكامل مبني حول قصة العلامة التجارية.'),
+    ('We delivered print, digital and motion assets for the launch.',
+     'قدمنا مواد مطبوعة ورقمية ومتحركة للإطلاق.'),
+    ('The concept blends local heritage with a contemporary grid.',
+     'يمزج المفهوم بين التراث المحلي والتصميم المعاصر.'),
+    ('Social media templates keep the tone consistent across channels.',
+     'قوالب وسائل التواصل تحافظ على هوية موحدة عبر القنوات.'),
+    ('Packaging was designed to stand out on crowded shelves.',
+     'صُمم التغليف ليبرز على الرفوف المزدحمة.'),
+]
+COMMENTS = [
+    'Beautiful work!', 'Love the colour palette.', 'Great attention to detail.',
+    'عمل رائع!', 'الألوان جميلة جداً.', 'تصميم مبدع ومميز.',
+]
+
+# Smallest valid PNG (1x1, transparent), used for optional placeholder files.
+PLACEHOLDER_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489'
+    '0000000d49444154789c6360000002000001e221bc330000000049454e44ae426082'
+)
+
+# Rows generated per unit of ``--scale``; scale 1 is roughly 5k rows.
+SCALE_UNIT = {
+    'users': 50,
+    'projects': 200,
+    'images_per_project': 5,
+    'comments': 2000,
+    'contacts': 800,
+    'applications': 800,
+}
+
+
+# Fields whose Python values the database drivers take as they are.
+PASSED_AS_IS = (BooleanField, CharField, ForeignKey, IntegerField, TextField)
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _columns(model, names):
+    """
+    The fields to insert: ``names`` (attnames), then every other concrete
+    column with its default, as ``(fields, prepare, constants)``.
+    """
+    by_name = {field.attname: field for field in model._meta.concrete_fields}
+    fields = [by_name.pop(name) for name in names]
+    prepare = [None if isinstance(field, PASSED_AS_IS) else field for field in fields]
+    now = timezone.now()
+    constants = []
+    for field in by_name.values():
+        if field.primary_key:
+            continue
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            value = now
+        else:
+            value = field.get_default()
+        fields.append(field)
+        constants.append(field.get_db_prep_save(value, connection))
+    return fields, prepare, tuple(constants)
+
+
+def _insert_sql(model, fields, rows):
+    qn = connection.ops.quote_name
+    row = '(%s)' % ', '.join(['%s'] * len(fields))
+    sql = 'INSERT INTO %s (%s) VALUES %s' % (
+        qn(model._meta.db_table), ', '.join(qn(field.column) for field in fields), ', '.join([row] * rows),
+    )
+    if connection.features.can_return_rows_from_bulk_insert:
+        sql += ' RETURNING %s' % qn(model._meta.pk.column)
+    return sql
+
+
+def _bulk_insert(model, names, rows, batch_size, progress=None):
+    """
+    Insert ``rows`` (an iterable of tuples of the ``names`` columns) in
+    batches, each in its own transaction; return the pks.
+    """
+    fields, prepare, constants = _columns(model, names)
+    width = len(fields)
+    # Rows per statement, within the database's limit on query parameters.
+    size = connection.ops.bulk_batch_size(fields, [None] * batch_size)
+    statements = {}
+    pks = []
+    for batch in _batched(rows, batch_size):
+        values = []
+        for row in batch:
+            values.extend(
+                value if field is None else field.get_db_prep_save(value, connection)
+                for field, value in zip(prepare, row)
+            )
+            values.extend(constants)
+        with transaction.atomic(), connection.cursor() as cursor:
+            for start in range(0, len(batch), size):
+                count = min(size, len(batch) - start)
+                if count not in statements:
+                    statements[count] = _insert_sql(model, fields, count)
+                cursor.execute(statements[count], values[start * width:(start + count) * width])
+                if connection.features.can_return_rows_from_bulk_insert:
+                    pks.extend(pk for pk, in cursor.fetchall())
+                else:
+                    # Seeding runs alone, so the batch's rows are the newest ones.
+                    pks.extend(reversed(model.objects.order_by('-pk').values_list('pk', flat=True)[:count]))
+        if progress:
+            progress(model, len(pks))
+    return pks
+
+
+def _placeholder_images(categories):
+    """Write one tiny placeholder file per category and return their storage names."""
+    names = {}
+    for category in categories:
+        name = f'projects/seed/placeholder-{category.name}.png'
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(PLACEHOLDER_PNG))
+        names[category.pk] = name
+    return names
+
+
+def seed_dataset(projects=50, images_per_project=3, comments=200, contacts=50,
+                 applications=50, users=10, seed=0, batch_size=2000,
+                 placeholder_images=False, progress=None):
+    """Create a reproducible dataset and return the number of rows per model."""
+    rng = random.Random(seed)
+    password = make_password(SEED_PASSWORD)
+    start = date(2020, 1, 1)
+    # Keep emails/usernames unique when seeding into a non-empty database.
+    offset = (User.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+
+    categories = list(Category.objects.filter(name__in=[name for name, name_ar in CATEGORIES]))
+    existing = {category.name for category in categories}
+    with transaction.atomic():
+        categories += Category.objects.bulk_create([
+            Category(name=name, name_ar=name_ar) for name, name_ar in CATEGORIES if name not in existing
+        ])
+    placeholders = _placeholder_images(categories) if placeholder_images else {}
+
+    user_pks = _bulk_insert(User, ('email', 'username', 'name', 'password', 'is_active', 'email_verified'), (
+        (f'seed{offset + i}@example.com', f'seed{offset + i}', f'Seed User {offset + i}', password, True, True)
+        for i in range(users)
+    ), batch_size, progress)
+
+    # Category of each project, in insertion order, for its gallery placeholders.
+    project_categories = []
+
+    def project_rows():
+        for i in range(projects):
+            adjective, adjective_ar = rng.choice(ADJECTIVES)
+            noun, noun_ar = rng.choice(NOUNS)
+            first, second = rng.sample(SENTENCES, 2)
+            category = rng.choice(categories)
+            project_categories.append(category.pk)
+            yield (
+                f'{adjective} {noun} {i}', f'{noun_ar} {adjective_ar} {i}',
+                f'{first[0]} {second[0]}', f'{first[1]} {second[1]}',
+                category.pk, placeholders.get(category.pk, f'projects/seed/{i}.jpg'),
+                rng.choice(CLIENTS), start + timedelta(days=rng.randrange(1500)),
+                rng.random() < 0.1,
+            )
+
+    project_pks = _bulk_insert(Project, (
+        'title', 'title_ar', 'description', 'description_ar', 'category_id', 'image',
+        'client', 'date', 'featured',
+    ), project_rows(), batch_size, progress)
+
+    _bulk_insert(ProjectImage, ('project_id', 'order', 'image'), (
+        (project_pk, n, placeholders.get(category_pk, f'projects/seed/{project_pk}/gallery/{n}.jpg'))
+        for project_pk, category_pk in zip(project_pks, project_categories)
+        for n in range(images_per_project)
+    ), batch_size, progress)
+
+    if project_pks and user_pks:
+        _bulk_insert(Comment, ('project_id', 'user_id', 'content'), (
+            (rng.choice(project_pks), rng.choice(user_pks), rng.choice(COMMENTS))
+            for _ in range(comments)
+        ), batch_size, progress)
+
+    _bulk_insert(Contact, ('name', 'email', 'subject', 'message', 'is_read'), (
+        (
+            f'Contact {i}', f'contact{i}@example.com', rng.choice(NOUNS)[0],
+            rng.choice(SENTENCES)[rng.randrange(2)], rng.random() < 0.5,
+        )
+        for i in range(contacts)
+    ), batch_size, progress)
+
+    positions = [value for value, label in JobApplication.POSITION_CHOICES]
+    work_types = [value for value, label in JobApplication.WORK_TYPE_CHOICES]
+    experience = [value for value, label in JobApplication.EXPERIENCE_CHOICES]
+    _bulk_insert(JobApplication, (
+        'full_name', 'email', 'phone', 'city_country', 'position', 'work_type',
+        'years_of_experience', 'about_you', 'tools', 'portfolio_link', 'worked_in_agency_before',
+    ), (
+        (
+            f'Applicant {i}', f'applicant{i}@example.com', f'05{rng.randrange(10 ** 8):08d}',
+            'Riyadh, Saudi Arabia', rng.choice(positions), rng.choice(work_types),
+            rng.choice(experience), rng.choice(SENTENCES)[0],
+            rng.sample(['Photoshop', 'Illustrator', 'After Effects', 'Figma', 'Premiere'], 2),
+            f'https://example.com/portfolio/{i}', rng.random() < 0.5,
+        )
+        for i in range(applications)
+    ), batch_size, progress)
+
+    return {
+        'categories': len(categories),
+        'users': len(user_pks),
+        'projects': len(project_pks),
+        'images': len(project_pks) * images_per_project,
+        'comments': comments if project_pks and user_pks else 0,
+        'contacts': contacts,
+        'applications': applications,
+    }
+
+
+def seed_scale(scale, **kwargs):
+    """Seed ``scale`` units of :data:`SCALE_UNIT` rows."""
+    counts = {key: int(value * scale) for key, value in SCALE_UNIT.items()}
+    counts['images_per_project'] = SCALE_UNIT['images_per_project']
+    return seed_dataset(**counts, **kwargs)
@@ -1,19 +1,24 @@
 from rest_framework import serializers
-from django.db import models
-from .models import Project, Category, ProjectImage
+from django.db import models, transaction
+from .models import COUNTER_FIELDS, Project, Category, ProjectImage
+from . import counters
+from .related import related_cards
+from api.locale import LocalizedSerializerMixin
+from api.timing import TimedSerializerMixin
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(LocalizedSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'name_ar', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
+        localized_fields = {'name': 'name_ar'}
 
 class ProjectImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProjectImage
         fields = ['id', 'image', 'order']
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(LocalizedSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     category_name_ar = serializers.CharField(source='category.name_ar', read_only=True)
     images = ProjectImageSerializer(many=True, read_only=True)
@@ -30,37 +35,123 @@ class ProjectSerializer(serializers.ModelSerializer):
             'id', 'title', 'title_ar', 'description', 'description_ar',
             'category', 'category_name', 'category_name_ar', 'image',
             'client', 'date', 'featured', 'created_at', 'updated_at',
+            'comment_count', 'image_count', 'last_comment_at',
             'images', 'additional_images'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at', 'comment_count', 'image_count', 'last_comment_at']
+        localized_fields = {
+            'title': 'title_ar',
+            'description': 'description_ar',
+            'category_name': 'category_name_ar',
+        }
 
     def create(self, validated_data):
         additional_images = validated_data.pop('additional_images', [])
-        project = Project.objects.create(**validated_data)
-
-        for order, image in enumerate(additional_images):
-            ProjectImage.objects.create(project=project, image=image, order=order)
-
+        with transaction.atomic():
+            project = Project.objects.create(**validated_data)
+            images = self._add_images(project, additional_images)
+        # The response lists exactly these images; don't query them back.
+        project._prefetched_objects_cache = {'images': images}
+        project.image_count = len(images)
         return project
 
     def update(self, instance, validated_data):
         additional_images = validated_data.pop('additional_images', [])
-        
-        # Update the project instance
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-
-        # Add new images if provided
-        if additional_images:
-            # Get the current highest order
-            current_max_order = instance.images.aggregate(models.Max('order'))['order__max'] or -1
-            
-            for i, image in enumerate(additional_images):
-                ProjectImage.objects.create(
-                    project=instance, 
-                    image=image, 
-                    order=current_max_order + i + 1
-                )
+        # Passed by ProjectViewSet.perform_update
+        deleted_image_ids = validated_data.pop('deleted_image_ids', None)
+
+        with transaction.atomic():
+            if deleted_image_ids:
+                ProjectImage.objects.filter(id__in=deleted_image_ids, project=instance).delete()
 
+            # Update the project instance
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+
+            # Add new images after the current last one
+            if additional_images:
+                current_max_order = instance.images.aggregate(models.Max('order'))['order__max']
+                start = 0 if current_max_order is None else current_max_order + 1
+                self._add_images(instance, additional_images, start)
+
+        if deleted_image_ids or additional_images:
+            instance.refresh_from_db(fields=COUNTER_FIELDS)
         return instance
+
+    @staticmethod
+    def _add_images(project, images, start=0):
+        """Insert gallery rows in one query; each file is stored as its row is prepared."""
+        rows = ProjectImage.objects.bulk_create([
+            ProjectImage(project=project, image=image, order=start + i)
+            for i, image in enumerate(images)
+        ])
+        if rows:
+            # bulk_create sends no post_save for the counter receivers.
+            counters.images_added(project.pk, len(rows))
+        return rows
+
+
+class RelatedProjectCardSerializer(LocalizedSerializerMixin, serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    category_name_ar = serializers.CharField(source='category.name_ar', read_only=True)
+
+    class Meta:
+        model = Project
+        fields = ['id', 'title', 'title_ar', 'image', 'client', 'date', 'category_name', 'category_name_ar']
+        read_only_fields = fields
+        localized_fields = {'title': 'title_ar', 'category_name': 'category_name_ar'}
+
+
+class ProjectDetailSerializer(ProjectSerializer):
+    """``ProjectSerializer`` plus the precomputed related projects, used for retrieve."""
+    related_projects = serializers.SerializerMethodField()
+
+    class Meta(ProjectSerializer.Meta):
+        fields = ProjectSerializer.Meta.fields + ['related_projects']
+
+    def get_related_projects(self, obj):
+        # Async views load the links themselves and attach them as ``related_links_cache``.
+        links = getattr(obj, 'related_links_cache', None)
+        if links is None:
+            links = related_cards(obj.pk)
+        # Reuse one card serializer so its fields are built once, not per project.
+        if not hasattr(self, '_card_serializer'):
+            self._card_serializer = RelatedProjectCardSerializer(many=True, context=self.context)
+        return self._card_serializer.to_representation([link.related for link in links])
+
+
+class ProjectImportRowSerializer(serializers.Serializer):
+    """
+    One manifest row of a bulk import (see ``projects.importer``). The
+    context provides ``categories`` (casefolded name in either language
+    -> id) and ``files`` (paths present in the bundle).
+    """
+    title = serializers.CharField(max_length=200)
+    title_ar = serializers.CharField(max_length=200)
+    description = serializers.CharField()
+    description_ar = serializers.CharField()
+    category = serializers.CharField()
+    client = serializers.CharField(max_length=100)
+    date = serializers.DateField()
+    featured = serializers.BooleanField(default=False)
+    image = serializers.CharField()
+    gallery = serializers.ListField(child=serializers.CharField(), default=list)
+
+    def validate_category(self, value):
+        try:
+            return self.context['categories'][value.strip().casefold()]
+        except KeyError:
+            raise serializers.ValidationError(f'Unknown category "{value}".')
+
+    def _check_file(self, path):
+        if path not in self.context['files']:
+            raise serializers.ValidationError(f'"{path}" is not in the bundle.')
+        return path
+
+    def validate_image(self, value):
+        return self._check_file(value.strip())
+
+    def validate_gallery(self, value):
+        return [self._check_file(path.strip()) for path in value if path.strip()]
+
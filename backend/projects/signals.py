@@ -0,0 +1,69 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Project, ProjectImage, RelatedProject
+from .related import SIMILARITY_FIELDS, refresh_for_project, refresh_for_projects, rebuild_lists
+from . import counters, suggest
+from .importer import projects_imported
+
+
+@receiver(post_save, sender=Project, dispatch_uid='projects.related.save')
+def update_related_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not SIMILARITY_FIELDS & set(update_fields)):
+        return
+    transaction.on_commit(lambda: refresh_for_project(instance.pk))
+
+
+@receiver(pre_delete, sender=Project, dispatch_uid='projects.related.pre_delete')
+def remember_related_lists(sender, instance, **kwargs):
+    # The rows pointing at this project are about to cascade away.
+    instance._related_to = list(
+        RelatedProject.objects.filter(related_id=instance.pk).values_list('project_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Project, dispatch_uid='projects.related.delete')
+def update_related_on_delete(sender, instance, **kwargs):
+    affected = getattr(instance, '_related_to', None)
+    if affected:
+        transaction.on_commit(lambda: rebuild_lists(affected))
+
+
+@receiver(post_save, sender=Project, dispatch_uid='projects.suggest.save')
+@receiver(post_delete, sender=Project, dispatch_uid='projects.suggest.delete')
+def update_suggest_index(sender, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(suggest.bump_version)
+
+
+@receiver(projects_imported, dispatch_uid='projects.imported')
+def update_after_import(sender, projects, **kwargs):
+    # Sent after the batch commits, in place of each project's post_save.
+    refresh_for_projects([project.pk for project in projects])
+    suggest.bump_version()
+
+
+@receiver(post_save, sender='comments.Comment', dispatch_uid='projects.counters.comment_save')
+def count_created_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.comment_added(instance.project_id, instance.created_at)
+
+
+@receiver(post_delete, sender='comments.Comment', dispatch_uid='projects.counters.comment_delete')
+def count_deleted_comment(sender, instance, origin=None, **kwargs):
+    # Nothing to adjust when the project itself is being deleted.
+    if not isinstance(origin, Project):
+        counters.comment_removed(instance.project_id)
+
+
+@receiver(post_save, sender=ProjectImage, dispatch_uid='projects.counters.image_save')
+def count_created_image(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.images_added(instance.project_id)
+
+
+@receiver(post_delete, sender=ProjectImage, dispatch_uid='projects.counters.image_delete')
+def count_deleted_image(sender, instance, origin=None, **kwargs):
+    if not isinstance(origin, Project):
+        counters.images_removed(instance.project_id)
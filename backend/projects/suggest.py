@@ -0,0 +1,183 @@
+"""
+Typeahead suggestions for the project search box.
+
+Each process keeps a ``SuggestIndex``: sorted lists of normalized keys
+(whole titles and clients, and every suffix starting at a word) so that
+a prefix lookup is a binary search. Keys are normalized like the
+related-projects terms (lowercase, Arabic diacritics and letter variants
+folded, punctuation dropped, optional definite article), so "الحملة"
+and "حمله" find the same project.
+
+Saving or deleting a project bumps a version in the cache (see
+``projects.signals``); every process rebuilds its index on the next
+lookup after that, and in any case after ``SUGGEST_INDEX_MAX_AGE``
+seconds. When nothing starts with the query, the normalized whole texts
+are scanned for it anywhere, so that both lookups fold the same variants.
+"""
+import bisect
+import heapq
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+from .models import Project
+from .related import _TOKEN_RE, normalize
+
+VERSION_KEY = 'projects:suggest:version'
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+# Shorter queries are too unselective for a substring search.
+MIN_CONTAINS_LENGTH = 3
+
+_lock = threading.Lock()
+_state = {'index': None, 'version': None, 'built_at': 0.0}
+
+
+def normalize_key(text):
+    return ' '.join(_TOKEN_RE.findall(normalize(text)))
+
+
+def _keys(text):
+    """The whole normalized text, then each suffix starting at a word."""
+    key = normalize_key(text)
+    if not key:
+        return key, []
+    suffixes = []
+    for match in _TOKEN_RE.finditer(key):
+        suffix = key[match.start():]
+        if match.start():
+            suffixes.append(suffix)
+        if suffix.startswith('ال') and len(match.group()) > 4:
+            suffixes.append(suffix[2:])  # Arabic definite article
+    return key, suffixes
+
+
+class _PrefixList:
+    """Sorted ``(key, value)`` pairs with prefix iteration."""
+
+    def __init__(self, pairs):
+        pairs.sort()
+        self.keys = [key for key, value in pairs]
+        self.values = [value for key, value in pairs]
+
+    def starting_with(self, prefix):
+        i = bisect.bisect_left(self.keys, prefix)
+        while i < len(self.keys) and self.keys[i].startswith(prefix):
+            yield self.values[i]
+            i += 1
+
+    @cached_property
+    def _text(self):
+        # All keys in one string (they hold no newlines) for a scan in C.
+        starts, position = [], 0
+        for key in self.keys:
+            starts.append(position)
+            position += len(key) + 1
+        return '\n'.join(self.keys), starts
+
+    def containing(self, needle):
+        text, starts = self._text
+        for match in re.finditer(re.escape(needle), text):
+            yield self.values[bisect.bisect_right(starts, match.start()) - 1]
+
+
+class SuggestIndex:
+    def __init__(self, rows):
+        self.projects = {}
+        self.dates = {}
+        titles, title_words, clients, client_words = [], [], [], []
+        for pid, title, title_ar, client, date in rows:
+            self.projects[pid] = {'id': pid, 'title': title, 'title_ar': title_ar}
+            self.dates[pid] = date
+            for text in (title, title_ar):
+                key, suffixes = _keys(text)
+                if key:
+                    titles.append((key, pid))
+                title_words.extend((suffix, pid) for suffix in suffixes)
+            key, suffixes = _keys(client)
+            if key:
+                clients.append((key, client))
+            client_words.extend((suffix, client) for suffix in suffixes)
+        # Whole-text matches are listed before matches on a later word.
+        self.titles = (_PrefixList(titles), _PrefixList(title_words))
+        self.clients = (_PrefixList(clients), _PrefixList(client_words))
+
+    @classmethod
+    def load(cls):
+        return cls(Project.objects.values_list('id', 'title', 'title_ar', 'client', 'date').iterator())
+
+    @staticmethod
+    def _collect(lists, prefixes, limit):
+        found = {}
+        for prefix in prefixes:
+            for prefix_list in lists:
+                for value in prefix_list.starting_with(prefix):
+                    found.setdefault(value, None)
+                    if len(found) >= limit:
+                        return list(found)
+        return list(found)
+
+    @staticmethod
+    def _variants(query):
+        key = normalize_key(query)
+        if not key:
+            return []
+        if key.startswith('ال') and len(key.split(' ')[0]) > 4:
+            return [key, key[2:]]  # the text may lack the article
+        return [key]
+
+    def lookup(self, query, limit=DEFAULT_LIMIT):
+        prefixes = self._variants(query)
+        projects = [self.projects[pid] for pid in self._collect(self.titles, prefixes, limit)]
+        clients = self._collect(self.clients, prefixes, limit)
+        return projects, clients
+
+    def containing(self, query, limit=DEFAULT_LIMIT):
+        """Matches anywhere in the whole texts: the newest projects, clients in order."""
+        needles = self._variants(query)
+
+        def matching(prefix_list):
+            return {value for needle in needles for value in prefix_list.containing(needle)}
+
+        pids = heapq.nlargest(limit, matching(self.titles[0]), key=lambda pid: (self.dates[pid], pid))
+        clients = sorted(matching(self.clients[0]))[:limit]
+        return [self.projects[pid] for pid in pids], clients
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 2, timeout=None)
+
+
+def _stale(version):
+    return (
+        _state['index'] is None
+        or _state['version'] != version
+        or time.monotonic() - _state['built_at'] > settings.SUGGEST_INDEX_MAX_AGE
+    )
+
+
+def get_index():
+    version = cache.get(VERSION_KEY, 1)
+    if _stale(version):
+        with _lock:
+            if _stale(version):
+                _state.update(index=SuggestIndex.load(), version=version, built_at=time.monotonic())
+    return _state['index']
+
+
+def suggest(query, limit=DEFAULT_LIMIT):
+    """Return ``{'projects': [...], 'clients': [...]}`` for a search-box query."""
+    query = query.strip()
+    limit = max(1, min(limit, MAX_LIMIT))
+    index = get_index()
+    projects, clients = index.lookup(query, limit)
+    if not projects and not clients and len(query) >= MIN_CONTAINS_LENGTH:
+        projects, clients = index.containing(query, limit)
+    return {'projects': projects, 'clients': clients}
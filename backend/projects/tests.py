@@ -1,3 +1,235 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import uuid
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import pages
+from comments.models import Comment
+from jobapplicant.models import JobApplication
+from . import suggest
+from .export import ExportChanged, ProjectExport, select_projects
+from .models import Category, ImportProgress, Project, ProjectImage
+
+
+def image_file(name):
+    content = io.BytesIO()
+    Image.new('RGB', (4, 4), 'red').save(content, 'PNG')
+    return SimpleUploadedFile(name, content.getvalue(), content_type='image/png')
+
+
+class InitDbResumeTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'db.json')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'users': [],
+                'categories': [{'id': 10 + n, 'name': f'category {n}', 'nameAr': f'فئة {n}'} for n in range(3)],
+                'projects': [
+                    {'id': n, 'title': f'project {n}', 'category': 10 + n % 3, 'date': '2025-01-01'}
+                    for n in range(5)
+                ],
+                'contact': [],
+            }, f)
+
+    def init_db(self):
+        call_command('init_db', file=self.path, batch_size=2, stdout=open(os.devnull, 'w'))
+
+    def test_batch_that_fails_to_commit_is_imported_on_resume(self):
+        update = QuerySet.update
+        calls = []
+
+        def fail_third_batch(queryset, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 3:
+                raise RuntimeError('connection lost')
+            return update(queryset, **kwargs)
+
+        # Batches: categories 10-11, category 12, projects 0-1 (fails), ...
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=fail_third_batch), \
+                self.assertRaises(CommandError):
+            self.init_db()
+        progress = ImportProgress.objects.get()
+        self.assertEqual(progress.done, {'categories': 3})
+        self.assertEqual(Category.objects.count(), 3)
+        self.assertFalse(Project.objects.exists())
+
+        self.init_db()
+        self.assertFalse(ImportProgress.objects.exists())
+        projects = Project.objects.order_by('title').values_list('title', 'category__name')
+        self.assertEqual(list(projects), [(f'project {n}', f'category {n % 3}') for n in range(5)])
+
+
+class ProjectWriteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='branding', name_ar='هوية')
+        admin = get_user_model().objects.create_user(
+            'admin', 'admin@example.com', 'password', is_staff=True, is_active=True,
+        )
+        cls.authorization = f'Bearer {AccessToken.for_user(admin)}'
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        caches = {'default': {**settings.CACHES['default'], 'KEY_PREFIX': f'test-{uuid.uuid4().hex}'}}
+        overrides = override_settings(MEDIA_ROOT=media.name, CACHES=caches)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def inserts(self, queries, model):
+        table = connection.ops.quote_name(model._meta.db_table)
+        return [q for q in queries if q['sql'].startswith(f'INSERT INTO {table}')]
+
+    def create(self, images=2):
+        return self.client.post('/api/projects/', {
+            'title': 'Launch', 'title_ar': 'إطلاق', 'description': 'd', 'description_ar': 'd',
+            'category': self.category.pk, 'client': 'Acme', 'date': '2025-01-01',
+            'image': image_file('main.png'),
+            'additional_images': [image_file(f'gallery{n}.png') for n in range(images)],
+        }, HTTP_AUTHORIZATION=self.authorization)
+
+    def test_create_with_gallery_inserts_once_per_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.create(images=3)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(self.inserts(queries, Project)), 1)
+        self.assertEqual(len(self.inserts(queries, ProjectImage)), 1)
+        data = response.json()
+        self.assertEqual([image['order'] for image in data['images']], [0, 1, 2])
+        self.assertEqual(data['image_count'], 3)
+        self.assertEqual(ProjectImage.objects.filter(project=data['id']).count(), 3)
+
+    def update(self, project_id, deleted, images):
+        data = encode_multipart(BOUNDARY, {
+            'deleted_image_ids': json.dumps(deleted),
+            'additional_images': [image_file(f'new{n}.png') for n in range(images)],
+        })
+        return self.client.patch(
+            f'/api/projects/{project_id}/', data, content_type=MULTIPART_CONTENT,
+            HTTP_AUTHORIZATION=self.authorization,
+        )
+
+    def test_update_deletes_and_adds_images_with_the_counter(self):
+        project = self.create(images=3).json()
+        first, second, third = (image['id'] for image in project['images'])
+        response = self.update(project['id'], [first, second], images=1)
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual(data['image_count'], 2)
+        self.assertEqual(len(data['images']), 2)
+        self.assertEqual(data['images'][0]['id'], third)
+        self.assertEqual(Project.objects.get(pk=project['id']).image_count, 2)
+
+    def test_update_is_one_transaction(self):
+        project = self.create(images=2).json()
+        ids = [image['id'] for image in project['images']]
+        with mock.patch('projects.counters.images_added', side_effect=RuntimeError('lost')), \
+                self.assertRaises(RuntimeError):
+            self.update(project['id'], ids[:1], images=1)
+        # Neither the deletion nor the new image survived the failed counter update.
+        self.assertEqual(list(ProjectImage.objects.filter(project=project['id']).values_list('id', flat=True)), ids)
+        self.assertEqual(Project.objects.get(pk=project['id']).image_count, 2)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        caches = {'default': {**settings.CACHES['default'], 'KEY_PREFIX': f'test-{uuid.uuid4().hex}'}}
+        overrides = override_settings(MEDIA_ROOT=media.name, CACHES=caches)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        category = Category.objects.create(name='branding', name_ar='هوية')
+        self.projects = [
+            Project.objects.create(
+                title=f'project {n}', title_ar='مشروع', description='d', description_ar='d',
+                category=category, client='Acme', date='2025-01-01', image=image_file(f'main{n}.png'),
+            )
+            for n in range(2)
+        ]
+
+    def export(self):
+        return ProjectExport(select_projects())
+
+    def test_archive(self):
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(self.export().stream())))
+        self.assertIsNone(archive.testzip())
+        names = [project.image.name for project in self.projects]
+        self.assertEqual(archive.namelist(), names + ['manifest.json'])
+        manifest = json.loads(archive.read('manifest.json'))
+        self.assertEqual([row['image'] for row in manifest['projects']], names)
+
+    def test_file_changed_after_the_layout_stops_the_stream(self):
+        for change in ('grow', 'shrink', 'remove'):
+            with self.subTest(change=change):
+                expected = b''.join(self.export().stream())
+                export = self.export()
+                export.length  # lays the archive out
+                path = self.projects[1].image.path
+                with open(path, 'rb') as f:
+                    content = f.read()
+                if change == 'remove':
+                    os.remove(path)
+                else:
+                    with open(path, 'wb') as f:
+                        f.write(content + b'more' if change == 'grow' else content[:-1])
+                sent = []
+                with self.assertRaises(ExportChanged), self.assertLogs('projects.export', 'WARNING'):
+                    for chunk in export.stream(0, export.length):
+                        sent.append(chunk)
+                # What was sent is still the archive as laid out, up to the changed file.
+                self.assertTrue(expected.startswith(b''.join(sent)))
+                self.assertNotIn(b'manifest.json', b''.join(sent))
+                with open(path, 'wb') as f:
+                    f.write(content)
+
+    def test_stream_stopped_early_closes_the_manifest(self):
+        export = self.export()
+        list(export.stream(0, 10))
+        self.assertTrue(export.entries[-1].data.closed)
+        # The whole-archive generator, stopped before it reached the manifest.
+        with mock.patch('tempfile.SpooledTemporaryFile.close', autospec=True) as close:
+            stream = self.export().stream()
+            next(stream)
+            stream.close()
+        close.assert_called_once()
+
+
+class SeedTests(TestCase):
+    def setUp(self):
+        caches = {'default': {**settings.CACHES['default'], 'KEY_PREFIX': f'test-{uuid.uuid4().hex}'}}
+        overrides = override_settings(CACHES=caches)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_seed_inserts_rows_and_invalidates_the_caches(self):
+        pages_version, suggest_version = pages.pages_version(), cache.get(suggest.VERSION_KEY, 1)
+        call_command('seed', scale=0.02, stdout=open(os.devnull, 'w'))
+        self.assertEqual(Project.objects.count(), 4)
+        self.assertEqual(ProjectImage.objects.count(), 20)
+        self.assertEqual(Comment.objects.count(), 40)
+        project = Project.objects.order_by('pk').first()
+        self.assertEqual(project.image_count, 5)
+        self.assertIsNotNone(project.created_at)
+        self.assertEqual(len(JobApplication.objects.first().tools), 2)
+        self.assertTrue(get_user_model().objects.get(username__startswith='seed').check_password('seed-password'))
+        self.assertNotEqual(pages.pages_version(), pages_version)
+        self.assertNotEqual(cache.get(suggest.VERSION_KEY, 1), suggest_version)
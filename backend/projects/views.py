@@ -1,18 +1,28 @@
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 import logging
 import json
 
-from .models import Project, Category, ProjectImage
-from .serializers import ProjectSerializer, CategorySerializer
+from .models import Project, Category
+from .serializers import ProjectSerializer, ProjectDetailSerializer, CategorySerializer
+from . import suggest as suggestions
+from .importer import ImportBundleError, import_bundle
+from .export import ProjectExport, parse_range, select_projects
 from users.permissions import IsAdminOrStaff
+from api.locale import LocalizedViewSetMixin
+from api.streaming import streaming_content
 
 logger = logging.getLogger(__name__)
 
-class ProjectViewSet(viewsets.ModelViewSet):
-    queryset = Project.objects.all()
+class ProjectViewSet(LocalizedViewSetMixin, viewsets.ModelViewSet):
+    queryset = Project.objects.select_related('category').prefetch_related('images')
     serializer_class = ProjectSerializer
     
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -22,28 +32,112 @@ class ProjectViewSet(viewsets.ModelViewSet):
     ordering = ['-date']
     
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'featured']:
+        if self.action in ['list', 'retrieve', 'featured', 'suggest']:
             permission_classes = [permissions.AllowAny]
         else:
             permission_classes = [IsAdminOrStaff]
         return [permission() for permission in permission_classes]
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return ProjectDetailSerializer
+        return super().get_serializer_class()
     
     @action(detail=False, methods=['get'])
     def featured(self, request):
-        featured_projects = Project.objects.filter(featured=True)
-        serializer = self.get_serializer(featured_projects, many=True)
+        """
+        The newest featured projects: a list of at most ?limit= (default
+        FEATURED_PROJECTS_LIMIT, at most FEATURED_PROJECTS_MAX_LIMIT), or,
+        with ?page=, the usual paginated envelope over all of them.
+        """
+        featured_projects = self.get_queryset().filter(featured=True)
+        if 'page' in request.query_params:
+            page = self.paginate_queryset(featured_projects)
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        try:
+            limit = int(request.query_params.get('limit', settings.FEATURED_PROJECTS_LIMIT))
+        except ValueError:
+            limit = settings.FEATURED_PROJECTS_LIMIT
+        limit = max(1, min(limit, settings.FEATURED_PROJECTS_MAX_LIMIT))
+        serializer = self.get_serializer(featured_projects[:limit], many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Typeahead suggestions for ?q= (see projects.suggest); ?limit= caps each list."""
+        try:
+            limit = int(request.query_params.get('limit', suggestions.DEFAULT_LIMIT))
+        except ValueError:
+            limit = suggestions.DEFAULT_LIMIT
+        return Response(suggestions.suggest(request.query_params.get('q', ''), limit))
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        """
+        Import the projects of the ZIP uploaded as 'bundle' (see
+        projects.importer). Returns the created ids and the rejected rows.
+        """
+        bundle = request.FILES.get('bundle')
+        if bundle is None:
+            return Response({"detail": "Upload the ZIP bundle as 'bundle'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        # Large uploads are already on disk; small ones are in memory.
+        source = bundle.temporary_file_path() if hasattr(bundle, 'temporary_file_path') else bundle
+        try:
+            report = import_bundle(source)
+        except ImportBundleError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream a ZIP of the projects' images and manifest (see
+        projects.export), optionally for ?category=<id>, ?date_from= and
+        ?date_to= (YYYY-MM-DD). Supports Range/If-Range to resume.
+        """
+        selection = {}
+        try:
+            if request.query_params.get('category'):
+                selection['category'] = int(request.query_params['category'])
+            for name in ('date_from', 'date_to'):
+                if request.query_params.get(name):
+                    selection[name] = parse_date(request.query_params[name])
+                    if selection[name] is None:
+                        raise ValueError(name)
+        except ValueError:
+            return Response({"detail": "Invalid category or date (use YYYY-MM-DD)."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        export = ProjectExport(select_projects(**selection))
+
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if 'Range' in request.headers and (not if_range or if_range == export.etag):
+            try:
+                byte_range = parse_range(request.headers['Range'], export.length)
+            except ValueError:
+                response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+                response['Content-Range'] = f'bytes */{export.length}'
+                return response
+        if byte_range:
+            start, stop = byte_range
+            response = StreamingHttpResponse(
+                streaming_content(export.stream(start, stop), request), status=status.HTTP_206_PARTIAL_CONTENT,
+                content_type='application/zip',
+            )
+            response['Content-Range'] = f'bytes {start}-{stop - 1}/{export.length}'
+            response['Content-Length'] = stop - start
+        else:
+            # Sent as it is generated: no Content-Length.
+            response = StreamingHttpResponse(streaming_content(export.stream(), request), content_type='application/zip')
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = export.etag
+        response['Content-Disposition'] = f'attachment; filename="projects-{timezone.localdate():%Y%m%d}.zip"'
+        return response
+
     def create(self, request, *args, **kwargs):
         try:
-            response = super().create(request, *args, **kwargs)
-            # Ensure image paths are updated
-            if response.status_code == status.HTTP_201_CREATED:
-                instance = self.get_queryset().get(id=response.data['id'])
-                instance.save()  # This will trigger the path update
-                # Re-serialize to get updated paths
-                response.data = self.get_serializer(instance).data
-            return response 
+            return super().create(request, *args, **kwargs)
         except Exception as e:
             logger.error(f"Error creating project: {str(e)}")
             return Response(
@@ -54,9 +148,10 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def update(self, request, *args, **kwargs):
         """
         Handle deletion of existing gallery images when frontend sends
-        'deleted_image_ids' (JSON array string or array).
+        'deleted_image_ids' (JSON array string or array). They are removed
+        in the same transaction as the rest of the update.
         """
-        # parse deleted ids early so they are removed before serializer.update adds new images
+        self.deleted_image_ids = []
         deleted_raw = request.data.get('deleted_image_ids', None)
         if deleted_raw:
             try:
@@ -65,18 +160,17 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 else:
                     deleted_ids = list(deleted_raw)
                 # Ensure ints
-                deleted_ids = [int(i) for i in deleted_ids]
-                # Delete only images belonging to this project
-                project_pk = kwargs.get('pk') or request.data.get('id')
-                ProjectImage.objects.filter(id__in=deleted_ids, project_id=project_pk).delete()
+                self.deleted_image_ids = [int(i) for i in deleted_ids]
             except Exception as e:
                 # log and continue - don't abort update for parsing error
-                logger.exception("Failed to parse/delete deleted_image_ids: %s", e)
+                logger.exception("Failed to parse deleted_image_ids: %s", e)
 
-        # proceed with normal update flow (this will add any new additional_images)
         return super().update(request, *args, **kwargs)
 
-class CategoryViewSet(viewsets.ModelViewSet):
+    def perform_update(self, serializer):
+        serializer.save(deleted_image_ids=self.deleted_image_ids)
+
+class CategoryViewSet(LocalizedViewSetMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all().order_by('name')  # Explicitly set ordering
     serializer_class = CategorySerializer
     
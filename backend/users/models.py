@@ -2,10 +2,6 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from rest_framework_simplejwt.tokens import RefreshToken
 import logging
 
 logger = logging.getLogger(__name__)
@@ -65,10 +61,12 @@ class User(AbstractUser):
     
     def email_user(self, subject, message, from_email=None, **kwargs):
         """Send an email to this user."""
+        from django.core.mail import send_mail
         send_mail(subject, message, from_email, [self.email], **kwargs)
 
     def get_verification_token(self):
         """Generate verification token using JWT"""
+        from rest_framework_simplejwt.tokens import RefreshToken
         try:
             # Create refresh token
             refresh = RefreshToken.for_user(self)
@@ -80,3 +78,14 @@ class User(AbstractUser):
         except Exception as e:
             logger.error(f"Token generation error: {str(e)}")
             raise
+
+
+class RevokedToken(models.Model):
+    """A revoked token ``jti``, or ``user:<id>`` for all of a user's tokens; see ``users.revocation``."""
+    key = models.CharField(max_length=64, primary_key=True)
+    revoked_at = models.DateTimeField()
+    # After this, the tokens it revokes have expired anyway.
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,185 @@
+"""
+Revocation of JWTs (logout, logout everywhere, refresh-token rotation).
+
+Revocations are rows of ``RevokedToken``, keyed by a token's ``jti``, or
+by ``user:<id>`` for "every token of this user issued until now". Tokens
+only carry their issue time to the second (``iat``), so a user row
+revokes the tokens issued before the second it was made in: logging in
+again right after logging out everywhere must work. A row
+is only needed until the tokens it revokes would have expired anyway,
+so ``expires_at`` is set from the token lifetime; expired rows are
+ignored and the ``retention`` command deletes them.
+
+Checking a token must not cost a query on every refresh or request, so
+each process keeps a ``BloomFilter`` of the live keys. A key the filter
+doesn't contain is certainly not revoked; only probable hits (real
+revocations, or about ``REVOCATION_BLOOM_ERROR_RATE`` of the rest) are
+looked up in the table. Revoking bumps a version in the cache, and every
+process rebuilds its filter on its next check after that (with a cache
+shared between processes), and in any case after
+``REVOCATION_SYNC_SECONDS``.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import RevokedToken
+
+VERSION_KEY = 'users:revocation:version'
+# Keys the filter is sized for beyond those revoked when it was built.
+HEADROOM = 1000
+
+_lock = threading.Lock()
+_state = {'filter': None, 'version': None, 'built_at': 0.0}
+
+
+class BloomFilter:
+    """Set membership with false positives but no false negatives."""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: position i is h1 + i * h2.
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def user_key(user_id):
+    return f'user:{user_id}'
+
+
+def _live():
+    return RevokedToken.objects.filter(expires_at__gt=timezone.now())
+
+
+def _build():
+    keys = list(_live().values_list('key', flat=True).iterator())
+    bloom = BloomFilter(len(keys) + HEADROOM, settings.REVOCATION_BLOOM_ERROR_RATE)
+    for key in keys:
+        bloom.add(key)
+    return bloom
+
+
+def _stale(version):
+    return (
+        _state['filter'] is None
+        or _state['version'] != version
+        or time.monotonic() - _state['built_at'] > settings.REVOCATION_SYNC_SECONDS
+    )
+
+
+def get_filter():
+    version = cache.get(VERSION_KEY, 1)
+    if _stale(version):
+        with _lock:
+            if _stale(version):
+                _state.update(filter=_build(), version=version, built_at=time.monotonic())
+    return _state['filter']
+
+
+def _bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 2, timeout=None)
+
+
+def _insert(key, expires_at, now):
+    """Insert the revocation row; False if ``key`` has one already."""
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(key=key, revoked_at=now, expires_at=expires_at)
+    except IntegrityError:
+        return False
+    return True
+
+
+def _added(key):
+    if _state['filter'] is not None:
+        _state['filter'].add(key)
+    transaction.on_commit(_bump_version)
+
+
+def _revoke(key, expires_at, now=None):
+    now = now or timezone.now()
+    if not _insert(key, expires_at, now):
+        # Revoked before: the later revocation covers more.
+        RevokedToken.objects.filter(key=key).update(revoked_at=now, expires_at=expires_at)
+    _added(key)
+
+
+def _token_expiry(token):
+    return datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+
+
+def revoke(token):
+    """Revoke one token (an instance of a simplejwt token class) until it expires."""
+    _revoke(token[api_settings.JTI_CLAIM], _token_expiry(token))
+
+
+def consume(token):
+    """
+    Revoke a token that may be used only once (a rotated refresh token).
+    The insert is the check: of concurrent callers, only the one whose
+    row went in gets True.
+    """
+    key = token[api_settings.JTI_CLAIM]
+    if not _insert(key, _token_expiry(token), timezone.now()):
+        return False
+    _added(key)
+    return True
+
+
+def revoke_user(user_id, token=None):
+    """
+    Revoke every token issued to the user before the current second (log
+    out everywhere), and ``token`` (the one the request came with), which
+    may have been issued within it.
+    """
+    lifetime = max(api_settings.REFRESH_TOKEN_LIFETIME, api_settings.ACCESS_TOKEN_LIFETIME)
+    now = timezone.now().replace(microsecond=0)
+    _revoke(user_key(user_id), now + lifetime, now=now)
+    if token is not None:
+        revoke(token)
+
+
+def is_revoked(token):
+    """Whether ``token`` was revoked; a query only when the filter suggests so."""
+    bloom = get_filter()
+    jti = token.get(api_settings.JTI_CLAIM)
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    candidates = []
+    if jti and jti in bloom:
+        candidates.append(Q(key=jti))
+    if user_id is not None and user_key(user_id) in bloom:
+        # revoked_at is a whole second: tokens issued within it are still valid.
+        issued_at = datetime.fromtimestamp(token.get('iat', 0), tz=dt_timezone.utc)
+        candidates.append(Q(key=user_key(user_id), revoked_at__gt=issued_at))
+    if not candidates:
+        return False
+    query = candidates[0]
+    for candidate in candidates[1:]:
+        query |= candidate
+    return _live().filter(query).exists()
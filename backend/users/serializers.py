@@ -1,11 +1,16 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.exceptions import InvalidToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from api.timing import TimedSerializerMixin
+from . import revocation
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = [
@@ -179,3 +184,20 @@ class UpdateUserSerializer(serializers.ModelSerializer):
 
         instance.save()
         return instance
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    """
+    Refuses revoked refresh tokens, and revokes the old token when it is
+    rotated if BLACKLIST_AFTER_ROTATION is set (see users.revocation): of
+    concurrent refreshes with one token, only the first gets new tokens.
+    """
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if revocation.is_revoked(refresh):
+            raise InvalidToken({'detail': 'Token has been revoked', 'code': 'token_revoked'})
+        data = super().validate(attrs)
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            if not revocation.consume(refresh):
+                raise InvalidToken({'detail': 'Token has been revoked', 'code': 'token_revoked'})
+        return data
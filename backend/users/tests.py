@@ -1,3 +1,103 @@
-from django.test import TestCase
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import revocation
+
+# simplejwt reads api_settings through a reference taken at import, which
+# overriding SIMPLE_JWT doesn't update: patch the settings object itself.
+rotating = mock.patch.multiple(api_settings, ROTATE_REFRESH_TOKENS=True, BLACKLIST_AFTER_ROTATION=True)
+
+
+class RevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            'staff', 'staff@example.com', 'password', is_staff=True, is_active=True,
+        )
+
+    def setUp(self):
+        caches = {'default': {**settings.CACHES['default'], 'KEY_PREFIX': f'test-{uuid.uuid4().hex}'}}
+        cache_settings = override_settings(CACHES=caches)
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+        state = mock.patch.dict(revocation._state, {'filter': None, 'version': None, 'built_at': 0.0})
+        state.start()
+        self.addCleanup(state.stop)
+
+    def access(self, token):
+        """Status of an authenticated request made with the access ``token``."""
+        return self.client.get('/api/users/', HTTP_AUTHORIZATION=f'Bearer {token}').status_code
+
+    def refresh(self, token):
+        return self.client.post('/api/auth/refresh/', {'refresh': str(token)})
+
+    def test_refresh_token_is_refused_after_logout(self):
+        refresh = RefreshToken.for_user(self.user)
+        self.assertEqual(self.refresh(refresh).status_code, 200)
+        response = self.client.post('/api/auth/logout/', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 205)
+        response = self.refresh(refresh)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'token_revoked')
+
+    def test_access_token_is_refused_after_logout(self):
+        refresh = RefreshToken.for_user(self.user)
+        access = refresh.access_token
+        other = RefreshToken.for_user(self.user).access_token
+        self.assertEqual(self.access(access), 200)
+        response = self.client.post(
+            '/api/auth/logout/', {'refresh': str(refresh)}, HTTP_AUTHORIZATION=f'Bearer {access}',
+        )
+        self.assertEqual(response.status_code, 205)
+        self.assertEqual(self.access(access), 401)
+        # Another session of the same user is untouched.
+        self.assertEqual(self.access(other), 200)
+
+    def test_logout_all_revokes_tokens_issued_until_then(self):
+        now = timezone.now().replace(microsecond=500000)
+
+        def issued(at):
+            token = AccessToken.for_user(self.user)
+            token.set_iat(at_time=at)
+            return token
+
+        earlier = issued(now - timedelta(seconds=1))
+        own = issued(now.replace(microsecond=0))
+        refresh = RefreshToken.for_user(self.user)
+        refresh.set_iat(at_time=now - timedelta(seconds=1))
+        with mock.patch('users.revocation.timezone.now', return_value=now):
+            response = self.client.post('/api/auth/logout-all/', HTTP_AUTHORIZATION=f'Bearer {own}')
+            self.assertEqual(response.status_code, 205)
+            # A login right after, within the same second, works.
+            later = issued(now)
+            self.assertEqual(self.access(earlier), 401)
+            self.assertEqual(self.access(own), 401)
+            self.assertEqual(self.refresh(refresh).status_code, 401)
+            self.assertEqual(self.access(later), 200)
+
+    @rotating
+    def test_rotated_refresh_token_is_revoked(self):
+        refresh = RefreshToken.for_user(self.user)
+        response = self.refresh(refresh)
+        self.assertEqual(response.status_code, 200)
+        rotated = response.json()['refresh']
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+        self.assertEqual(self.refresh(rotated).status_code, 200)
+
+    @rotating
+    def test_concurrent_refreshes_rotate_once(self):
+        refresh = RefreshToken.for_user(self.user)
+        # Both requests pass the revocation check before either revokes the token.
+        with mock.patch.object(revocation, 'is_revoked', return_value=False):
+            self.assertEqual(self.refresh(refresh).status_code, 200)
+            response = self.refresh(refresh)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'token_revoked')
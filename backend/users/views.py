@@ -2,6 +2,7 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
@@ -13,12 +14,14 @@ import logging
 
 from .serializers import UserSerializer, UserCreateSerializer, CustomTokenObtainPairSerializer, UpdateUserSerializer
 from .permissions import IsAdminOrStaff
+from . import revocation
+from api.streaming import StreamingListMixin
 
 logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(StreamingListMixin, viewsets.ModelViewSet):
     queryset = User.objects.all().order_by('-created_at')
     permission_classes = [IsAdminOrStaff]
 
@@ -40,9 +43,6 @@ class UserViewSet(viewsets.ModelViewSet):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
 
-        # Log the received data for debugging
-        print(f"Update data received: {request.data}")
-
         serializer = self.get_serializer(
             instance, 
             data=request.data, 
@@ -54,7 +54,7 @@ class UserViewSet(viewsets.ModelViewSet):
             self.perform_update(serializer)
             return Response(serializer.data)
         except Exception as e:
-            print(f"Update error: {str(e)}")
+            logger.warning("User update error: %s", e)
             return Response(
                 {'detail': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
@@ -67,12 +67,10 @@ class UserViewSet(viewsets.ModelViewSet):
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({
+        return self.streaming_response(queryset, envelope={
             'count': queryset.count(),
             'next': None,
             'previous': None,
-            'results': serializer.data
         })
 
 class LoginView(TokenObtainPairView):
@@ -93,6 +91,32 @@ class LoginView(TokenObtainPairView):
             
         return super().post(request, *args, **kwargs)
 
+class LogoutView(APIView):
+    """
+    Revoke the posted refresh token, and the access token the request is
+    authenticated with, if any. Holding the refresh token is enough.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        try:
+            refresh = RefreshToken(request.data.get('refresh', ''))
+        except TokenError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        revocation.revoke(refresh)
+        if isinstance(request.auth, AccessToken):
+            revocation.revoke(request.auth)
+        return Response(status=status.HTTP_205_RESET_CONTENT)
+
+class LogoutAllView(APIView):
+    """Revoke every token issued to the current user: logs out all their sessions."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        token = request.auth if isinstance(request.auth, AccessToken) else None
+        revocation.revoke_user(request.user.pk, token)
+        return Response(status=status.HTTP_205_RESET_CONTENT)
+
 class RegisterView(APIView):
     permission_classes = [permissions.AllowAny]
     
@@ -3,17 +3,9 @@ import { Row, Col, Card, Badge } from 'react-bootstrap';
 import { Helmet } from 'react-helmet-async';
 import { useTranslation } from 'react-i18next';
 import { motion } from 'framer-motion';
-import { useSelector, useDispatch } from 'react-redux';
+import { useSelector } from 'react-redux';
 import { ToastContainer, toast } from 'react-toastify';
 import 'react-toastify/dist/ReactToastify.css';
-import { 
-  fetchProjects, 
-  selectAllProjects, 
-  selectProjectStatus, 
-  resetFormState 
-} from '../../redux/slices/projectsSlice';
-import { fetchUsers, selectAllUsers } from '../../redux/slices/usersSlice';
-import { fetchContacts, selectAllContacts } from '../../redux/slices/contactSlice';
 import { selectUser } from '../../redux/slices/authSlice';
 import { selectDarkMode } from '../../redux/slices/themeSlice';
 import { FaImages, FaUsers, FaEye, FaStar, FaCheck, FaTimes, FaEnvelope, FaFileAlt } from 'react-icons/fa';
@@ -23,47 +15,32 @@ import api from '../../utils/api'; // keep same path; ensure it imports the same
 
 const Dashboard = () => {
   const { t } = useTranslation();
-  const dispatch = useDispatch();
-  const status = useSelector(selectProjectStatus);
-  
-  const projects = useSelector(selectAllProjects);
-  const users = useSelector(selectAllUsers);
-  const contacts = useSelector(selectAllContacts);
   const currentUser = useSelector(selectUser);
   const darkMode = useSelector(selectDarkMode);
   
-  const [jobApplications, setJobApplications] = useState([]);
+  const [stats, setStats] = useState(null);
   
-  // Fetch data on component mount
+  // One request for every number on the dashboard (served from rollups)
   useEffect(() => {
-    dispatch(fetchProjects());
-    dispatch(fetchUsers());
-    dispatch(fetchContacts());
-    
-    const fetchJobApplications = async () => {
+    const fetchStats = async () => {
       try {
-        const response = await api.get('/job-applications/');
-        // Handle both array and paginated responses
-        const data = Array.isArray(response.data) 
-          ? response.data 
-          : response.data.results || response.data.data || [];
-        
-        console.log('Job Applications:', data);
-        setJobApplications(data);
+        const response = await api.get('/stats/');
+        setStats(response.data);
       } catch (error) {
-        console.error('Error fetching job applications:', error);
-        setJobApplications([]); // ensure array
+        console.error('Error fetching dashboard stats:', error);
       }
     };
-    fetchJobApplications();
-  }, [dispatch]);
+    fetchStats();
+  }, []);
   
-  // Calculate dashboard stats
-  const totalProjects = projects.length;
-  const featuredProjects = projects.filter(project => project.featured).length;
-  const totalUsers = users.length;
-  const totalMessages = contacts.length;
-  const unreadMessages = contacts.filter(contact => !contact.is_read).length;
+  // Dashboard stats
+  const totals = stats?.totals || {};
+  const totalProjects = totals.projects || 0;
+  const featuredProjects = totals.featured_projects || 0;
+  const totalUsers = totals.users || 0;
+  const totalMessages = totals.contacts || 0;
+  const unreadMessages = totals.unread_contacts || 0;
+  const totalApplications = totals.applications || 0;
 
   // Animation variants
   const containerVariants = {
@@ -90,10 +67,8 @@ const Dashboard = () => {
   const { i18n } = useTranslation();
   const categoryField = i18n.language === 'ar' ? 'category_name_ar' : 'category_name';
 
-  // Get recent projects sorted by date
-  const recentProjects = [...projects]
-    .sort((a, b) => new Date(b.created_at) - new Date(a.created_at))
-    .slice(0, 5);
+  // Latest projects, newest first
+  const recentProjects = stats?.recent_projects || [];
 
   return (
     <>
@@ -209,8 +184,8 @@ const Dashboard = () => {
                         <FaFileAlt />
                       </div>
                       <h3 className="stat-value">
-                        {jobApplications.length || 0}
-                        {jobApplications.length > 0 && (
+                        {totalApplications}
+                        {totalApplications > 0 && (
                           <Badge bg="info" className="ms-2 new-badge">
                             New
                           </Badge>